@@ -0,0 +1,170 @@
+"""Baseline schema
+
+Brings any historical database (init.sql, fix_schema.py, fix_enums.py,
+add_standby_status.py) to one known state. Every statement is idempotent,
+so it is safe both on an empty database and on an existing deployment:
+
+    alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Enum types (older databases miss 'standby' / 'blocked')
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'userrole') THEN
+                CREATE TYPE userrole AS ENUM ('admin', 'worker', 'blocked');
+            END IF;
+            IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'genstatus') THEN
+                CREATE TYPE genstatus AS ENUM ('stopped', 'running', 'standby');
+            END IF;
+        END $$;
+    """)
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'blocked'")
+        op.execute("ALTER TYPE genstatus ADD VALUE IF NOT EXISTS 'standby'")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id BIGINT PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            role userrole DEFAULT 'worker'
+        )
+    """)
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS sheet_name VARCHAR")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory (
+            id SERIAL PRIMARY KEY,
+            fuel_liters INTEGER DEFAULT 0
+        )
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'inventory' AND column_name = 'fuel_cans') THEN
+                ALTER TABLE inventory RENAME COLUMN fuel_cans TO fuel_liters;
+            END IF;
+        END $$;
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_movements (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(id),
+            reason VARCHAR NOT NULL,
+            change INTEGER NOT NULL,
+            applied INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS generators (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR UNIQUE NOT NULL,
+            status genstatus DEFAULT 'stopped',
+            current_run_start TIMESTAMP
+        )
+    """)
+    op.execute("ALTER TABLE generators ADD COLUMN IF NOT EXISTS fuel_level FLOAT DEFAULT 0.0")
+    op.execute("ALTER TABLE generators ADD COLUMN IF NOT EXISTS tank_capacity FLOAT DEFAULT 40.0")
+    op.execute("ALTER TABLE generators ADD COLUMN IF NOT EXISTS consumption_rate FLOAT DEFAULT 2.0")
+    op.execute("ALTER TABLE generators ALTER COLUMN fuel_level TYPE FLOAT USING fuel_level::double precision")
+    op.execute("ALTER TABLE generators ALTER COLUMN consumption_rate TYPE FLOAT USING consumption_rate::double precision")
+    op.execute("ALTER TABLE generators ADD COLUMN IF NOT EXISTS total_hours_run FLOAT DEFAULT 0.0")
+    op.execute("ALTER TABLE generators ADD COLUMN IF NOT EXISTS last_maintenance TIMESTAMP")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS logs (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(id),
+            action VARCHAR NOT NULL,
+            details VARCHAR,
+            timestamp TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    op.execute("ALTER TABLE logs ADD COLUMN IF NOT EXISTS quantity FLOAT")
+    op.execute("ALTER TABLE logs ADD COLUMN IF NOT EXISTS generator VARCHAR")
+    op.execute("ALTER TABLE logs ADD COLUMN IF NOT EXISTS session_id INTEGER")
+    op.execute("ALTER TABLE logs ADD COLUMN IF NOT EXISTS payload JSONB")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS worker_shifts (
+            id SERIAL PRIMARY KEY,
+            date DATE NOT NULL,
+            shift_number INTEGER NOT NULL,
+            worker1_id BIGINT REFERENCES users(id),
+            worker2_id BIGINT REFERENCES users(id),
+            start_time VARCHAR NOT NULL,
+            end_time VARCHAR NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS refuel_sessions (
+            id SERIAL PRIMARY KEY,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP,
+            deadline TIMESTAMP NOT NULL,
+            status VARCHAR DEFAULT 'pending',
+            worker1_id BIGINT REFERENCES users(id),
+            worker2_id BIGINT REFERENCES users(id),
+            gen_name VARCHAR,
+            liters FLOAT,
+            cans FLOAT,
+            notes VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_by BIGINT REFERENCES users(id)
+        )
+    """)
+    op.execute("ALTER TABLE refuel_sessions ADD COLUMN IF NOT EXISTS block_start TIMESTAMP")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS session_messages (
+            id SERIAL PRIMARY KEY,
+            session_id INTEGER NOT NULL REFERENCES refuel_sessions(id) ON DELETE CASCADE,
+            chat_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL,
+            role VARCHAR NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (session_id, chat_id)
+        )
+    """)
+
+    # Seed rows the bot expects to exist
+    op.execute("INSERT INTO inventory (fuel_liters) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM inventory)")
+    op.execute("""
+        INSERT INTO inventory_movements (reason, change, applied, balance_after)
+        SELECT 'OPENING', fuel_liters, fuel_liters, fuel_liters
+        FROM inventory
+        WHERE NOT EXISTS (SELECT 1 FROM inventory_movements)
+        ORDER BY id LIMIT 1
+    """)
+
+
+def downgrade() -> None:
+    for table in ("session_messages", "refuel_sessions", "worker_shifts", "logs",
+                  "generators", "inventory_movements", "inventory", "users"):
+        op.drop_table(table)
+    op.execute("DROP TYPE IF EXISTS genstatus")
+    op.execute("DROP TYPE IF EXISTS userrole")
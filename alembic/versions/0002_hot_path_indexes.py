@@ -0,0 +1,45 @@
+"""Indexes for hot lookups
+
+- refuel_sessions(status, start_time): get_active_session polling
+- users(sheet_name), users(name): worker lookups from the shift sheet
+- logs(action, timestamp): warehouse stats and last-action queries
+
+Built with CREATE INDEX CONCURRENTLY (outside the migration transaction),
+so the bot keeps writing while they are created. If a build is interrupted
+Postgres leaves an INVALID index behind: drop it and run the upgrade again.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_refuel_sessions_status_start_time", "refuel_sessions", ["status", "start_time"]),
+    ("ix_users_sheet_name", "users", ["sheet_name"]),
+    ("ix_users_name", "users", ["name"]),
+    ("ix_logs_action_timestamp", "logs", ["action", "timestamp"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
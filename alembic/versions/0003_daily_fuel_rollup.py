@@ -0,0 +1,41 @@
+"""daily_fuel_rollup table
+
+Per day and generator totals maintained by LogRepository.log_action.
+Populate history afterwards with `python backfill_rollup.py`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: databases created from init.sql already have it
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_fuel_rollup (
+            day DATE NOT NULL,
+            generator VARCHAR NOT NULL DEFAULT '',
+            liters_taken FLOAT NOT NULL DEFAULT 0,
+            liters_added FLOAT NOT NULL DEFAULT 0,
+            liters_burned FLOAT NOT NULL DEFAULT 0,
+            run_hours FLOAT NOT NULL DEFAULT 0,
+            starts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, generator)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS daily_fuel_rollup")
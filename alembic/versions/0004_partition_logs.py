@@ -0,0 +1,116 @@
+"""Partition logs by month
+
+Rebuilds `logs` as a table partitioned by RANGE (timestamp) with one
+partition per month (logs_YYYY_MM) plus logs_default for stray rows.
+The primary key becomes (id, timestamp), as Postgres requires the
+partition key in it. Existing rows are copied, ids and sequence are kept.
+
+New months are created by the monthly retention job
+(bot/services/log_retention.py), which also archives old partitions.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, action, details, timestamp, quantity, generator, session_id, payload"
+
+
+def upgrade() -> None:
+    # Databases created from init.sql start out partitioned
+    partitioned = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'logs'::regclass"
+    )).scalar()
+    if partitioned:
+        return
+
+    op.execute("ALTER TABLE logs RENAME TO logs_legacy")
+    op.execute("ALTER INDEX IF EXISTS logs_pkey RENAME TO logs_legacy_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_logs_action_timestamp RENAME TO ix_logs_legacy_action_timestamp")
+
+    op.execute("""
+        CREATE TABLE logs (
+            id INTEGER NOT NULL,
+            user_id BIGINT REFERENCES users(id),
+            action VARCHAR NOT NULL,
+            details VARCHAR,
+            timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+            quantity FLOAT,
+            generator VARCHAR,
+            session_id INTEGER,
+            payload JSONB,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("CREATE INDEX ix_logs_action_timestamp ON logs (action, timestamp)")
+    op.execute("CREATE TABLE logs_default PARTITION OF logs DEFAULT")
+
+    # Move the id sequence over, one partition per month of history + 2 ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('logs_legacy', 'id');
+            m date;
+            last date := (date_trunc('month', NOW()) + interval '2 months')::date;
+        BEGIN
+            EXECUTE format('ALTER TABLE logs ALTER COLUMN id SET DEFAULT nextval(%L)', seq);
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY logs.id', seq);
+
+            SELECT date_trunc('month', COALESCE(MIN(timestamp), NOW()))::date INTO m FROM logs_legacy;
+            WHILE m <= last LOOP
+                EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF logs FOR VALUES FROM (%L) TO (%L)',
+                               'logs_' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date);
+                m := (m + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+
+    op.execute(f"""
+        INSERT INTO logs ({COLUMNS})
+        SELECT id, user_id, action, details, COALESCE(timestamp, NOW()), quantity, generator, session_id, payload
+        FROM logs_legacy
+    """)
+    op.execute("DROP TABLE logs_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    op.execute("ALTER INDEX IF EXISTS ix_logs_action_timestamp RENAME TO ix_logs_partitioned_action_timestamp")
+    op.execute("""
+        CREATE TABLE logs (
+            id INTEGER PRIMARY KEY,
+            user_id BIGINT REFERENCES users(id),
+            action VARCHAR NOT NULL,
+            details VARCHAR,
+            timestamp TIMESTAMP DEFAULT NOW(),
+            quantity FLOAT,
+            generator VARCHAR,
+            session_id INTEGER,
+            payload JSONB
+        )
+    """)
+    op.execute("CREATE INDEX ix_logs_action_timestamp ON logs (action, timestamp)")
+    op.execute("""
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('logs_partitioned', 'id');
+        BEGIN
+            EXECUTE format('ALTER TABLE logs ALTER COLUMN id SET DEFAULT nextval(%L)', seq);
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY logs.id', seq);
+        END $$;
+    """)
+    op.execute(f"INSERT INTO logs ({COLUMNS}) SELECT {COLUMNS} FROM logs_partitioned")
+    # Partitions are dropped together with the parent
+    op.execute("DROP TABLE logs_partitioned")
@@ -0,0 +1,33 @@
+"""Index for keyset pagination of refuel sessions
+
+(start_time, id) backs the admin history pages; filtered by status the
+existing (status, start_time) index is used.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_refuel_sessions_start_time_id", "refuel_sessions", ["start_time", "id"],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_refuel_sessions_start_time_id", table_name="refuel_sessions",
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,114 @@
+"""Fuel ledger and snapshots
+
+Replaces inventory_movements with fuel_ledger, which journals the stock
+(account "stock") and every generator tank (account = generator name).
+Stock movements are copied over, each account without history gets an
+OPENING correction for its current balance, and a first snapshot is taken.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS fuel_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            account VARCHAR NOT NULL,
+            kind VARCHAR NOT NULL,
+            delta FLOAT NOT NULL,
+            balance_after FLOAT NOT NULL,
+            user_id BIGINT REFERENCES users(id),
+            session_id INTEGER,
+            note VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_fuel_ledger_account_created_at ON fuel_ledger (account, created_at)")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS fuel_snapshots (
+            id SERIAL PRIMARY KEY,
+            account VARCHAR NOT NULL,
+            taken_at TIMESTAMP NOT NULL,
+            balance FLOAT NOT NULL,
+            ledger_id BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_fuel_snapshots_account_taken_at ON fuel_snapshots (account, taken_at)")
+
+    # Stock history, in its original order
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('inventory_movements') IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM fuel_ledger WHERE account = 'stock') THEN
+                INSERT INTO fuel_ledger (account, kind, delta, balance_after, user_id, note, created_at)
+                SELECT 'stock',
+                       CASE reason WHEN 'ADD_FUEL' THEN 'refuel' WHEN 'TAKE_FUEL' THEN 'transfer' ELSE 'correction' END,
+                       applied, balance_after, user_id, reason, created_at
+                FROM inventory_movements
+                ORDER BY id;
+            END IF;
+        END $$;
+    """)
+    op.execute("DROP TABLE IF EXISTS inventory_movements")
+
+    # Opening balances, so replaying an account from the start gives its live figure
+    op.execute("""
+        INSERT INTO fuel_ledger (account, kind, delta, balance_after, note)
+        SELECT 'stock', 'correction', fuel_liters, fuel_liters, 'OPENING'
+        FROM (SELECT fuel_liters FROM inventory ORDER BY id LIMIT 1) s
+        WHERE NOT EXISTS (SELECT 1 FROM fuel_ledger WHERE account = 'stock')
+    """)
+    op.execute("""
+        INSERT INTO fuel_ledger (account, kind, delta, balance_after, note)
+        SELECT name, 'correction', COALESCE(fuel_level, 0), COALESCE(fuel_level, 0), 'OPENING'
+        FROM generators g
+        WHERE NOT EXISTS (SELECT 1 FROM fuel_ledger l WHERE l.account = g.name)
+    """)
+
+    op.execute("""
+        INSERT INTO fuel_snapshots (account, taken_at, balance, ledger_id)
+        SELECT account, CURRENT_TIMESTAMP AT TIME ZONE 'UTC', balance_after, id
+        FROM (
+            SELECT DISTINCT ON (account) account, balance_after, id
+            FROM fuel_ledger
+            ORDER BY account, id DESC
+        ) last
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_movements (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(id),
+            reason VARCHAR NOT NULL,
+            change INTEGER NOT NULL,
+            applied INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute("""
+        INSERT INTO inventory_movements (user_id, reason, change, applied, balance_after, created_at)
+        SELECT user_id, COALESCE(note, kind), delta::int, delta::int, balance_after::int, created_at
+        FROM fuel_ledger
+        WHERE account = 'stock'
+        ORDER BY id
+    """)
+    op.drop_table('fuel_snapshots')
+    op.drop_table('fuel_ledger')
@@ -0,0 +1,49 @@
+"""One live refuel session per outage block
+
+Partial unique index on refuel_sessions (block_start, deadline) for
+sessions that are not cancelled. Duplicates left by concurrent outage
+checks are cancelled first (the oldest session of a block is kept).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE refuel_sessions s
+        SET status = 'cancelled',
+            notes = COALESCE(notes || ' ', '') || '[duplicate of block session]'
+        WHERE s.block_start IS NOT NULL
+          AND s.status != 'cancelled'
+          AND EXISTS (
+              SELECT 1 FROM refuel_sessions o
+              WHERE o.block_start = s.block_start
+                AND o.deadline = s.deadline
+                AND o.status != 'cancelled'
+                AND o.id < s.id
+          )
+    """)
+    with op.get_context().autocommit_block():
+        op.create_index("uq_refuel_sessions_block", "refuel_sessions", ["block_start", "deadline"],
+                        unique=True, postgresql_where=sa.text("status != 'cancelled'"),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("uq_refuel_sessions_block", table_name="refuel_sessions",
+                      postgresql_concurrently=True, if_exists=True)
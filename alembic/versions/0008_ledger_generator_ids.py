@@ -0,0 +1,32 @@
+"""Fuel ledger: generator accounts by id
+
+Generator accounts in fuel_ledger / fuel_snapshots were the generator name,
+which splits the history when a generator is renamed. They become
+"gen:<generator id>".
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("fuel_ledger", "fuel_snapshots"):
+        op.execute(f"UPDATE {table} t SET account = 'gen:' || g.id FROM generators g WHERE t.account = g.name")
+
+
+def downgrade() -> None:
+    for table in ("fuel_ledger", "fuel_snapshots"):
+        op.execute(f"UPDATE {table} t SET account = g.name FROM generators g WHERE t.account = 'gen:' || g.id")
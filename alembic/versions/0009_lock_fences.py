@@ -0,0 +1,30 @@
+"""Lock fences
+
+Highest fencing token committed under each Redis lock. RedisLock.fence
+advances it inside the holder's transaction, so a holder whose lease ran
+out can't commit after a newer one.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE IF NOT EXISTS lock_fences (name VARCHAR PRIMARY KEY, token BIGINT NOT NULL)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS lock_fences")
@@ -0,0 +1,21 @@
+import asyncio
+import logging
+import sys
+from datetime import date
+from bot.database.main import session_maker
+from bot.database.repositories.rollup import RollupRepository
+
+async def backfill(since: date | None = None):
+    """Rebuild daily_fuel_rollup from live logs (archived months are kept). Usage: python backfill_rollup.py [YYYY-MM-DD]"""
+    logging.basicConfig(level=logging.INFO)
+    logging.info(f"Backfilling daily_fuel_rollup since {since or 'the beginning'}...")
+    
+    async with session_maker() as session:
+        rows = await RollupRepository(session).backfill(since)
+        await session.commit()
+    
+    logging.info(f"Backfill completed: {rows} rows written.")
+
+if __name__ == "__main__":
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(backfill(since))
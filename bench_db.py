@@ -0,0 +1,73 @@
+"""
+Latency of the hot repository queries with and without prepared-statement caching.
+
+Usage (against a directly reachable Postgres, not through PgBouncer):
+    python bench_db.py [iterations]
+
+Each query runs `iterations` times per mode on one pooled connection;
+p50/p95 are reported per query and mode.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from bot.config import config
+from bot.database.main import engine_options
+from bot.database.repositories.generator import GeneratorRepository
+from bot.database.repositories.inventory import InventoryRepository
+from bot.database.repositories.session import SessionRepository
+from bot.database.repositories.user import UserRepository
+
+QUERIES = {
+    "get_active_session": lambda s: SessionRepository(s).get_active_session(),
+    "generators.get_all": lambda s: GeneratorRepository(s).get_all(),
+    "inventory.get_summary": lambda s: InventoryRepository(s).get_summary(7),
+    "user.get_by_id": lambda s: UserRepository(s).get_by_id(config.ADMIN_IDS[0]),
+    "user.get_by_sheet_name": lambda s: UserRepository(s).get_by_sheet_name("bench"),
+}
+
+
+async def bench_mode(mode: str, iterations: int) -> dict[str, list[float]]:
+    settings = config.model_copy(update={"DB_CONNECTION_MODE": mode, "DB_POOL_SIZE": 1, "DB_MAX_OVERFLOW": 0})
+    engine = create_async_engine(config.DATABASE_URL.get_secret_value(), **engine_options(settings))
+    maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    timings = {}
+    try:
+        async with maker() as session:
+            for name, query in QUERIES.items():
+                await query(session)  # Warm up (connection, statement cache)
+                samples = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    await query(session)
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[name] = samples
+            await session.rollback()
+    finally:
+        await engine.dispose()
+    return timings
+
+
+def percentile(samples: list[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100)[q - 1]
+
+
+async def main(iterations: int):
+    results = {mode: await bench_mode(mode, iterations) for mode in ("pgbouncer", "direct")}
+
+    print(f"{'query':<26}{'pgbouncer p50/p95 ms':>24}{'direct p50/p95 ms':>22}{'p50 gain':>10}")
+    for name in QUERIES:
+        off, on = results["pgbouncer"][name], results["direct"][name]
+        gain = 1 - statistics.median(on) / statistics.median(off)
+        print(f"{name:<26}"
+              f"{statistics.median(off):>13.2f} / {percentile(off, 95):<8.2f}"
+              f"{statistics.median(on):>11.2f} / {percentile(on, 95):<8.2f}"
+              f"{gain:>9.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
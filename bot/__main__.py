@@ -9,16 +9,7 @@ async def main():
     
     bot = Bot(token=config.BOT_TOKEN.get_secret_value())
     
-    redis_url = config.REDIS_URL.get_secret_value()
-    # Adding socket_keepalive and retry options to prevent connection drops (WinError 64)
-    from redis.asyncio import Redis
-    redis_client = Redis.from_url(
-        redis_url,
-        socket_keepalive=True,
-        socket_connect_timeout=10,
-        retry_on_timeout=True,
-        health_check_interval=30
-    )
+    from bot.database.redis_client import redis_client
     storage = RedisStorage(redis=redis_client)
     dp = Dispatcher(storage=storage)
     
@@ -34,7 +25,10 @@ async def main():
     # Register middlewares
     from bot.database.main import session_maker
     from bot.middlewares.di import DbSessionMiddleware
+    from bot.middlewares.auth import AuthMiddleware
     
+    # Outer: runs before routing, so blocked users never reach any filter
+    dp.update.outer_middleware(AuthMiddleware(session_maker))
     dp.update.middleware(DbSessionMiddleware(session_maker))
     
     # Run DB Init/Renaming
@@ -60,9 +54,18 @@ async def main():
     dp.include_router(weather.router)
     
     # Start Scheduler
-    from bot.scheduler import start_scheduler, restore_scheduler_settings
-    start_scheduler(bot)
-    await restore_scheduler_settings(bot)
+    from bot.scheduler import start_scheduler, elector
+    await start_scheduler(bot)
+    # Scheduler jobs run only on the elected instance, all of them poll updates
+    leader_task = asyncio.create_task(elector.run())
+    
+    # Start outbox consumer (delivers alerts queued by scheduler jobs and services)
+    from bot.services.outbox import outbox
+    outbox_task = asyncio.create_task(outbox.run_consumer(bot))
+    
+    # Drop locally cached users changed by other instances
+    from bot.database.user_cache import user_cache
+    user_cache_task = asyncio.create_task(user_cache.listen_invalidations())
     
     logging.info("Bot started and polling...")
     
@@ -76,6 +79,12 @@ async def main():
             logging.error(f"Polling error: {e}. Restarting in 5 sec...")
             await asyncio.sleep(5)
     
+    leader_task.cancel()
+    await elector.resign()
+    outbox_task.cancel()
+    # Let the consumer flush buffered digests before the bot session closes
+    await asyncio.gather(outbox_task, return_exceptions=True)
+    user_cache_task.cancel()
     await bot.session.close()
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import SecretStr
+from pydantic import SecretStr, model_validator
 
 class Settings(BaseSettings):
     BOT_TOKEN: SecretStr
@@ -10,6 +11,14 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: SecretStr
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # seconds, reconnect before server/proxy idle timeouts
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    # "pgbouncer": transaction pooling, prepared statements can't be cached
+    # "direct": straight to Postgres, asyncpg statement cache enabled
+    DB_CONNECTION_MODE: Literal["pgbouncer", "direct"] = "pgbouncer"
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Used in "direct" mode
     
     # Redis
     REDIS_URL: SecretStr
@@ -35,6 +44,69 @@ class Settings(BaseSettings):
     HOE_SCHEDULE_URL: str = "https://hoe.com.ua/page/pogodinni-vidkljuchennja"
     QUEUE_NUMBER: str = "1.1"  # Which queue to monitor
     
+    # Broadcast (Telegram limits: ~30 msg/s overall, ~1 msg/s per chat)
+    BROADCAST_GLOBAL_RATE: float = 25.0
+    BROADCAST_CHAT_RATE: float = 1.0
+    BROADCAST_CONCURRENCY: int = 10
+    BROADCAST_MAX_RETRIES: int = 3
+    BROADCAST_RETRY_BASE_DELAY: float = 1.0
+    
+    # Outbox (Redis streams)
+    OUTBOX_DEDUP_WINDOW: int = 300  # seconds
+    OUTBOX_MAXLEN: int = 10000
+    OUTBOX_BATCH_SIZE: int = 20
+    OUTBOX_CLAIM_IDLE_MS: int = 300000  # must stay well above DIGEST_WINDOW, see below
+    OUTBOX_MAX_DELIVERIES: int = 5  # failed entries go to the dead-letter stream after this many attempts
+    
+    # Digest: non-urgent alerts per chat within the window are merged (0 disables)
+    DIGEST_WINDOW: float = 60.0  # seconds
+    DIGEST_MAX_ITEMS: int = 10
+    DIGEST_URGENT_CATEGORIES: list[str] = ["fuel_critical", "session_created"]
+    
+    # User cache (role checks): local LRU in front of Redis
+    USER_CACHE_SIZE: int = 1000
+    USER_CACHE_LOCAL_TTL: int = 60  # seconds
+    USER_CACHE_TTL: int = 3600  # seconds in Redis
+    USER_CACHE_MISS_TTL: int = 30  # seconds an unknown id stays cached as "not found"
+    
+    # Logs retention: monthly partitions older than this are exported and dropped
+    LOG_RETENTION_MONTHS: int = 12
+    LOG_PARTITIONS_AHEAD: int = 2  # Future monthly partitions kept ready
+    LOG_ARCHIVE_DIR: str = "./archive/logs"  # logs_YYYY_MM.jsonl.gz files
+    
+    # Scheduler: jobs persisted in Redis, survive restarts
+    SCHEDULER_JOBS_KEY: str = "scheduler:jobs"
+    SCHEDULER_RUN_TIMES_KEY: str = "scheduler:run_times"
+    SCHEDULER_MISFIRE_GRACE: int = 300  # seconds a missed run (e.g. during restart) may still start late
+    
+    # Leader election: only the leader instance runs scheduler jobs
+    LEADER_LEASE_TTL: int = 15  # seconds; a standby takes over within TTL + heartbeat
+    LEADER_HEARTBEAT: float = 5.0  # seconds
+    
+    # Outage pipeline lock (Redis), one run at a time across instances
+    OUTAGE_LOCK_TTL: int = 60  # seconds, lease renewed while the run is alive
+    OUTAGE_LOCK_WAIT: int = 120  # seconds to wait for a busy lock
+    
+    # Fuel ledger: balances are snapshotted so point-in-time queries only replay a short tail
+    FUEL_SNAPSHOT_HOURS: int = 6
+    
+    # Generator alerts: exact timers per running generator
+    GEN_ROTATION_WARN_HOURS: float = 4.0
+    GEN_ROTATION_CRITICAL_HOURS: float = 6.0
+    GEN_LOW_FUEL_PERCENT: float = 20.0  # of tank capacity
+    GEN_MAINTENANCE_HOURS: float = 100.0  # total hours between oil checks (0 disables)
+    
+    @model_validator(mode="after")
+    def _claim_after_digest(self):
+        # Entries wait in a replica's digest buffer unacknowledged: another
+        # replica must not claim them before they are flushed
+        if self.OUTBOX_CLAIM_IDLE_MS < (2 * self.DIGEST_WINDOW + 60) * 1000:
+            raise ValueError(
+                f"OUTBOX_CLAIM_IDLE_MS ({self.OUTBOX_CLAIM_IDLE_MS}) must be at least "
+                f"(2 * DIGEST_WINDOW + 60) * 1000 = {int((2 * self.DIGEST_WINDOW + 60) * 1000)}"
+            )
+        return self
+    
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 config = Settings()
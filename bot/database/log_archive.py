@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from bot.config import config
+
+FILE_PREFIX = "logs_"
+FILE_SUFFIX = ".jsonl.gz"
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+class LogArchive:
+    """
+    Archived log partitions: one gzip JSON-lines file per month
+    (`logs_YYYY_MM.jsonl.gz`). Files are written once by the retention job
+    and only read afterwards. All methods are blocking, call them via
+    `asyncio.to_thread` from async code.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.directory = Path(directory or config.LOG_ARCHIVE_DIR)
+
+    def path(self, month: date) -> Path:
+        return self.directory / f"{FILE_PREFIX}{month:%Y_%m}{FILE_SUFFIX}"
+
+    def months(self) -> list[date]:
+        if not self.directory.exists():
+            return []
+        months = []
+        for file in self.directory.glob(f"{FILE_PREFIX}*{FILE_SUFFIX}"):
+            stamp = file.name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+            try:
+                months.append(datetime.strptime(stamp, "%Y_%m").date())
+            except ValueError:
+                continue
+        return sorted(months)
+
+    def writer(self, month: date) -> "ArchiveWriter":
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return ArchiveWriter(self.path(month))
+
+    def write(self, month: date, rows: Iterable[dict]) -> Path:
+        """Write a month atomically (temp file + rename). Returns the file path."""
+        writer = self.writer(month)
+        try:
+            writer.write_rows(rows)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def read(self, since: datetime, until: datetime, action: str | None = None) -> Iterator[dict]:
+        """Rows with since <= timestamp < until (and `action` if given), oldest month first."""
+        for month in self.months():
+            if month >= until.date() or next_month(month) <= month_start(since):
+                continue
+            with gzip.open(self.path(month), "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                    if not since <= row["timestamp"] < until:
+                        continue
+                    if action is not None and row["action"] != action:
+                        continue
+                    yield row
+
+
+class ArchiveWriter:
+    """A month file written in chunks; it only appears under its name on `close`."""
+
+    def __init__(self, target: Path):
+        self.target = target
+        self.tmp = target.with_suffix(".tmp")
+        self.file = gzip.open(self.tmp, "wt", encoding="utf-8")
+        self.rows = 0
+
+    def write_rows(self, rows: Iterable[dict]):
+        for row in rows:
+            self.file.write(json.dumps(row, default=_json_default, ensure_ascii=False) + "\n")
+            self.rows += 1
+
+    def close(self) -> Path:
+        self.file.close()
+        os.replace(self.tmp, self.target)
+        return self.target
+
+    def abort(self):
+        self.file.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value)}")
@@ -1,11 +1,41 @@
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from bot.config import config
+from bot.config import config, Settings
+
+def engine_options(settings: Settings = config) -> dict:
+    """
+    Pool and asyncpg options for `create_async_engine`.
+
+    Behind PgBouncer in transaction mode a server connection can change
+    between statements, so both caches of prepared statements (asyncpg's and
+    SQLAlchemy's) are disabled and statement names are made unique.
+    Connecting directly keeps them, which saves a parse/plan round trip on
+    every repeated query.
+    """
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+    if settings.DB_CONNECTION_MODE == "pgbouncer":
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
 
 engine = create_async_engine(
     config.DATABASE_URL.get_secret_value(),
     echo=config.LOG_LEVEL == "DEBUG",
-    pool_pre_ping=True,
-    connect_args={"statement_cache_size": 0}
+    **engine_options(),
 )
 
 session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import BigInteger, String, DateTime, ForeignKey, Integer, Float, Date
+from sqlalchemy import BigInteger, String, DateTime, ForeignKey, Integer, Float, Date, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
@@ -26,22 +27,63 @@ class SessionStatus(str, Enum):
     cancelled = "cancelled"
     expired = "expired"
 
+class FuelEntryKind(str, Enum):
+    refuel = "refuel"          # Fuel came in (delivery to stock, poured into a tank)
+    burn = "burn"              # Consumed by a generator run
+    correction = "correction"  # Manual fix / opening balance
+    transfer = "transfer"      # Taken out of stock for the tanks
+
 class User(Base):
     __tablename__ = "users"
     
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    name: Mapped[str] = mapped_column(String)
-    sheet_name: Mapped[str] = mapped_column(String, nullable=True)
+    name: Mapped[str] = mapped_column(String, index=True)
+    sheet_name: Mapped[str] = mapped_column(String, nullable=True, index=True)
     role: Mapped[UserRole] = mapped_column(
         pgENUM(UserRole, name="userrole", create_type=False),
         default=UserRole.worker
     )
 
+    @property
+    def display_name(self) -> str:
+        """Prefer sheet_name (Google Sheets name), fallback to Telegram name"""
+        return self.sheet_name or self.name or str(self.id)
+
 class Inventory(Base):
     __tablename__ = "inventory"
     
     id: Mapped[int] = mapped_column(primary_key=True)
-    fuel_cans: Mapped[int] = mapped_column(Integer, default=0)
+    fuel_liters: Mapped[int] = mapped_column(Integer, default=0)
+
+class FuelLedgerEntry(Base):
+    """
+    Append-only fuel journal: every change of `inventory.fuel_liters` (account
+    "stock") and of `generators.fuel_level` (account "gen:<generator id>").
+    Written in the same statement as the balance it changes, see FuelLedgerRepository.
+    """
+    __tablename__ = "fuel_ledger"
+    __table_args__ = (Index("ix_fuel_ledger_account_created_at", "account", "created_at"),)
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account: Mapped[str] = mapped_column(String)  # "stock" or "gen:<id>"
+    kind: Mapped[str] = mapped_column(String)  # FuelEntryKind
+    delta: Mapped[float] = mapped_column(Float)  # Applied change, litres (after clamping at 0)
+    balance_after: Mapped[float] = mapped_column(Float)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    session_id: Mapped[int] = mapped_column(Integer, nullable=True)  # RefuelSession.id, no FK like logs
+    note: Mapped[str] = mapped_column(String, nullable=True)  # Source action: TAKE_FUEL, ADD_FUEL, OPENING...
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class FuelSnapshot(Base):
+    """Balance of an account at `taken_at`, covering ledger entries up to `ledger_id`."""
+    __tablename__ = "fuel_snapshots"
+    __table_args__ = (Index("ix_fuel_snapshots_account_taken_at", "account", "taken_at"),)
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    account: Mapped[str] = mapped_column(String)
+    taken_at: Mapped[datetime] = mapped_column(DateTime)
+    balance: Mapped[float] = mapped_column(Float)  # Read from inventory / generators, not from the ledger
+    ledger_id: Mapped[int] = mapped_column(BigInteger, default=0)  # Last entry included (0 = none yet)
 
 class Generator(Base):
     __tablename__ = "generators"
@@ -60,13 +102,36 @@ class Generator(Base):
     last_maintenance: Mapped[datetime] = mapped_column(DateTime, nullable=True)
 
 class LogEvent(Base):
+    """Partitioned by month on `timestamp` (logs_YYYY_MM), see LogRepository.ensure_partitions."""
     __tablename__ = "logs"
+    __table_args__ = (
+        Index("ix_logs_action_timestamp", "action", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     action: Mapped[str] = mapped_column(String)
-    details: Mapped[str] = mapped_column(String, nullable=True)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    details: Mapped[str] = mapped_column(String, nullable=True)  # Human readable text
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.utcnow)  # Partition key
+    
+    # Structured data, so reports aggregate in SQL instead of parsing `details`
+    quantity: Mapped[float] = mapped_column(Float, nullable=True)  # Litres (taken, added, burned...)
+    generator: Mapped[str] = mapped_column(String, nullable=True)
+    session_id: Mapped[int] = mapped_column(Integer, nullable=True)  # RefuelSession.id (no FK, sessions may be re-created)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=True)
+
+class DailyFuelRollup(Base):
+    """Per day (UTC) and generator totals, kept up to date by LogRepository.log_action."""
+    __tablename__ = "daily_fuel_rollup"
+    
+    day: Mapped[datetime] = mapped_column(Date, primary_key=True)
+    generator: Mapped[str] = mapped_column(String, primary_key=True, default="")  # "" = not tied to a generator
+    liters_taken: Mapped[float] = mapped_column(Float, default=0.0)  # Taken from stock (TAKE_FUEL)
+    liters_added: Mapped[float] = mapped_column(Float, default=0.0)  # Poured into the tank (REFUEL_GEN)
+    liters_burned: Mapped[float] = mapped_column(Float, default=0.0)  # Estimated burn of finished runs (STOP_GEN)
+    run_hours: Mapped[float] = mapped_column(Float, default=0.0)  # Attributed to the day the run ended
+    starts: Mapped[int] = mapped_column(Integer, default=0)
 
 class WorkerShift(Base):
     __tablename__ = "worker_shifts"
@@ -82,9 +147,17 @@ class WorkerShift(Base):
 
 class RefuelSession(Base):
     __tablename__ = "refuel_sessions"
+    __table_args__ = (
+        Index("ix_refuel_sessions_status_start_time", "status", "start_time"),
+        Index("ix_refuel_sessions_start_time_id", "start_time", "id"),  # Keyset pagination
+        # One live session per outage block (manual sessions have no block_start)
+        Index("uq_refuel_sessions_block", "block_start", "deadline", unique=True,
+              postgresql_where=text("status != 'cancelled'")),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     start_time: Mapped[datetime] = mapped_column(DateTime) # Estimated outage start
+    block_start: Mapped[datetime] = mapped_column(DateTime, nullable=True) # Scheduled outage block start (None for manual sessions)
     end_time: Mapped[datetime] = mapped_column(DateTime, nullable=True) # Actual completion time
     deadline: Mapped[datetime] = mapped_column(DateTime)  # Expected power restoration (deadline)
     status: Mapped[str] = mapped_column(String, default=SessionStatus.pending.value)
@@ -100,4 +173,28 @@ class RefuelSession(Base):
     notes: Mapped[str] = mapped_column(String, nullable=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    completed_by: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    completed_by_id: Mapped[int] = mapped_column("completed_by", ForeignKey("users.id"), nullable=True)
+    
+    # Not lazy-loadable under asyncio: load with SessionRepository.*_with_workers (joined)
+    worker1: Mapped["User"] = relationship(foreign_keys=[worker1_id], lazy="raise")
+    worker2: Mapped["User"] = relationship(foreign_keys=[worker2_id], lazy="raise")
+    completed_by: Mapped["User"] = relationship(foreign_keys=[completed_by_id], lazy="raise")
+
+class SessionMessage(Base):
+    """Live session card: the message each recipient got for a refuel session."""
+    __tablename__ = "session_messages"
+    __table_args__ = (UniqueConstraint("session_id", "chat_id"),)
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    session_id: Mapped[int] = mapped_column(ForeignKey("refuel_sessions.id", ondelete="CASCADE"))
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[int] = mapped_column(BigInteger)
+    role: Mapped[str] = mapped_column(String)  # "worker" or "admin"
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class LockFence(Base):
+    """Highest fencing token that committed under a Redis lock, see RedisLock.fence."""
+    __tablename__ = "lock_fences"
+    
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    token: Mapped[int] = mapped_column(BigInteger)
@@ -0,0 +1,18 @@
+from redis import ConnectionPool
+from redis.asyncio import Redis
+from bot.config import config
+
+# socket_keepalive and retry options prevent connection drops (WinError 64)
+REDIS_OPTIONS = dict(
+    socket_keepalive=True,
+    socket_connect_timeout=10,
+    retry_on_timeout=True,
+    health_check_interval=30
+)
+
+# Shared connection pool for FSM storage, outbox and other Redis users.
+redis_client = Redis.from_url(config.REDIS_URL.get_secret_value(), **REDIS_OPTIONS)
+
+def sync_redis_pool() -> ConnectionPool:
+    """Blocking pool with the same URL and options, for libraries without asyncio support (APScheduler job store)"""
+    return ConnectionPool.from_url(config.REDIS_URL.get_secret_value(), **REDIS_OPTIONS)
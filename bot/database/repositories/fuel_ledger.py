@@ -0,0 +1,143 @@
+from datetime import datetime
+from sqlalchemy import select, insert, func, literal, union_all, BigInteger, Integer, String, Float
+from bot.database.repositories.base import BaseRepository
+from bot.database.models import FuelLedgerEntry, FuelSnapshot, FuelEntryKind, Inventory, Generator
+
+STOCK = "stock"  # Ledger account of the warehouse
+GEN_PREFIX = "gen:"  # Generators: "gen:<id>", so history survives renames
+
+# Stock reasons (InventoryService) -> entry kind
+STOCK_KINDS = {
+    "ADD_FUEL": FuelEntryKind.refuel,
+    "TAKE_FUEL": FuelEntryKind.transfer,
+}
+
+
+def generator_account(gen_id: int) -> str:
+    return f"{GEN_PREFIX}{gen_id}"
+
+
+def generator_account_expr(gen_id):
+    """SQL counterpart of generator_account for a column / CTE column"""
+    return func.concat(GEN_PREFIX, gen_id)
+
+
+class FuelLedgerRepository(BaseRepository[FuelLedgerEntry]):
+    """
+    Current balances stay on `inventory` / `generators` (O(1) reads), the
+    ledger is their history. A past balance is the nearest snapshot before
+    that moment plus the ledger tail written after the snapshot.
+
+    A generator's burn is journaled when its run ends (like `fuel_level`
+    itself is charged then), so balances of a generator account at moments
+    inside a run do not include the fuel burned so far in that run.
+    """
+    def __init__(self, session):
+        super().__init__(session, FuelLedgerEntry)
+
+    @staticmethod
+    def journal(changed, account, kind: FuelEntryKind, user_id: int | None = None,
+                session_id: int | None = None, note: str | None = None):
+        """
+        INSERT ... SELECT appending an entry for every row of `changed`, a CTE
+        (usually UPDATE ... RETURNING) exposing `delta` and `balance` columns.
+        Lets repositories change a balance and journal it in one statement.
+        `account` is a name or an expression over `changed` (generator_account_expr).
+        """
+        return insert(FuelLedgerEntry).from_select(
+            ["account", "kind", "delta", "balance_after", "user_id", "session_id", "note"],
+            select(
+                literal(account, String) if isinstance(account, str) else account,
+                literal(kind.value, String),
+                changed.c.delta,
+                changed.c.balance,
+                literal(user_id, BigInteger),
+                literal(session_id, Integer),
+                literal(note, String),
+            ),
+        )
+
+    async def record(self, account: str, kind: FuelEntryKind, delta: float, balance_after: float,
+                     user_id: int | None = None, session_id: int | None = None, note: str | None = None):
+        """Append one entry whose balance was already changed by another statement (burns)."""
+        stmt = insert(FuelLedgerEntry).values(
+            account=account, kind=kind.value, delta=delta, balance_after=balance_after,
+            user_id=user_id, session_id=session_id, note=note, created_at=datetime.utcnow(),
+        )
+        await self.session.execute(stmt)
+
+    async def take_snapshots(self, now: datetime | None = None) -> int:
+        """
+        Snapshot every account in one INSERT ... SELECT. Balances are read from
+        the live rows, not summed from the ledger, so point-in-time answers
+        re-anchor on the real figures even if something bypassed the ledger.
+        Returns the number of snapshots written.
+        """
+        now = now or datetime.utcnow()
+
+        def last_entry(account):
+            return (
+                select(func.coalesce(func.max(FuelLedgerEntry.id), 0))
+                .where(FuelLedgerEntry.account == account)
+                .scalar_subquery()
+            )
+
+        stock = select(
+            literal(STOCK, String),
+            func.coalesce(select(Inventory.fuel_liters).order_by(Inventory.id).limit(1).scalar_subquery(), 0)
+            .cast(Float),
+            last_entry(STOCK),
+        )
+        account = generator_account_expr(Generator.id)
+        generators = select(account, Generator.fuel_level, last_entry(account))
+        source = union_all(stock, generators).subquery("balances")
+
+        stmt = (
+            insert(FuelSnapshot)
+            .from_select(
+                ["account", "balance", "ledger_id", "taken_at"],
+                select(*source.c, literal(now)),
+            )
+            .returning(FuelSnapshot.id)
+        )
+        return len((await self.session.execute(stmt)).all())
+
+    async def balance_at(self, account: str, at: datetime) -> float:
+        """
+        Balance of `account` at `at`: latest snapshot taken at or before `at`
+        plus the entries after it, up to `at`. Both parts are index seeks on
+        (account, taken_at) / (account, created_at). For a generator inside a
+        run this is the level before the run's burn (see class docstring).
+        """
+        def snapshot(column):
+            return (
+                select(column)
+                .where(FuelSnapshot.account == account, FuelSnapshot.taken_at <= at)
+                .order_by(FuelSnapshot.taken_at.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+
+        tail = (
+            select(func.coalesce(func.sum(FuelLedgerEntry.delta), 0.0))
+            .where(
+                FuelLedgerEntry.account == account,
+                FuelLedgerEntry.id > func.coalesce(snapshot(FuelSnapshot.ledger_id), 0),
+                FuelLedgerEntry.created_at <= at,
+            )
+            .scalar_subquery()
+        )
+        stmt = select(func.coalesce(snapshot(FuelSnapshot.balance), 0.0) + tail)
+        return float((await self.session.execute(stmt)).scalar_one())
+
+    async def get_entries(self, account: str, since: datetime, until: datetime | None = None) -> list[FuelLedgerEntry]:
+        stmt = select(FuelLedgerEntry).where(FuelLedgerEntry.account == account, FuelLedgerEntry.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(FuelLedgerEntry.created_at < until)
+        result = await self.session.execute(stmt.order_by(FuelLedgerEntry.id))
+        return list(result.scalars().all())
+
+    async def replay_balance(self, account: str) -> float:
+        """Balance summed over the whole ledger (should equal the live figure)"""
+        stmt = select(func.coalesce(func.sum(FuelLedgerEntry.delta), 0.0)).where(FuelLedgerEntry.account == account)
+        return float((await self.session.execute(stmt)).scalar_one())
@@ -1,9 +1,15 @@
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import select, update, case, func, literal, or_
 from bot.database.repositories.base import BaseRepository
-from bot.database.models import Generator, GenStatus
+from bot.database.repositories.fuel_ledger import FuelLedgerRepository, generator_account_expr
+from bot.database.models import Generator, GenStatus, FuelLedgerEntry, FuelEntryKind
 
 class GeneratorRepository(BaseRepository[Generator]):
+    """
+    All mutations are single `UPDATE ... WHERE name = :n RETURNING ...` statements:
+    no SELECT before the write, and the returned row refreshes the identity map.
+    Fuel changes also append to the fuel ledger within the same statement.
+    """
     def __init__(self, session):
         super().__init__(session, Generator)
 
@@ -17,52 +23,178 @@ class GeneratorRepository(BaseRepository[Generator]):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def set_status(self, name: str, status: GenStatus, start_time: datetime | None = None) -> Generator:
-        gen = await self.get_by_name(name)
-        if gen:
-            gen.status = status
-            if start_time is not None:
-                gen.current_run_start = start_time
-            elif status == GenStatus.stopped:
-                gen.current_run_start = None
-        return gen
-
-    async def add_fuel(self, name: str, liters: int) -> int:
-        gen = await self.get_by_name(name)
-        if gen:
-            gen.fuel_level += liters
-            return gen.fuel_level
-        return 0
-
-    async def set_fuel_level(self, name: str, liters: float) -> float:
-        gen = await self.get_by_name(name)
-        if gen:
-            gen.fuel_level = liters
-            return gen.fuel_level
-        return 0.0
-    
+    async def _update_returning(self, name: str, returning, values: dict):
+        stmt = (
+            update(Generator)
+            .where(Generator.name == name)
+            .values(values)
+            .returning(returning)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def set_status(self, name: str, status: GenStatus, start_time: datetime | None = None) -> Generator | None:
+        values = {"status": status}
+        if start_time is not None:
+            values["current_run_start"] = start_time
+        elif status == GenStatus.stopped:
+            values["current_run_start"] = None
+        return await self._update_returning(name, Generator, values)
+
+    async def _update_fuel(self, name: str, level, kind: FuelEntryKind, note: str, user_id: int | None = None):
+        """Set `fuel_level` and journal the applied delta: locked read, UPDATE and INSERT in one statement."""
+        old = (
+            select(Generator.id, Generator.fuel_level)
+            .where(Generator.name == name)
+            .with_for_update()
+            .cte("old")
+        )
+        upd = (
+            update(Generator)
+            .where(Generator.id == old.c.id)
+            .values(fuel_level=level)
+            .returning(
+                Generator.id.label("gen_id"),
+                Generator.fuel_level.label("balance"),
+                (Generator.fuel_level - old.c.fuel_level).label("delta"),
+            )
+            .cte("upd")
+        )
+        stmt = (
+            FuelLedgerRepository.journal(upd, generator_account_expr(upd.c.gen_id), kind, user_id=user_id, note=note)
+            .returning(FuelLedgerEntry.balance_after)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def add_fuel(self, name: str, liters: float, user_id: int | None = None) -> float:
+        level = await self._update_fuel(name, Generator.fuel_level + liters, FuelEntryKind.refuel, "REFUEL_GEN", user_id)
+        return level if level is not None else 0
+
+    async def set_fuel_level(self, name: str, liters: float, user_id: int | None = None) -> float:
+        level = await self._update_fuel(name, liters, FuelEntryKind.correction, "CORRECT_FUEL", user_id)
+        return level if level is not None else 0.0
+
     async def get_consumption(self, name: str) -> float:
-        gen = await self.get_by_name(name)
-        return gen.consumption_rate if gen else 0.0
+        stmt = select(Generator.consumption_rate).where(Generator.name == name)
+        rate = (await self.session.execute(stmt)).scalar_one_or_none()
+        return rate if rate is not None else 0.0
 
-    async def update_specs(self, name: str, tank_capacity: float, consumption_rate: float) -> Generator | None:
-        gen = await self.get_by_name(name)
-        if gen:
-            gen.tank_capacity = tank_capacity
-            gen.consumption_rate = consumption_rate
-        return gen
+    async def update_specs(self, name: str, tank_capacity: float | None = None, consumption_rate: float | None = None) -> Generator | None:
+        """Only the given specs are changed. Returns None if the generator does not exist."""
+        values = {}
+        if tank_capacity is not None:
+            values["tank_capacity"] = tank_capacity
+        if consumption_rate is not None:
+            values["consumption_rate"] = consumption_rate
+        return await self._update_returning(name, Generator, values)
 
     async def rename_generator(self, old_name: str, new_name: str) -> bool:
-        gen = await self.get_by_name(old_name)
-        if gen:
-            gen.name = new_name
-            return True
-        return False
+        return await self._update_returning(old_name, Generator.id, {"name": new_name}) is not None
 
     async def update_total_hours(self, name: str, hours: float) -> bool:
-        gen = await self.get_by_name(name)
-        if gen:
-            gen.total_hours_run = hours
-            return True
-        return False
+        return await self._update_returning(name, Generator.id, {"total_hours_run": hours}) is not None
+
+    @staticmethod
+    def _transition_conditions(target: str | None, release: tuple[GenStatus, ...]) -> list:
+        conditions = [Generator.status.in_(release)] if release else []
+        if target is not None:
+            conditions.append(Generator.name == target)
+        return conditions
+
+    async def lock_for_transition(self,
+                                  target: str | None = None,
+                                  release: tuple[GenStatus, ...] = ()) -> list[tuple[str, GenStatus, datetime | None]]:
+        """
+        (name, status, current_run_start) of the rows `transition` would touch,
+        locked FOR UPDATE until commit, so the caller can decide (e.g. whether a
+        run ends) before the UPDATE without racing other instances.
+        """
+        conditions = self._transition_conditions(target, release)
+        if not conditions:
+            return []
+        stmt = (
+            select(Generator.name, Generator.status, Generator.current_run_start)
+            .where(or_(*conditions))
+            .with_for_update()
+        )
+        result = await self.session.execute(stmt)
+        return [(row[0], GenStatus(row[1]), row[2]) for row in result.all()]
 
+    async def transition(self,
+                         now: datetime,
+                         weather_factor: float,
+                         target: str | None = None,
+                         target_status: GenStatus | None = None,
+                         release: tuple[GenStatus, ...] = ()) -> list[tuple[Generator, GenStatus, datetime | None]]:
+        """
+        Switch generator states in one statement.
+
+        `target` gets `target_status`; every other generator whose status is in
+        `release` is stopped. Any generator that leaves the running state is
+        charged for its run (fuel burned at `consumption_rate * weather_factor`,
+        hours added to `total_hours_run`). Rows are locked via a FOR UPDATE
+        subquery which also exposes the pre-update status and run start.
+
+        Returns (generator, old_status, old_run_start) for every touched row.
+        """
+        conditions = self._transition_conditions(target, release)
+        if not conditions:
+            return []
+
+        old = (
+            select(
+                Generator.id.label("id"),
+                Generator.status.label("old_status"),
+                Generator.current_run_start.label("old_start"),
+            )
+            .where(or_(*conditions))
+            .with_for_update()
+            .subquery("old")
+        )
+
+        def status_literal(status: GenStatus):
+            # Typed so CASE results are genstatus, not text
+            return literal(status, type_=Generator.status.type)
+
+        is_target = Generator.name == target if target is not None else False
+        if target is not None:
+            new_status = case((is_target, status_literal(target_status)), else_=status_literal(GenStatus.stopped))
+        else:
+            new_status = GenStatus.stopped
+        keeps_running = (target_status == GenStatus.running) and target is not None
+        was_running = (old.c.old_status == GenStatus.running) & old.c.old_start.isnot(None)
+
+        # Hours of the run that ends now (negative durations are clamped like before)
+        run_hours = func.greatest(func.extract("epoch", now - old.c.old_start), 0) / 3600.0
+        ends_run = was_running & ~is_target if keeps_running else was_running
+
+        if keeps_running:
+            new_start = case(
+                (is_target & (old.c.old_status == GenStatus.running), old.c.old_start),
+                (is_target, now),
+                else_=None,
+            )
+        else:
+            new_start = None
+
+        stmt = (
+            update(Generator)
+            .where(Generator.id == old.c.id)
+            .values(
+                status=new_status,
+                current_run_start=new_start,
+                fuel_level=case(
+                    (ends_run, Generator.fuel_level - run_hours * Generator.consumption_rate * weather_factor),
+                    else_=Generator.fuel_level,
+                ),
+                total_hours_run=case(
+                    (ends_run, func.coalesce(Generator.total_hours_run, 0.0) + run_hours),
+                    else_=Generator.total_hours_run,
+                ),
+            )
+            .returning(Generator, old.c.old_status, old.c.old_start)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        return [(row[0], GenStatus(row[1]), row[2]) for row in result.all()]
@@ -1,38 +1,78 @@
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from bot.database.repositories.base import BaseRepository
-from bot.database.models import Inventory
+from bot.database.repositories.fuel_ledger import FuelLedgerRepository, STOCK, STOCK_KINDS
+from bot.database.models import Inventory, FuelLedgerEntry, FuelEntryKind
 
 class InventoryRepository(BaseRepository[Inventory]):
     def __init__(self, session):
         super().__init__(session, Inventory)
 
+    async def _ensure_row(self):
+        # Fallback if init.sql wasn't run perfectly or table is empty
+        self.session.add(Inventory(fuel_liters=0))
+        await self.session.flush()
+
     async def get_stock(self) -> int:
-        stmt = select(Inventory).limit(1)
-        result = await self.session.execute(stmt)
-        inventory = result.scalar_one_or_none()
-        if not inventory:
-            # Fallback if init.sql wasn't run perfectly or table is empty
-            inventory = Inventory(fuel_cans=0)
-            self.session.add(inventory)
-            await self.session.flush()
-        return inventory.fuel_cans
+        """Current stock in LITERS"""
+        stmt = select(Inventory.fuel_liters).order_by(Inventory.id).limit(1)
+        stock = (await self.session.execute(stmt)).scalar_one_or_none()
+        if stock is None:
+            await self._ensure_row()
+            return 0
+        return stock
 
-    async def update_stock(self, change: int) -> int:
+    async def update_stock(self, change: int, user_id: int | None = None, reason: str = "ADJUST") -> int:
         """
-        Updates stock by `change`. Can be positive (add) or negative (remove).
+        Updates stock by `change` litres. Can be positive (add) or negative (remove).
         Returns new stock level.
+
+        One statement: the stock row is locked, updated with
+        `GREATEST(0, fuel_liters + :change)` and the applied change is appended
+        to the fuel ledger (account "stock"), so concurrent refuels never lose
+        an update.
         """
         # We assume there is only one row in inventory for simplicity as per TZ
-        stmt = select(Inventory).limit(1)
-        result = await self.session.execute(stmt)
-        inventory = result.scalar_one_or_none()
-        
-        if not inventory:
-            inventory = Inventory(fuel_cans=0)
-            self.session.add(inventory)
-        
-        inventory.fuel_cans += change
-        if inventory.fuel_cans < 0:
-            inventory.fuel_cans = 0
-            
-        return inventory.fuel_cans
+        old = (
+            select(Inventory.id, Inventory.fuel_liters)
+            .order_by(Inventory.id)
+            .limit(1)
+            .with_for_update()
+            .cte("old")
+        )
+        upd = (
+            update(Inventory)
+            .where(Inventory.id == old.c.id)
+            .values(fuel_liters=func.greatest(0, Inventory.fuel_liters + change))
+            .returning(
+                Inventory.fuel_liters.label("balance"),
+                (Inventory.fuel_liters - old.c.fuel_liters).label("delta"),
+            )
+            .cte("upd")
+        )
+        kind = STOCK_KINDS.get(reason, FuelEntryKind.correction)
+        stmt = (
+            FuelLedgerRepository.journal(upd, STOCK, kind, user_id=user_id, note=reason)
+            .returning(FuelLedgerEntry.balance_after)
+        )
+
+        balance = (await self.session.execute(stmt)).scalar_one_or_none()
+        if balance is None:
+            await self._ensure_row()
+            balance = (await self.session.execute(stmt)).scalar_one()
+        return int(balance)
+
+    async def get_summary(self, days: int) -> tuple[int, object, float]:
+        """
+        Warehouse screen in one query: (stock litres, last ADD_FUEL time,
+        litres taken in the last `days` days). The last refill is an
+        index-backed subquery on logs, the total comes from daily_fuel_rollup.
+        """
+        from bot.database.repositories.logs import LogRepository
+        from bot.database.repositories.rollup import RollupRepository
+        stmt = select(
+            select(Inventory.fuel_liters).order_by(Inventory.id).limit(1).scalar_subquery(),
+            LogRepository.last_timestamp_expr("ADD_FUEL"),
+            RollupRepository.window_expr("liters_taken", days),
+        )
+        stock, last_refill, taken = (await self.session.execute(stmt)).one()
+        return stock or 0, last_refill, float(taken)
@@ -0,0 +1,25 @@
+from sqlalchemy.dialects.postgresql import insert
+from bot.database.repositories.base import BaseRepository
+from bot.database.models import LockFence
+
+class LockFenceRepository(BaseRepository[LockFence]):
+    def __init__(self, session):
+        super().__init__(session, LockFence)
+
+    async def advance(self, name: str, token: int) -> bool:
+        """
+        Record `token` as the latest holder of `name` in the current
+        transaction. False if a newer token already committed. The row stays
+        locked until commit, so an older holder can't commit after a newer one.
+        """
+        stmt = (
+            insert(LockFence)
+            .values(name=name, token=token)
+            .on_conflict_do_update(
+                index_elements=[LockFence.name],
+                set_={"token": token},
+                where=LockFence.token <= token,
+            )
+            .returning(LockFence.token)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none() is not None
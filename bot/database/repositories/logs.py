@@ -1,3 +1,8 @@
+import asyncio
+from datetime import date, datetime
+from typing import AsyncIterator
+from sqlalchemy import select, desc, delete, func, text
+from bot.database.log_archive import LogArchive, month_start, next_month
 from bot.database.repositories.base import BaseRepository
 from bot.database.models import LogEvent
 
@@ -5,22 +10,169 @@ class LogRepository(BaseRepository[LogEvent]):
     def __init__(self, session):
         super().__init__(session, LogEvent)
 
-    async def log_action(self, user_id: int, action: str, details: str | None = None):
-        event = LogEvent(user_id=user_id, action=action, details=details)
+    async def log_action(self,
+                         user_id: int,
+                         action: str,
+                         details: str | None = None,
+                         quantity: float | None = None,
+                         generator: str | None = None,
+                         session_id: int | None = None,
+                         payload: dict | None = None):
+        from bot.database.repositories.rollup import RollupRepository
+        event = LogEvent(user_id=user_id, action=action, details=details, timestamp=datetime.utcnow(),
+                         quantity=quantity, generator=generator, session_id=session_id, payload=payload)
         self.session.add(event)
+        # Daily totals are maintained in the same transaction as the event
+        await RollupRepository(self.session).apply(event)
 
     async def get_last_action(self, action: str) -> LogEvent | None:
-        from sqlalchemy import select, desc
         stmt = select(LogEvent).where(LogEvent.action == action).order_by(desc(LogEvent.timestamp)).limit(1)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def get_actions_since(self, action: str, since_date) -> list[LogEvent]:
-        from sqlalchemy import select
         stmt = select(LogEvent).where(LogEvent.action == action, LogEvent.timestamp >= since_date)
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    # --- SQL-side aggregation (served by ix_logs_action_timestamp) ---
+
+    @staticmethod
+    def _window(action: str, since: datetime | None = None, until: datetime | None = None, generator: str | None = None) -> list:
+        conditions = [LogEvent.action == action]
+        if since is not None:
+            conditions.append(LogEvent.timestamp >= since)
+        if until is not None:
+            conditions.append(LogEvent.timestamp < until)
+        if generator is not None:
+            conditions.append(LogEvent.generator == generator)
+        return conditions
+
+    @classmethod
+    def total_quantity_expr(cls, action: str, since: datetime | None = None, until: datetime | None = None, generator: str | None = None):
+        """Scalar subquery: SUM(quantity) of `action` in the window (0 if none)."""
+        return (
+            select(func.coalesce(func.sum(LogEvent.quantity), 0.0))
+            .where(*cls._window(action, since, until, generator))
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    def last_timestamp_expr(action: str):
+        """Scalar subquery: time of the latest `action` (backward index scan)."""
+        return select(func.max(LogEvent.timestamp)).where(LogEvent.action == action).scalar_subquery()
+
+    async def aggregate(self, action: str, since: datetime | None = None, until: datetime | None = None, generator: str | None = None) -> dict:
+        """Count, sum and average of `quantity` for `action` in one query."""
+        stmt = select(
+            func.count(LogEvent.id),
+            func.coalesce(func.sum(LogEvent.quantity), 0.0),
+            func.avg(LogEvent.quantity),
+        ).where(*self._window(action, since, until, generator))
+        count, total, average = (await self.session.execute(stmt)).one()
+        return {"count": count, "total": float(total), "average": float(average) if average is not None else 0.0}
+
+    async def sum_quantity(self, action: str, since: datetime | None = None, until: datetime | None = None, generator: str | None = None) -> float:
+        return (await self.aggregate(action, since, until, generator))["total"]
+
+    async def daily_totals(self, action: str, since: datetime, until: datetime | None = None) -> list[tuple[datetime, float]]:
+        """SUM(quantity) of `action` per day: [(day, litres), ...]"""
+        day = func.date_trunc("day", LogEvent.timestamp).label("day")
+        stmt = (
+            select(day, func.sum(LogEvent.quantity))
+            .where(*self._window(action, since, until))
+            .group_by(day)
+            .order_by(day)
+        )
+        result = await self.session.execute(stmt)
+        return [(row[0], float(row[1] or 0.0)) for row in result.all()]
+
+    # --- Partitions & archive ---
+
+    @staticmethod
+    def partition_name(month: date) -> str:
+        return f"logs_{month:%Y_%m}"
+
+    async def ensure_partitions(self, months_ahead: int, start: date | None = None):
+        """
+        Create monthly partitions from `start` (default: this month) up to
+        `months_ahead` months ahead. Rows of that month already sitting in
+        the DEFAULT partition (CREATE ... PARTITION OF would fail) are moved
+        into the new table before it is attached.
+        """
+        existing = {name for name, _ in await self.get_partitions()}
+        month = month_start(start or datetime.utcnow())
+        for _ in range(months_ahead + 1):
+            name = self.partition_name(month)
+            if name not in existing:
+                bounds = f"timestamp >= '{month}' AND timestamp < '{next_month(month)}'"
+                await self.session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} (LIKE logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ))
+                await self.session.execute(text(
+                    f"WITH moved AS (DELETE FROM logs_default WHERE {bounds} RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ))
+                await self.attach_partition(name, month)
+            month = next_month(month)
+
+    async def get_partitions(self) -> list[tuple[str, date]]:
+        """Attached monthly partitions as (table name, month), oldest first. The DEFAULT partition is skipped."""
+        result = await self.session.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'logs'::regclass
+        """))
+        partitions = []
+        for (name,) in result.all():
+            try:
+                partitions.append((name, datetime.strptime(name, "logs_%Y_%m").date()))
+            except ValueError:
+                continue
+        return sorted(partitions, key=lambda p: p[1])
+
+    async def attach_partition(self, name: str, month: date):
+        await self.session.execute(text(
+            f"ALTER TABLE logs ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+        ))
+
+    async def detach_partition(self, name: str):
+        """
+        Detach a partition; the table is kept until drop_partition. This takes
+        ACCESS EXCLUSIVE on `logs` (CONCURRENTLY is not allowed next to a
+        DEFAULT partition), so commit right after it.
+        """
+        await self.session.execute(text(f"ALTER TABLE logs DETACH PARTITION {name}"))
+
+    async def stream_partition(self, name: str, chunk: int = 1000) -> AsyncIterator[list[dict]]:
+        """Rows of a (detached) partition, `chunk` at a time from a server-side cursor"""
+        result = await self.session.stream(text(f"SELECT * FROM {name} ORDER BY timestamp, id"))
+        async for rows in result.mappings().partitions(chunk):
+            yield [dict(row) for row in rows]
+
+    async def drop_partition(self, name: str):
+        await self.session.execute(text(f"DROP TABLE {name}"))
+
+    async def get_history(self,
+                          since: datetime,
+                          until: datetime | None = None,
+                          action: str | None = None,
+                          archive: LogArchive | None = None) -> list[LogEvent]:
+        """
+        Events with since <= timestamp < until, from archived months and the
+        live table, oldest first. Archived rows are returned as detached
+        LogEvent objects.
+        """
+        until = until or datetime.utcnow()
+        archive = archive or LogArchive()
+        archived = await asyncio.to_thread(lambda: list(archive.read(since, until, action)))
+        events = [LogEvent(**row) for row in archived]
+
+        stmt = select(LogEvent).where(LogEvent.timestamp >= since, LogEvent.timestamp < until)
+        if action is not None:
+            stmt = stmt.where(LogEvent.action == action)
+        result = await self.session.execute(stmt.order_by(LogEvent.timestamp, LogEvent.id))
+        return events + list(result.scalars().all())
+
     async def clear_all(self):
-        from sqlalchemy import delete
         await self.session.execute(delete(LogEvent))
@@ -0,0 +1,125 @@
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, delete, func, text, Float, cast
+from sqlalchemy.dialects.postgresql import insert
+from bot.database.repositories.base import BaseRepository
+from bot.database.models import DailyFuelRollup, LogEvent
+
+# How each log action feeds the rollup: action -> {column: source}
+# "quantity" = LogEvent.quantity, "runtime" = run hours of the event, "one" = count
+ROLLUP_ACTIONS = {
+    "TAKE_FUEL": {"liters_taken": "quantity"},
+    "REFUEL_GEN": {"liters_added": "quantity"},
+    "STOP_GEN": {"liters_burned": "quantity", "run_hours": "runtime"},
+    "START_GEN": {"starts": "one"},
+}
+COUNTERS = ("liters_taken", "liters_added", "liters_burned", "run_hours", "starts")
+
+
+def _window(days: int, generator: str | None = None) -> list:
+    # Rollup days are UTC, like log timestamps
+    conditions = [DailyFuelRollup.day > datetime.utcnow().date() - timedelta(days=days)]
+    if generator is not None:
+        conditions.append(DailyFuelRollup.generator == generator)
+    return conditions
+
+
+class RollupRepository(BaseRepository[DailyFuelRollup]):
+    def __init__(self, session):
+        super().__init__(session, DailyFuelRollup)
+
+    async def apply(self, event: LogEvent):
+        """Add one log event to its day/generator row (upsert, same transaction as the event)."""
+        mapping = ROLLUP_ACTIONS.get(event.action)
+        if not mapping:
+            return
+
+        sources = {
+            "quantity": event.quantity or 0.0,
+            "runtime": (event.payload or {}).get("runtime_hours", 0.0),
+            "one": 1,
+        }
+        increments = {column: sources[source] for column, source in mapping.items()}
+        values = {column: 0 for column in COUNTERS} | increments
+
+        stmt = insert(DailyFuelRollup).values(
+            day=event.timestamp.date(), generator=event.generator or "", **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyFuelRollup.day, DailyFuelRollup.generator],
+            set_={column: getattr(DailyFuelRollup, column) + stmt.excluded[column] for column in increments},
+        )
+        await self.session.execute(stmt)
+
+    async def backfill(self, since: date | None = None) -> int:
+        """
+        Rebuild rollup rows from raw logs (all history, or from `since`).
+        Existing rows in the range are replaced. Months already archived by
+        log retention are no longer in `logs`, so the range never starts
+        before the oldest live partition: their rollup rows are kept.
+        Returns the number of rows written.
+        """
+        from bot.database.repositories.logs import LogRepository
+        partitions = await LogRepository(self.session).get_partitions()
+        if partitions and (since is None or since < partitions[0][1]):
+            since = partitions[0][1]
+            logging.info(f"Rollup backfill: keeping rows before {since} (archived logs)")
+
+        day = cast(LogEvent.timestamp, DailyFuelRollup.day.type).label("day")
+        generator = func.coalesce(LogEvent.generator, "").label("generator")
+        # Old STOP_GEN rows have no payload, their run time is only in `details`
+        runtime = func.coalesce(
+            cast(LogEvent.payload["runtime_hours"].astext, Float),
+            cast(func.substring(LogEvent.details, text("'Runtime: ([0-9.]+)h'")), Float),
+            0.0,
+        )
+
+        def total(action: str, expr):
+            return func.coalesce(func.sum(expr).filter(LogEvent.action == action), 0)
+
+        source = (
+            select(
+                day,
+                generator,
+                total("TAKE_FUEL", LogEvent.quantity),
+                total("REFUEL_GEN", LogEvent.quantity),
+                total("STOP_GEN", LogEvent.quantity),
+                total("STOP_GEN", runtime),
+                func.count().filter(LogEvent.action == "START_GEN"),
+            )
+            .where(LogEvent.action.in_(ROLLUP_ACTIONS))
+            .group_by(text("1"), text("2"))  # By position: bound parameters can't be matched in GROUP BY
+        )
+        clear = delete(DailyFuelRollup)
+        if since is not None:
+            source = source.where(LogEvent.timestamp >= datetime.combine(since, datetime.min.time()))
+            clear = clear.where(DailyFuelRollup.day >= since)
+
+        await self.session.execute(clear)
+        result = await self.session.execute(
+            insert(DailyFuelRollup).from_select(["day", "generator", *COUNTERS], source)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def window_expr(column: str, days: int, generator: str | None = None):
+        """Scalar subquery: SUM(column) over the last `days` days (today included)."""
+        conditions = _window(days, generator)
+        return (
+            select(func.coalesce(func.sum(getattr(DailyFuelRollup, column)), 0.0))
+            .where(*conditions)
+            .scalar_subquery()
+        )
+
+    async def totals(self, days: int, generator: str | None = None) -> dict:
+        """All counters summed over the last `days` days."""
+        conditions = _window(days, generator)
+        stmt = select(*(func.coalesce(func.sum(getattr(DailyFuelRollup, c)), 0) for c in COUNTERS)).where(*conditions)
+        row = (await self.session.execute(stmt)).one()
+        return dict(zip(COUNTERS, row))
+
+    async def get_days(self, days: int, generator: str | None = None) -> list[DailyFuelRollup]:
+        conditions = _window(days, generator)
+        stmt = select(DailyFuelRollup).where(*conditions).order_by(DailyFuelRollup.day, DailyFuelRollup.generator)
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
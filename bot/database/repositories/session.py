@@ -1,11 +1,22 @@
 from datetime import datetime
-from typing import Optional, List
-from sqlalchemy import select, update, and_
+from typing import Optional, List, NamedTuple
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.models import RefuelSession, SessionStatus
 
+class SessionPage(NamedTuple):
+    items: List[RefuelSession]  # Newest first
+    has_older: bool
+    has_newer: bool
+
 class SessionRepository:
+    """
+    Unit of work: methods only flush, the caller commits once per use case.
+    Updates return the row via RETURNING, no second SELECT.
+    """
     def __init__(self, session: AsyncSession):
         self.session = session
         
@@ -13,17 +24,45 @@ class SessionRepository:
                              start_time: datetime, 
                              deadline: datetime, 
                              worker1_id: Optional[int] = None, 
-                             worker2_id: Optional[int] = None) -> RefuelSession:
+                             worker2_id: Optional[int] = None,
+                             block_start: Optional[datetime] = None) -> Optional[RefuelSession]:
+        """
+        Sessions of an outage block (block_start set) are unique per
+        (block_start, deadline) among non-cancelled ones: a concurrent
+        duplicate is skipped by ON CONFLICT and None is returned.
+        """
+        if block_start is not None:
+            stmt = (
+                insert(RefuelSession)
+                .values(
+                    start_time=start_time,
+                    block_start=block_start,
+                    deadline=deadline,
+                    worker1_id=worker1_id,
+                    worker2_id=worker2_id,
+                    status=SessionStatus.pending.value,
+                    created_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[RefuelSession.block_start, RefuelSession.deadline],
+                    index_where=RefuelSession.status != SessionStatus.cancelled.value,
+                )
+                .returning(RefuelSession)
+            )
+            result = await self.session.execute(stmt)
+            return result.scalar_one_or_none()
+        
         new_session = RefuelSession(
             start_time=start_time,
+            block_start=block_start,
             deadline=deadline,
             worker1_id=worker1_id,
             worker2_id=worker2_id,
             status=SessionStatus.pending
         )
         self.session.add(new_session)
-        await self.session.commit()
-        await self.session.refresh(new_session)
+        # INSERT ... RETURNING id, all other values are already set
+        await self.session.flush()
         return new_session
         
     async def get_active_session(self) -> Optional[RefuelSession]:
@@ -38,11 +77,19 @@ class SessionRepository:
     async def get_session_by_id(self, session_id: int) -> Optional[RefuelSession]:
         return await self.session.get(RefuelSession, session_id)
         
+    async def _update_returning(self, session_id: int, **values) -> Optional[RefuelSession]:
+        stmt = (
+            update(RefuelSession)
+            .where(RefuelSession.id == session_id)
+            .values(**values)
+            .returning(RefuelSession)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+        
     async def update_status(self, session_id: int, status: SessionStatus) -> Optional[RefuelSession]:
-        stmt = update(RefuelSession).where(RefuelSession.id == session_id).values(status=status)
-        await self.session.execute(stmt)
-        await self.session.commit()
-        return await self.get_session_by_id(session_id)
+        return await self._update_returning(session_id, status=status)
         
     async def complete_session(self, 
                                session_id: int, 
@@ -51,20 +98,84 @@ class SessionRepository:
                                liters: float, 
                                cans: float, 
                                notes: str = None) -> Optional[RefuelSession]:
-        stmt = update(RefuelSession).where(RefuelSession.id == session_id).values(
+        return await self._update_returning(
+            session_id,
             status=SessionStatus.completed,
             end_time=datetime.utcnow(),
-            completed_by=completed_by,
+            completed_by_id=completed_by,
             gen_name=gen_name,
             liters=liters,
             cans=cans,
             notes=notes
         )
-        await self.session.execute(stmt)
-        await self.session.commit()
-        return await self.get_session_by_id(session_id)
         
     async def get_history(self, limit: int = 10) -> List[RefuelSession]:
         stmt = select(RefuelSession).order_by(RefuelSession.start_time.desc()).limit(limit)
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
+
+    async def get_history_with_workers(self, limit: int = 10) -> List[RefuelSession]:
+        """Latest sessions with worker1/worker2 loaded in the same SELECT (LEFT JOIN users)"""
+        stmt = (
+            select(RefuelSession)
+            .options(joinedload(RefuelSession.worker1), joinedload(RefuelSession.worker2))
+            .order_by(RefuelSession.start_time.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_page(self,
+                       limit: int,
+                       status: Optional[str] = None,
+                       since: Optional[datetime] = None,
+                       key: Optional[tuple[datetime, int]] = None,
+                       direction: str = "n") -> SessionPage:
+        """
+        Keyset page on (start_time, id) with workers joined, newest first.
+        `key` is the (start_time, id) of the page edge: direction "n" returns
+        sessions older than it, "p" newer ones. Served by the
+        (start_time, id) index, so every page costs the same.
+        """
+        stmt = select(RefuelSession).options(
+            joinedload(RefuelSession.worker1), joinedload(RefuelSession.worker2)
+        )
+        if status:
+            stmt = stmt.where(RefuelSession.status == status)
+        if since:
+            stmt = stmt.where(RefuelSession.start_time >= since)
+
+        sort_key = tuple_(RefuelSession.start_time, RefuelSession.id)
+        newer = key is not None and direction == "p"
+        if key is not None:
+            stmt = stmt.where(sort_key > tuple_(*key) if newer else sort_key < tuple_(*key))
+        if newer:
+            stmt = stmt.order_by(RefuelSession.start_time.asc(), RefuelSession.id.asc())
+        else:
+            stmt = stmt.order_by(RefuelSession.start_time.desc(), RefuelSession.id.desc())
+
+        # One extra row tells whether there is another page in this direction
+        result = await self.session.execute(stmt.limit(limit + 1))
+        items = list(result.scalars().all())
+        has_more = len(items) > limit
+        items = items[:limit]
+
+        if newer:
+            items.reverse()
+            return SessionPage(items, has_older=True, has_newer=has_more)
+        return SessionPage(items, has_older=has_more, has_newer=key is not None)
+
+    async def get_session_with_workers(self, session_id: int) -> Optional[RefuelSession]:
+        """One session with worker1, worker2 and completed_by in one joined SELECT"""
+        stmt = (
+            select(RefuelSession)
+            .options(
+                joinedload(RefuelSession.worker1),
+                joinedload(RefuelSession.worker2),
+                joinedload(RefuelSession.completed_by),
+            )
+            .where(RefuelSession.id == session_id)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
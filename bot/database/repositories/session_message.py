@@ -0,0 +1,23 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from bot.database.repositories.base import BaseRepository
+from bot.database.models import SessionMessage
+
+class SessionMessageRepository(BaseRepository[SessionMessage]):
+    def __init__(self, session):
+        super().__init__(session, SessionMessage)
+
+    async def save(self, session_id: int, chat_id: int, message_id: int, role: str):
+        """Remember (or replace) the card message of a recipient for a session"""
+        stmt = insert(SessionMessage).values(
+            session_id=session_id, chat_id=chat_id, message_id=message_id, role=role
+        ).on_conflict_do_update(
+            index_elements=[SessionMessage.session_id, SessionMessage.chat_id],
+            set_={"message_id": message_id, "role": role}
+        )
+        await self.session.execute(stmt)
+
+    async def get_for_session(self, session_id: int) -> list[SessionMessage]:
+        stmt = select(SessionMessage).where(SessionMessage.session_id == session_id)
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
@@ -1,6 +1,20 @@
-from sqlalchemy import select
+import asyncio
+from sqlalchemy import select, event
 from bot.database.repositories.base import BaseRepository
 from bot.database.models import User, UserRole
+from bot.database.user_cache import user_cache, CachedUser
+
+PENDING_INVALIDATIONS = "user_cache_pending"
+
+# Invalidations started after commit; the loop only keeps weak references to tasks
+_invalidations: set[asyncio.Task] = set()
+
+def _invalidate_after_commit(sync_session):
+    user_ids = sync_session.info.pop(PENDING_INVALIDATIONS, set())
+    if user_ids:
+        task = asyncio.get_running_loop().create_task(user_cache.invalidate(*user_ids))
+        _invalidations.add(task)
+        task.add_done_callback(_invalidations.discard)
 
 class UserRepository(BaseRepository[User]):
     def __init__(self, session):
@@ -9,6 +23,32 @@ class UserRepository(BaseRepository[User]):
     async def get_by_id(self, user_id: int) -> User | None:
         return await self.session.get(User, user_id)
 
+    async def get_cached(self, user_id: int) -> CachedUser | None:
+        """User snapshot for role checks: served from the cache, DB only on a miss"""
+        hit, user = await user_cache.lookup(user_id)
+        if hit:
+            return user
+        return await self.load_cached(user_id)
+
+    async def load_cached(self, user_id: int) -> CachedUser | None:
+        """Cache miss: read the user from the DB and cache it (an unknown id too, briefly)"""
+        db_user = await self.get_by_id(user_id)
+        if db_user is None:
+            await user_cache.set_missing(user_id)
+            return None
+        user = CachedUser.from_user(db_user)
+        await user_cache.set(user)
+        return user
+
+    async def _invalidate(self, user_id: int):
+        await user_cache.invalidate(user_id)
+        # A concurrent reader may re-cache the old row before we commit: drop it again afterwards
+        pending = self.session.info.get(PENDING_INVALIDATIONS)
+        if pending is None:
+            pending = self.session.info[PENDING_INVALIDATIONS] = set()
+            event.listen(self.session.sync_session, "after_commit", _invalidate_after_commit, once=True)
+        pending.add(user_id)
+
     async def create_or_update(self, user_id: int, name: str, role: UserRole = UserRole.worker) -> User:
         # Check against config
         from bot.config import config
@@ -46,6 +86,7 @@ class UserRepository(BaseRepository[User]):
                 if user.role == UserRole.blocked:
                     user.role = UserRole.worker
 
+        await self._invalidate(user_id)
         return user
     
     async def get_admins(self) -> list[User]:
@@ -78,4 +119,5 @@ class UserRepository(BaseRepository[User]):
         if user:
             user.sheet_name = sheet_name
             await self.session.flush()
+            await self._invalidate(user_id)
         return user
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from bot.config import config
+from bot.database.models import User, UserRole
+from bot.database.redis_client import redis_client
+
+KEY_PREFIX = "user:"
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+class CachedUser(BaseModel):
+    """Read-only snapshot of a `User` row, safe to keep outside a DB session."""
+    id: int
+    name: str
+    sheet_name: str | None = None
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(id=user.id, name=user.name, sheet_name=user.sheet_name, role=user.role)
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.admin
+
+    @property
+    def is_blocked(self) -> bool:
+        return self.role == UserRole.blocked
+
+
+class UserCache:
+    """
+    Two-level user cache: in-process LRU with TTL in front of Redis.
+
+    Redis makes a fresh entry visible to every bot instance; `invalidate`
+    deletes it there and publishes the id, so other instances drop their
+    local copy too (see `listen_invalidations`). Ids that are not in the
+    database are cached as "not found" for USER_CACHE_MISS_TTL (an empty
+    value in Redis), so unknown senders don't cost a query per update.
+    Redis errors never break a lookup, the caller simply falls back to the
+    database.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.local: OrderedDict[int, tuple[float, CachedUser | None]] = OrderedDict()
+
+    def _get_local(self, user_id: int) -> tuple[bool, CachedUser | None]:
+        entry = self.local.get(user_id)
+        if entry is None:
+            return False, None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self.local[user_id]
+            return False, None
+        self.local.move_to_end(user_id)
+        return True, user
+
+    def _set_local(self, user_id: int, user: CachedUser | None):
+        ttl = config.USER_CACHE_LOCAL_TTL if user is not None else min(config.USER_CACHE_LOCAL_TTL, config.USER_CACHE_MISS_TTL)
+        self.local[user_id] = (time.monotonic() + ttl, user)
+        self.local.move_to_end(user_id)
+        while len(self.local) > config.USER_CACHE_SIZE:
+            self.local.popitem(last=False)
+
+    async def lookup(self, user_id: int) -> tuple[bool, CachedUser | None]:
+        """(hit, user): a hit with no user means the id is cached as not found"""
+        hit, user = self._get_local(user_id)
+        if hit:
+            return hit, user
+        try:
+            raw = await self.redis.get(f"{KEY_PREFIX}{user_id}")
+        except Exception as e:
+            logging.warning(f"User cache: Redis read failed: {e}")
+            return False, None
+        if raw is None:
+            return False, None
+        user = CachedUser.model_validate_json(raw) if raw else None
+        self._set_local(user_id, user)
+        return True, user
+
+    async def get(self, user_id: int) -> CachedUser | None:
+        return (await self.lookup(user_id))[1]
+
+    async def set(self, user: CachedUser):
+        self._set_local(user.id, user)
+        try:
+            await self.redis.set(f"{KEY_PREFIX}{user.id}", user.model_dump_json(), ex=config.USER_CACHE_TTL)
+        except Exception as e:
+            logging.warning(f"User cache: Redis write failed: {e}")
+
+    async def set_missing(self, user_id: int):
+        """Remember that `user_id` is not registered (cleared by `invalidate` when it is)"""
+        self._set_local(user_id, None)
+        try:
+            await self.redis.set(f"{KEY_PREFIX}{user_id}", "", ex=config.USER_CACHE_MISS_TTL)
+        except Exception as e:
+            logging.warning(f"User cache: Redis write failed: {e}")
+
+    async def invalidate(self, *user_ids: int):
+        for user_id in user_ids:
+            self.local.pop(user_id, None)
+        if not user_ids:
+            return
+        try:
+            await self.redis.delete(*(f"{KEY_PREFIX}{user_id}" for user_id in user_ids))
+            for user_id in user_ids:
+                await self.redis.publish(INVALIDATION_CHANNEL, user_id)
+        except Exception as e:
+            logging.warning(f"User cache: Redis invalidation failed: {e}")
+
+    async def listen_invalidations(self):
+        """Drop local entries invalidated by other instances. Runs until cancelled."""
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.local.pop(int(message["data"]), None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"User cache: invalidation listener error: {e}. Reconnecting in 5 sec...")
+                self.local.clear()
+                await asyncio.sleep(5)
+
+
+user_cache = UserCache(redis_client)
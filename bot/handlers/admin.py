@@ -1,11 +1,15 @@
 from aiogram import Router, F, types, Bot
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
+from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
 import html
 import logging
 
 from bot.database.models import UserRole
 from bot.database.repositories.user import UserRepository
+from bot.database.user_cache import CachedUser
+from bot.keyboards.session_kb import SessionsCursor, SESSIONS_PAGE_PREFIX, STATUS_CODES, STATUS_ICONS, get_sessions_page_kb
 from bot.database.repositories.logs import LogRepository
 from bot.config import config
 from bot.states import AdminStates
@@ -26,6 +30,9 @@ def _get_admin_panel_kb():
     # Session Management
     builder.row(InlineKeyboardButton(text="⛽ Сесії заправки", callback_data="admin_sessions"))
 
+    # Data export
+    builder.row(InlineKeyboardButton(text="📤 Експорт даних", callback_data="admin_export"))
+
     # User Management
     builder.row(InlineKeyboardButton(text="👥 Користувачі (Mapping)", callback_data="admin_users"))
     
@@ -35,6 +42,7 @@ def _get_admin_panel_kb():
     # Schedule Controls
     builder.row(InlineKeyboardButton(text="🔄 Оновити статус (Force)", callback_data="admin_force_schedule"))
     builder.row(InlineKeyboardButton(text="⚙️ Інтервал перевірки", callback_data="admin_set_interval"))
+    builder.row(InlineKeyboardButton(text="⏱ Jobs", callback_data="admin_jobs"))
     
     builder.row(InlineKeyboardButton(text="❌ Закрити", callback_data="admin_close"))
     
@@ -43,50 +51,40 @@ def _get_admin_panel_kb():
 # --- Session Management Handlers ---
 
 @router.callback_query(F.data == "admin_sessions")
+@router.callback_query(F.data.startswith(f"{SESSIONS_PAGE_PREFIX}:"))
 async def admin_sessions_list(callback: types.CallbackQuery, bot: Bot):
+    from datetime import datetime, timedelta
     from bot.database.main import session_maker
     from bot.database.repositories.session import SessionRepository
-    from bot.database.repositories.user import UserRepository
+    
+    # Filters and page cursor travel in callback_data; anything else opens the first page
+    data = callback.data or ""
+    cursor = SessionsCursor.unpack(data) if data.startswith(f"{SESSIONS_PAGE_PREFIX}:") else SessionsCursor()
+    status = STATUS_CODES[cursor.status]
+    since = datetime.now() - timedelta(days=cursor.days) if cursor.days else None
+    key = (cursor.start_time, cursor.session_id) if cursor.start_time and cursor.session_id else None
     
     async with session_maker() as session:
         repo = SessionRepository(session)
-        user_repo = UserRepository(session)
-        history = await repo.get_history(limit=8) # 8 latest
-        all_users = await user_repo.get_all(include_blocked=True)
-        # Prefer sheet_name (Google Sheets name), fallback to Telegram name
-        user_map = {u.id: (u.sheet_name if u.sheet_name else (u.name if u.name else str(u.id))) for u in all_users}
+        # Worker names joined in the same query, seek on (start_time, id)
+        page = await repo.get_page(limit=8, status=status, since=since, key=key, direction=cursor.direction)
         
-    text = "⛽ <b>Сесії заправки (v2.3)</b>\n\nОберіть сесію для перегляду деталей або скасування:"
-    builder = InlineKeyboardBuilder()
+    filters = []
+    if status:
+        filters.append(f"{STATUS_ICONS[status]} {status}")
+    if cursor.days:
+        filters.append(f"за {cursor.days} дн")
+    filters_str = f" ({', '.join(filters)})" if filters else ""
     
-    if not history:
-        text = "⛽ <b>Сесії заправки</b>\n\nСесій ще не було."
+    if page.items:
+        text = f"⛽ <b>Сесії заправки{filters_str}</b>\n\nОберіть сесію для перегляду деталей або скасування:"
+    elif key:
+        text = f"⛽ <b>Сесії заправки{filters_str}</b>\n\nБільше сесій немає."
     else:
-        for s in history:
-            # Explicitly define status icon
-            status_map = {
-                'pending': "⏳",
-                'in_progress': "⚙️",
-                'completed': "✅",
-                'cancelled': "❌"
-            }
-            icon = status_map.get(s.status, "❓")
-            
-            # Resolve worker names
-            w1 = user_map.get(s.worker1_id, "—") if s.worker1_id else "—"
-            w2 = user_map.get(s.worker2_id, "—") if s.worker2_id else "—"
-            
-            if w1 == "—" and w2 == "—":
-                workers_str = "немає воркерів"
-            else:
-                workers_str = f"{w1}, {w2}"
-            
-            # Button for each session
-            builder.row(InlineKeyboardButton(
-                text=f"{icon} {s.start_time.strftime('%d.%m %H:%M')} | {workers_str}",
-                callback_data=f"admin_session_view:{s.id}"
-            ))
-
+        text = f"⛽ <b>Сесії заправки{filters_str}</b>\n\nСесій ще не було."
+    
+    kb = get_sessions_page_kb(page.items, cursor, page.has_older, page.has_newer)
+    builder = InlineKeyboardBuilder(markup=kb.inline_keyboard)
     builder.row(InlineKeyboardButton(text="➕ Створити вручну", callback_data="admin_create_session_manual"))
     builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_panel_back"))
     
@@ -95,33 +93,18 @@ async def admin_sessions_list(callback: types.CallbackQuery, bot: Bot):
 async def _admin_session_view_logic(callback: types.CallbackQuery, bot: Bot, session_id: int):
     from bot.database.main import session_maker
     from bot.database.repositories.session import SessionRepository
-    from bot.database.repositories.user import UserRepository
     
     async with session_maker() as session:
         repo = SessionRepository(session)
-        user_repo = UserRepository(session)
-        s = await repo.get_session_by_id(session_id)
+        # Session + workers + completed_by in one joined SELECT
+        s = await repo.get_session_with_workers(session_id)
         
         if not s:
             await callback.answer("Сесію не знайдено")
             return
 
-        # Get worker names within the SAME session
-        w1_name = "—"
-        if s.worker1_id:
-            u1 = await user_repo.get_by_id(s.worker1_id)
-            if u1:
-                w1_name = u1.sheet_name if u1.sheet_name else u1.name
-            else:
-                w1_name = f"ID: {s.worker1_id}"
-            
-        w2_name = "—"
-        if s.worker2_id:
-            u2 = await user_repo.get_by_id(s.worker2_id)
-            if u2:
-                w2_name = u2.sheet_name if u2.sheet_name else u2.name
-            else:
-                w2_name = f"ID: {s.worker2_id}"
+        w1_name = s.worker1.display_name if s.worker1 else "—"
+        w2_name = s.worker2.display_name if s.worker2 else "—"
 
         text = f"⛽ <b>Деталі сесії # {s.id}</b>\n\n"
         text += f"📊 <b>Статус:</b> <code>{s.status}</code>\n"
@@ -136,6 +119,8 @@ async def _admin_session_view_logic(callback: types.CallbackQuery, bot: Bot, ses
         if s.status == 'completed':
             text += f"\n⛽ <b>Залито:</b> {s.liters} л\n"
             text += f"📦 <b>Списано:</b> {s.cans} кан\n"
+            if s.completed_by:
+                text += f"👤 <b>Завершив:</b> {s.completed_by.display_name}\n"
             if s.notes:
                 text += f"📝 <b>Замітка:</b> {s.notes}\n"
 
@@ -166,9 +151,17 @@ async def admin_session_cancel(callback: types.CallbackQuery, bot: Bot):
     
     async with session_maker() as session:
         repo = SessionRepository(session)
-        await repo.update_status(session_id, SessionStatus.cancelled)
+        cancelled = await repo.update_status(session_id, SessionStatus.cancelled)
+        if cancelled:
+            from bot.database.repositories.logs import LogRepository
+            await LogRepository(session).log_action(callback.from_user.id, "SESSION_CANCEL",
+                                                    f"Cancelled session #{session_id}", session_id=session_id)
         await session.commit()
         
+        if cancelled:
+            from bot.services.session_cards import SessionCardService
+            await SessionCardService(session, bot).refresh(cancelled)
+        
         await callback.answer("Сесію скасовано")
         # Refresh the view
         await _admin_session_view_logic(callback, bot, session_id)
@@ -275,8 +268,7 @@ async def admin_user_unmap(callback: types.CallbackQuery, user_repo: UserReposit
     await admin_user_details(callback, user_repo)
 
 @router.message(F.text == "📊 Адмін-панель")
-async def admin_panel_handler(message: types.Message, user_repo: UserRepository):
-    user = await user_repo.get_by_id(message.from_user.id)
+async def admin_panel_handler(message: types.Message, user: CachedUser | None):
     if not user or user.role != UserRole.admin:
         return
 
@@ -326,7 +318,7 @@ async def interval_input(message: types.Message, state: FSMContext):
         from bot.scheduler import scheduler
         scheduler.reschedule_job('check_power_outage_job', trigger='interval', minutes=minutes)
         
-        await message.answer(f"✅ Інтервал змінено на <b>{minutes} хв</b>.\n(Зміна збережена в пам'яті).", reply_markup=_get_admin_panel_kb(), parse_mode="HTML")
+        await message.answer(f"✅ Інтервал змінено на <b>{minutes} хв</b>.\n(Зміна збережена).", reply_markup=_get_admin_panel_kb(), parse_mode="HTML")
         await state.clear()
         
     except Exception as e:
@@ -367,6 +359,104 @@ async def do_reset_logs(callback: types.CallbackQuery, log_repo: LogRepository):
     await callback.answer("✅ Історію успішно скинуто!", show_alert=True)
     await admin_panel_back(callback)
 
+# --- Scheduler jobs ---
+
+def _fmt_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}мс" if seconds < 1 else f"{seconds:.1f}с"
+
+@router.callback_query(F.data == "admin_jobs")
+async def admin_jobs(callback: types.CallbackQuery):
+    from datetime import datetime, timezone
+    from bot.scheduler import scheduler, elector
+    from bot.services.job_metrics import job_metrics, job_name
+    
+    stats = await job_metrics.get_all()
+    leader = await elector.redis.get(elector.key)
+    leader = leader.decode() if isinstance(leader, bytes) else leader
+    
+    # Earliest next run per job name (outage timers share one name)
+    next_runs = {}
+    for job in scheduler.get_jobs():
+        name = job_name(job.id)
+        if job.next_run_time and (name not in next_runs or job.next_run_time < next_runs[name]):
+            next_runs[name] = job.next_run_time
+    
+    now = datetime.now(timezone.utc)
+    text = "⏱ <b>Jobs</b>\n"
+    text += f"👑 Лідер: <code>{html.escape(leader or '—')}</code>{' (цей інстанс)' if elector.is_leader else ''}\n\n"
+    
+    names = sorted({s.name for s in stats} | next_runs.keys())
+    by_name = {s.name: s for s in stats}
+    for name in names:
+        s = by_name.get(name)
+        text += f"<b>{html.escape(name)}</b>\n"
+        if s and s.runs:
+            text += (f"  ✅ {s.ok} ❌ {s.failed} | ⌀ {_fmt_seconds(s.duration_avg)}, "
+                     f"p95 ≤ {_fmt_seconds(s.percentile(0.95))}, max {_fmt_seconds(s.duration_max)}\n")
+            text += f"  ⏰ Запізнення: {_fmt_seconds(s.last_lag)} (max {_fmt_seconds(s.lag_max)})\n"
+        if s and (s.misfires or s.skipped or s.overlaps):
+            text += f"  ⚠️ Пропущено: {s.misfires}, max_instances: {s.skipped}, накладання: {s.overlaps}\n"
+        if s and s.last_error:
+            text += f"  🐞 <code>{html.escape(s.last_error[:100])}</code>\n"
+        if name in next_runs:
+            minutes = max((next_runs[name] - now).total_seconds(), 0) / 60
+            text += f"  ⏭ Наступний запуск: через {minutes:.0f} хв\n"
+    if not names:
+        text += "Даних ще немає."
+    
+    builder = InlineKeyboardBuilder()
+    builder.row(InlineKeyboardButton(text="🔄 Оновити", callback_data="admin_jobs"))
+    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_panel_back"))
+    try:
+        await callback.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="HTML")
+    except TelegramBadRequest as e:
+        # Refresh without changes; anything else is a real error
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+# --- Export ---
+
+EXPORT_PERIODS = (7, 30, 90, 365)  # days
+
+def _get_export_kb():
+    builder = InlineKeyboardBuilder()
+    builder.row(*[
+        InlineKeyboardButton(text=f"{days} дн", callback_data=f"admin_export:{days}")
+        for days in EXPORT_PERIODS
+    ])
+    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_panel_back"))
+    return builder.as_markup()
+
+EXPORT_TEXT = ("📤 <b>Експорт даних</b>\n\n"
+               "Сесії заправки, логи та журнал палива у CSV (zip).\n"
+               "Оберіть період:")
+
+@router.message(Command("export"))
+async def export_command(message: types.Message, user: CachedUser | None):
+    if not user or user.role != UserRole.admin:
+        return
+    await message.answer(EXPORT_TEXT, reply_markup=_get_export_kb(), parse_mode="HTML")
+
+@router.callback_query(F.data == "admin_export")
+async def export_menu(callback: types.CallbackQuery):
+    await callback.message.edit_text(EXPORT_TEXT, reply_markup=_get_export_kb(), parse_mode="HTML")
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("admin_export:"))
+async def export_start(callback: types.CallbackQuery, bot: Bot, user: CachedUser | None):
+    from bot.services.export import start_export
+    if not user or user.role != UserRole.admin:
+        await callback.answer("⛔ Тільки для адмінів", show_alert=True)
+        return
+    
+    days = int(callback.data.split(":")[1])
+    # Runs in the background: the handler returns right away, progress is posted to the chat
+    if start_export(bot, callback.message.chat.id, days):
+        await callback.answer("⏳ Експорт запущено")
+    else:
+        await callback.answer("Експорт вже виконується", show_alert=True)
+
 @router.callback_query(F.data == "admin_close")
 async def admin_close_callback(callback: types.CallbackQuery):
     await callback.message.delete()
@@ -4,7 +4,7 @@ from bot.states import GenStates
 from bot.services.generator import GeneratorService
 from bot.keyboards.inline_kb import get_generator_control_kb
 from bot.database.models import GenStatus, UserRole
-from bot.database.repositories.user import UserRepository
+from bot.database.user_cache import CachedUser
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 
 router = Router()
@@ -78,8 +78,7 @@ async def check_status(message: types.Message, generator_service: GeneratorServi
     await message.answer(text, reply_markup=kb, parse_mode="HTML")
 
 @router.message(F.text == "🔄 Керування")
-async def switch_gen_menu(message: types.Message, user_repo: UserRepository):
-    user = await user_repo.get_by_id(message.from_user.id)
+async def switch_gen_menu(message: types.Message, user: CachedUser | None):
     if not user or user.role != UserRole.admin:
         await message.answer("⛔ Ця функція доступна тільки адміністраторам.")
         return
@@ -215,13 +214,11 @@ async def process_correction_tank(message: types.Message, state: FSMContext, gen
         val = float(message.text.replace(",", "."))
         data = await state.get_data()
         gen_name = data.get("gen_name")
-        ens = await generator_service.repo.get_by_name(gen_name)
-        if not ens:
+        gen = await generator_service.update_generator_specs(message.from_user.id, gen_name, capacity=val)
+        if not gen:
             await message.answer("❌ Генератор не знайдено. Спробуйте оновити меню.")
             await state.clear()
             return
-
-        await generator_service.update_generator_specs(message.from_user.id, gen_name, val, ens.consumption_rate)
         
         await state.set_state(state=None) 
         
@@ -244,13 +241,11 @@ async def process_correction_rate(message: types.Message, state: FSMContext, gen
         val = float(message.text.replace(",", "."))
         data = await state.get_data()
         gen_name = data.get("gen_name")
-        ens = await generator_service.repo.get_by_name(gen_name)
-        if not ens:
+        gen = await generator_service.update_generator_specs(message.from_user.id, gen_name, rate=val)
+        if not gen:
             await message.answer("❌ Генератор не знайдено. Спробуйте оновити меню.")
             await state.clear()
             return
-
-        await generator_service.update_generator_specs(message.from_user.id, gen_name, ens.tank_capacity, val)
         
         await state.set_state(state=None) 
         
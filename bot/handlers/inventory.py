@@ -1,6 +1,6 @@
 from aiogram import Router, F, types
 from bot.database.models import UserRole
-from bot.database.repositories.user import UserRepository
+from bot.database.user_cache import CachedUser
 from bot.keyboards.refuel_kb import get_refuel_kb, get_amount_kb
 from bot.keyboards.inventory_kb import get_inventory_kb
 from bot.services.generator import GeneratorService
@@ -11,8 +11,7 @@ from bot.states import InventoryStates
 router = Router()
 
 @router.message(F.text == "📦 Склад")
-async def check_stock(message: types.Message, inventory_service: InventoryService, user_repo: UserRepository):
-    user = await user_repo.get_by_id(message.from_user.id)
+async def check_stock(message: types.Message, inventory_service: InventoryService, user: CachedUser | None):
     is_admin = user and user.role == UserRole.admin
     
     stats = await inventory_service.get_detailed_stats()
@@ -46,8 +45,7 @@ async def stock_close_callback(callback: types.CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("stock_"))
-async def stock_control_callback(callback: types.CallbackQuery, inventory_service: InventoryService, user_repo: UserRepository):
-    user = await user_repo.get_by_id(callback.from_user.id)
+async def stock_control_callback(callback: types.CallbackQuery, inventory_service: InventoryService, user: CachedUser | None):
     if not user or user.role != UserRole.admin:
         await callback.answer("⛔ Тільки для адміністраторів", show_alert=True)
         return
@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from datetime import datetime
@@ -6,9 +6,10 @@ from datetime import datetime
 from bot.states import SessionStates
 from bot.database.main import session_maker
 from bot.database.repositories.session import SessionRepository
+from bot.database.repositories.logs import LogRepository
 from bot.database.models import SessionStatus
+from bot.services.session_cards import SessionCardService, WORKER
 from bot.keyboards.session_kb import (
-    get_in_progress_kb, 
     get_gen_choice_kb, 
     get_skip_kb
 )
@@ -16,7 +17,7 @@ from bot.keyboards.session_kb import (
 router = Router()
 
 @router.callback_query(F.data.startswith("session_start:"))
-async def start_session_handler(callback: CallbackQuery):
+async def start_session_handler(callback: CallbackQuery, bot: Bot):
     session_id = int(callback.data.split(":")[1])
     
     async with session_maker() as session:
@@ -27,20 +28,19 @@ async def start_session_handler(callback: CallbackQuery):
         if not updated_session:
             await callback.answer("Сесія не знайдена або вже завершена.", show_alert=True)
             return
+        await LogRepository(session).log_action(callback.from_user.id, "SESSION_START", f"Started session #{session_id}",
+                                                session_id=session_id)
+        await session.commit()
 
-        # Update message
-        workers = []
-        if updated_session.worker1_id: workers.append(f"Worker {updated_session.worker1_id}") # Ideally fetch names
-        # Just keep it simple for now or fetch names if available in model (relationships not loaded)
+        # Update every card of this session (workers and admins) in place
+        cards = SessionCardService(session, bot)
+        updated = await cards.refresh(updated_session, actor_name=callback.from_user.full_name)
         
-        deadline_str = updated_session.deadline.strftime("%H:%M")
-        
-        msg_text = (f"⚙️ <b>Сесія в процесі</b>\n\n"
-                    f"Розпочав: {callback.from_user.full_name}\n"
-                    f"Дедлайн (світло): {deadline_str}\n\n"
-                    f"Натисніть 'Завершити', коли заправите генератор.")
-        
-        await callback.message.edit_text(msg_text, reply_markup=get_in_progress_kb(session_id))
+        if callback.message.chat.id not in updated:
+            # Message was sent before cards were tracked
+            text, kb = cards.render(updated_session, WORKER, await cards.workers_str(updated_session),
+                                    actor_name=callback.from_user.full_name)
+            await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
         await callback.answer("Сесію розпочато!")
 
 @router.callback_query(F.data.startswith("session_complete:"))
@@ -84,7 +84,7 @@ async def liters_input(message: Message, state: FSMContext):
 
 @router.callback_query(SessionStates.waiting_for_notes, F.data == "skip_step")
 @router.message(SessionStates.waiting_for_notes)
-async def finish_session(event: Message | CallbackQuery, state: FSMContext):
+async def finish_session(event: Message | CallbackQuery, state: FSMContext, bot: Bot):
     data = await state.get_data()
     notes = None
     
@@ -116,8 +116,20 @@ async def finish_session(event: Message | CallbackQuery, state: FSMContext):
             cans=cans,
             notes=notes
         )
+        if not completed_session:
+            await state.clear()
+            reply_to = event.message if isinstance(event, CallbackQuery) else event
+            await reply_to.answer("Сесія не знайдена або вже завершена.")
+            return
+        await LogRepository(session).log_action(user_id, "SESSION_COMPLETE",
+                                                f"Completed session #{session_id}: {liters}L to {gen_choice}",
+                                                quantity=liters, generator=gen_choice, session_id=session_id,
+                                                payload={"cans": cans, "notes": notes})
+        await session.commit()
+        
+        # Final state goes to every card of the session
+        await SessionCardService(session, bot).refresh(completed_session)
         
-        # Final confirmation
         msg = (f"✅ <b>Сесію # {session_id} завершено!</b>\n\n"
                f"👤 Воркер: {event.from_user.full_name}\n"
                f"⚡️ Генератор: {gen_choice}\n"
@@ -125,8 +137,8 @@ async def finish_session(event: Message | CallbackQuery, state: FSMContext):
                f"🕒 Час: {completed_session.end_time.strftime('%H:%M')}")
         
         if isinstance(event, CallbackQuery):
-            await event.message.edit_text(msg)
+            await event.message.edit_text(msg, parse_mode="HTML")
         else:
-            await event.answer(msg)
+            await event.answer(msg, parse_mode="HTML")
             
     await state.clear()
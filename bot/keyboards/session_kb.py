@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 def get_start_session_kb(session_id: int) -> InlineKeyboardMarkup:
@@ -31,3 +33,109 @@ def get_skip_kb() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="Пропустити", callback_data="skip_step")]
     ]
     return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+# --- Admin session history: page state in callback_data ---
+
+SESSIONS_PAGE_PREFIX = "adm_sess"
+EPOCH = datetime(1970, 1, 1)
+
+# One letter per status filter keeps callback_data under Telegram's 64 bytes
+STATUS_CODES = {
+    "a": None,
+    "p": "pending",
+    "i": "in_progress",
+    "c": "completed",
+    "e": "expired",
+    "x": "cancelled",
+}
+STATUS_ICONS = {
+    'pending': "⏳",
+    'in_progress': "⚙️",
+    'completed': "✅",
+    'expired': "⌛",
+    'cancelled': "❌"
+}
+PERIOD_DAYS = (0, 7, 30, 90)  # 0 = all time
+
+def _to_base36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        value, rem = divmod(value, 36)
+        out = digits[rem] + out
+        if not value:
+            return out
+
+class SessionsCursor(NamedTuple):
+    """
+    Page state of the admin session list:
+    adm_sess:<status>:<days>:<direction>:<start_time, µs since epoch, base36>:<id>
+    Direction "n" = older than the key, "p" = newer than the key, "" = first page.
+    """
+    status: str = "a"
+    days: int = 0
+    direction: str = ""
+    start_time: datetime | None = None
+    session_id: int | None = None
+
+    def pack(self) -> str:
+        key = ""
+        if self.start_time is not None:
+            key = _to_base36((self.start_time - EPOCH) // timedelta(microseconds=1))
+        return f"{SESSIONS_PAGE_PREFIX}:{self.status}:{self.days}:{self.direction}:{key}:{self.session_id or ''}"
+
+    @classmethod
+    def unpack(cls, data: str) -> "SessionsCursor":
+        _, status, days, direction, key, session_id = data.split(":")
+        start_time = EPOCH + timedelta(microseconds=int(key, 36)) if key else None
+        return cls(
+            status=status if status in STATUS_CODES else "a",
+            days=int(days),
+            direction=direction,
+            start_time=start_time,
+            session_id=int(session_id) if session_id else None,
+        )
+
+def get_sessions_page_kb(sessions: list, cursor: SessionsCursor, has_older: bool, has_newer: bool) -> InlineKeyboardMarkup:
+    """Session buttons, filters and next/prev navigation for the admin history"""
+    kb = []
+    for s in sessions:
+        icon = STATUS_ICONS.get(s.status, "❓")
+        w1 = s.worker1.display_name if s.worker1 else "—"
+        w2 = s.worker2.display_name if s.worker2 else "—"
+        workers_str = "немає воркерів" if w1 == "—" and w2 == "—" else f"{w1}, {w2}"
+        kb.append([InlineKeyboardButton(
+            text=f"{icon} {s.start_time.strftime('%d.%m %H:%M')} | {workers_str}",
+            callback_data=f"admin_session_view:{s.id}"
+        )])
+
+    nav = []
+    if has_newer and sessions:
+        first = sessions[0]
+        nav.append(InlineKeyboardButton(text="⬅️ Новіші", callback_data=cursor._replace(
+            direction="p", start_time=first.start_time, session_id=first.id).pack()))
+    if has_older and sessions:
+        last = sessions[-1]
+        nav.append(InlineKeyboardButton(text="Старіші ➡️", callback_data=cursor._replace(
+            direction="n", start_time=last.start_time, session_id=last.id).pack()))
+    if nav:
+        kb.append(nav)
+
+    # Changing a filter starts again from the newest page
+    first_page = SessionsCursor(status=cursor.status, days=cursor.days)
+    kb.append([
+        InlineKeyboardButton(
+            text=("• " if code == cursor.status else "") + (STATUS_ICONS[status] if status else "Всі"),
+            callback_data=first_page._replace(status=code).pack()
+        )
+        for code, status in STATUS_CODES.items()
+    ])
+    kb.append([
+        InlineKeyboardButton(
+            text=("• " if days == cursor.days else "") + (f"{days} дн" if days else "Весь час"),
+            callback_data=first_page._replace(days=days).pack()
+        )
+        for days in PERIOD_DAYS
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
@@ -0,0 +1,71 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User as TgUser
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.config import config
+from bot.database.repositories.user import UserRepository
+from bot.database.user_cache import user_cache, CachedUser
+
+# Always let these through: /start re-evaluates access (create_or_update)
+# and tells a blocked user what happened
+OPEN_COMMANDS = ("/start", "/menu", "/help")
+
+DENIED_TEXT = "⛔ Доступ заборонено"
+
+
+class AuthMiddleware(BaseMiddleware):
+    """
+    Outer update middleware: resolves the sender to a `CachedUser` once per
+    update (user cache first, DB session only on a miss), puts it into
+    handler data as `user` and stops updates from blocked or unknown users
+    before any router filter runs.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker):
+        super().__init__()
+        self.session_pool = session_pool
+
+    async def _resolve(self, user_id: int) -> CachedUser | None:
+        hit, user = await user_cache.lookup(user_id)
+        if not hit:
+            async with self.session_pool() as session:
+                user = await UserRepository(session).load_cached(user_id)
+        return user
+
+    @staticmethod
+    def _is_allowed(tg_user: TgUser, user: CachedUser | None) -> bool:
+        if tg_user.id in config.ADMIN_IDS:
+            return True
+        if user is not None:
+            return not user.is_blocked
+        # Not registered yet: only public mode or whitelisted ids
+        return not config.RESTRICT_ACCESS or tg_user.id in config.ALLOWED_IDS
+
+    async def _deny(self, event: Update):
+        if event.callback_query:
+            await event.callback_query.answer(DENIED_TEXT, show_alert=True)
+        elif event.message:
+            await event.message.answer(f"{DENIED_TEXT}\nЗверніться до адміністратора для надання доступу.")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        tg_user: TgUser | None = data.get("event_from_user")
+        if tg_user is None:
+            return await handler(event, data)
+
+        user = await self._resolve(tg_user.id)
+        data["user"] = user
+
+        message = getattr(event, "message", None)
+        if message and message.text and message.text.split()[0].split("@")[0] in OPEN_COMMANDS:
+            return await handler(event, data)
+
+        if not self._is_allowed(tg_user, user):
+            await self._deny(event)
+            return None
+        return await handler(event, data)
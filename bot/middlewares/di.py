@@ -1,7 +1,7 @@
 from typing import Callable, Dict, Any, Awaitable
-from aiogram import BaseMiddleware
+from aiogram import BaseMiddleware, Bot
 from aiogram.types import TelegramObject
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.database.repositories.user import UserRepository
 from bot.database.repositories.inventory import InventoryRepository
@@ -11,7 +11,75 @@ from bot.services.inventory import InventoryService
 from bot.services.generator import GeneratorService
 from bot.services.weather import WeatherService
 
+
+class LazyScope:
+    """
+    Per-update dependency container. Nothing is built up front: the session
+    is created when the first repository needs it, and every dependency is
+    built once on first use and shared for the rest of the update.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker, bot: Bot):
+        self.session_pool = session_pool
+        self.bot = bot
+        self._session: AsyncSession | None = None
+        self._instances: Dict[str, Any] = {}
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self.session_pool()
+        return self._session
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def resolve(self, name: str) -> Any:
+        if name not in self._instances:
+            self._instances[name] = PROVIDERS[name](self)
+        return self._instances[name]
+
+
+class LazyProxy:
+    """Stands in for a dependency in handler data, builds it on first attribute access."""
+    __slots__ = ("_scope", "_name")
+
+    def __init__(self, scope: LazyScope, name: str):
+        self._scope = scope
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._scope.resolve(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyProxy {self._name} resolved={self._name in self._scope._instances}>"
+
+
+PROVIDERS: Dict[str, Callable[[LazyScope], Any]] = {
+    # Repositories
+    "user_repo": lambda s: UserRepository(s.session),
+    "inventory_repo": lambda s: InventoryRepository(s.session),
+    "log_repo": lambda s: LogRepository(s.session),
+    "gen_repo": lambda s: GeneratorRepository(s.session),
+    # Services
+    # Note: We need 'bot' instance for alerts in InventoryService
+    "inventory_service": lambda s: InventoryService(s.resolve("inventory_repo"), s.resolve("log_repo"), s.resolve("user_repo"), s.bot),
+    "generator_service": lambda s: GeneratorService(s.resolve("gen_repo"), s.resolve("log_repo")),
+    "weather_service": lambda s: WeatherService(),
+}
+
+# Names handlers can ask for
+INJECTED = ("user_repo", "log_repo", "inventory_service", "generator_service", "weather_service")
+
+
 class DbSessionMiddleware(BaseMiddleware):
+    """
+    Injects lazy repositories/services. Updates that never touch them
+    (pure UI callbacks) cost no session, pool checkout or transaction;
+    commit/rollback only happen if a session was opened.
+    """
+
     def __init__(self, session_pool: async_sessionmaker):
         super().__init__()
         self.session_pool = session_pool
@@ -22,26 +90,19 @@ class DbSessionMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            # Repositories
-            user_repo = UserRepository(session)
-            inventory_repo = InventoryRepository(session)
-            log_repo = LogRepository(session)
-            gen_repo = GeneratorRepository(session)
-            
-            # Services
-            # Note: We need 'bot' instance for alerts in InventoryService
-            bot = data["bot"]
-            
-            data["user_repo"] = user_repo
-            data["log_repo"] = log_repo
-            data["inventory_service"] = InventoryService(inventory_repo, log_repo, user_repo, bot)
-            data["generator_service"] = GeneratorService(gen_repo, log_repo)
-            data["weather_service"] = WeatherService()
-            try:
-                result = await handler(event, data)
-                await session.commit()
-                return result
-            except Exception:
-                await session.rollback()
-                raise
+        scope = LazyScope(self.session_pool, data["bot"])
+        for name in INJECTED:
+            data[name] = LazyProxy(scope, name)
+
+        try:
+            result = await handler(event, data)
+            if scope.opened:
+                await scope.session.commit()
+            return result
+        except Exception:
+            if scope.opened:
+                await scope.session.rollback()
+            raise
+        finally:
+            if scope.opened:
+                await scope.session.close()
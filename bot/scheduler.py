@@ -2,162 +2,154 @@ import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.jobstores.base import JobLookupError
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 
 from bot.config import config
 from bot.database.main import session_maker
-from bot.database.repositories.inventory import InventoryRepository
-from bot.database.repositories.generator import GeneratorRepository
-from bot.database.models import GenStatus
 from bot.services.weather import WeatherService
+from bot.services.outbox import outbox, AlertCategory
+from bot.services.leader import LeaderElector
+from bot.services.generator_timers import generator_timers
 from aiogram import Bot
 
 scheduler = AsyncIOScheduler()
 
-async def check_rotation_needed(bot: Bot):
-    async with session_maker() as session:
-        gen_repo = GeneratorRepository(session)
-        inv_repo = InventoryRepository(session)
-        
-        gens = await gen_repo.get_all()
-        running_gen = next((g for g in gens if g.status == GenStatus.running), None)
-        
-        if not running_gen or not running_gen.current_run_start:
-            return
+async def _on_elected():
+    from bot.services.outage_timers import reset
+    reset()
+    scheduler.resume()
+    await generator_timers.start()
 
-        # Calculate duration
-        now = datetime.utcnow()
-        duration = now - running_gen.current_run_start
-        hours_run = duration.total_seconds() / 3600
-        
-        # Thresholds
-        WARN_HOURS = 4
-        CRITICAL_HOURS = 6
-        
-        msg = ""
-        if hours_run >= CRITICAL_HOURS:
-            msg = f"🔴 <b>УВАГА: ПОТРІБНА РОТАЦІЯ!</b>\nГенератор {running_gen.name} працює вже {hours_run:.1f} год.\nТерміново перемкніть на інший!"
-        elif hours_run >= WARN_HOURS and hours_run < WARN_HOURS + 0.6: 
-            # Check inventory for next gen
-            stock = await inv_repo.get_stock()
-            fuel_status = f"Запас на складі: {stock} каністр."
-            if stock < 1:
-                fuel_status += " ⚠️ МАЛО ПАЛИВА! Немає чим заправити наступний."
-            
-            # Predict remaining fuel in current gen
-            fuel_left = running_gen.fuel_level
-            burn_rate = running_gen.consumption_rate
-            time_left = fuel_left / burn_rate if burn_rate > 0 else 0
-            
-            msg = (f"⚠️ <b>Рекомендовано ротацію</b>\n"
-                   f"{running_gen.name} працює: {hours_run:.1f} год.\n"
-                   f"У баку: {fuel_left:.1f}л (~{time_left:.1f} год).\n"
-                   f"{fuel_status}\n"
-                   f"Плануйте перемикання у найближчі 2 години.")
+async def _on_demoted():
+    scheduler.pause()
+    await generator_timers.stop()
 
-        if msg:
-            from bot.services.notifier import NotifierService
-            notifier = NotifierService(bot)
-            await notifier.notify_all(msg)
+# Jobs (and generator alert timers) run only on the leader instance; the scheduler stays paused elsewhere
+elector = LeaderElector("scheduler", on_elected=_on_elected, on_demoted=_on_demoted)
 
-async def check_maintenance_needed(bot: Bot):
-    async with session_maker() as session:
-        gen_repo = GeneratorRepository(session)
-        gens = await gen_repo.get_all()
-        
-        from bot.services.notifier import NotifierService
-        notifier = NotifierService(bot)
-        
-        for g in gens:
-            total = g.total_hours_run or 0.0
-            # Example: Alert every 100 hours
-            # Or if hours since last maintenance > 100
-            # For simplicity, let's just alert if total is near a multiple of 100 for now, 
-            # but better logic: track 'hours_since_last_oil_change'.
-            # We'll use 100h threshold.
-            if total > 0 and (total % 100) < 0.5: # Simple trigger near the mark
-                 await notifier.notify_all(f"🔧 <b>ТЕХНІЧНЕ ОБСЛУГОВУВАННЯ</b>\nГенератор {g.name} відпрацював {total:.1f} год.\nЧас перевірити масло!")
+# Bot used by jobs; set in start_scheduler (jobs are stored without arguments)
+_bot: Bot | None = None
+
+def get_bot() -> Bot:
+    if _bot is None:
+        raise RuntimeError("Scheduler is not started")
+    return _bot
 
-async def weather_check_job(bot: Bot):
-    from bot.services.notifier import NotifierService
+async def weather_check_job():
     from bot.services.weather import WeatherService
-    notifier = NotifierService(bot)
     weather = WeatherService()
     
     # Send daily report
     report = await weather.get_daily_report()
     if report:
-        await notifier.notify_all(report)
+        await outbox.enqueue_all(report, AlertCategory.weather_report)
                 
     
     # Also check for critical alerts using separate logic if needed, 
     # but daily report covers it for 8 AM. 
     # If we wanted continuous monitoring, we'd add another job.
 
-async def check_power_outage_job(bot: Bot):
+async def log_retention_job():
+    from bot.services.log_retention import run_log_retention
+    try:
+        await run_log_retention()
+    except Exception as e:
+        logging.error(f"Log retention failed: {e}")
+
+async def fuel_snapshot_job():
+    from bot.database.repositories.fuel_ledger import FuelLedgerRepository
+    try:
+        async with session_maker() as session:
+            count = await FuelLedgerRepository(session).take_snapshots()
+            await session.commit()
+        logging.info(f"Fuel snapshots taken: {count}")
+    except Exception as e:
+        logging.error(f"Fuel snapshot failed: {e}")
+
+async def check_power_outage_job():
     from bot.services.session_service import SessionService
+    # Also re-plans the exact T-30 / deadline timers from the refreshed timeline
     async with session_maker() as session:
-        service = SessionService(session, bot=bot)
-        await service.check_power_outage()
+        await SessionService(session, bot=get_bot()).check_power_outage()
 
-    # Check weather daily at 8:00 AM
-    scheduler.add_job(weather_check_job, CronTrigger(hour=8, minute=0), args=[bot])
+def _jobstores() -> dict:
+    from apscheduler.jobstores.redis import RedisJobStore
+    from bot.database.redis_client import sync_redis_pool
+    return {
+        "default": RedisJobStore(
+            jobs_key=config.SCHEDULER_JOBS_KEY,
+            run_times_key=config.SCHEDULER_RUN_TIMES_KEY,
+            connection_pool=sync_redis_pool(),
+        )
+    }
+
+# Polling jobs replaced by generator timers, may still be in the job store
+_RETIRED_JOBS = ("check_rotation_needed", "check_maintenance_needed")
+
+def _ensure_job(func, trigger, job_id: str):
+    """
+    Add the job unless the store already has it. A stored job keeps its next
+    run time; it is only rescheduled when its trigger differs from `trigger`.
+    """
+    job = scheduler.get_job(job_id)
+    if job is None:
+        scheduler.add_job(func, trigger, id=job_id, replace_existing=True)
+        logging.info(f"Scheduler: added {job_id} ({trigger})")
+    elif str(job.trigger) != str(trigger):
+        scheduler.reschedule_job(job_id, trigger=trigger)
+        logging.info(f"Scheduler: rescheduled {job_id} ({job.trigger} -> {trigger})")
+
+async def start_scheduler(bot: Bot, jobstores: dict | None = None):
+    """
+    Jobs live in Redis (key SCHEDULER_JOBS_KEY), so definitions, next run
+    times and runtime changes survive restarts. Runs missed while the bot was
+    down are coalesced into one, if not older than SCHEDULER_MISFIRE_GRACE.
+    Jobs take no arguments: the bot is a module-level reference, not pickled.
     
-def start_scheduler(bot: Bot):
-    # Check rotation every 30 mins
-    scheduler.add_job(check_rotation_needed, IntervalTrigger(minutes=30), args=[bot])
+    The scheduler is left paused: `elector` resumes it on the instance that
+    wins the leader lease (run `elector.run()` next to polling).
+    """
+    global _bot
+    _bot = bot
     
-    # Check maintenance every 12 hours
-    scheduler.add_job(check_maintenance_needed, IntervalTrigger(hours=12), args=[bot])
+    scheduler.configure(
+        jobstores=jobstores if jobstores is not None else _jobstores(),
+        job_defaults={"coalesce": True, "misfire_grace_time": config.SCHEDULER_MISFIRE_GRACE},
+    )
+    # Durations, failures, misfires and lag of every job, published to Redis
+    from bot.services.job_metrics import job_metrics
+    job_metrics.install(scheduler)
     
-    # Check weather daily at 8:00 AM
-    scheduler.add_job(weather_check_job, CronTrigger(hour=8, minute=0), args=[bot])
+    # Paused until this instance is elected leader
+    scheduler.start(paused=True)
     
-    # Check Power Outage (Dynamic Interval)
-    # Default 15 min
-    interval_minutes = 15
+    # Rotation and maintenance are exact timers now (bot/services/generator_timers.py).
+    # Removed by id: their functions are gone, so the stored jobs can't be restored.
+    for job_id in _RETIRED_JOBS:
+        try:
+            scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
     
-    try:
-        # Try to read from Redis synchronously? 
-        # RedisStorage is async. We can't await here easily in sync function.
-        # However, scheduler is async, but setup is often sync.
-        # Workaround: Just use default here, and let the Admin handler update it at runtime.
-        # BUT user wanted persistence.
-        # We can use `asyncio.create_task` to update it after startup?
-        # Or just make start_scheduler async?
-        pass
-    except:
-        pass
-
-    # We use explicit ID so we can reschedule it later
-    scheduler.add_job(
-        check_power_outage_job, 
-        IntervalTrigger(minutes=interval_minutes), 
-        args=[bot],
-        id="check_power_outage_job",
-        replace_existing=True
-    )
+    # Check weather daily at 8:00 AM
+    _ensure_job(weather_check_job, CronTrigger(hour=8, minute=0), "weather_check_job")
     
-    scheduler.start()
-
-async def restore_scheduler_settings(bot: Bot):
-    """Called from main to restore dynamic settings"""
-    from aiogram.fsm.storage.redis import RedisStorage
-    from bot.config import config
+    # Logs partitions: create upcoming months, archive old ones (1st of month, 03:30)
+    _ensure_job(log_retention_job, CronTrigger(day=1, hour=3, minute=30), "log_retention_job")
     
-    # We need access to the storage used by Dispatcher... 
-    # Or just create a new client since it's Redis.
-    storage = RedisStorage.from_url(config.REDIS_URL.get_secret_value())
+    # Fuel ledger snapshots (point-in-time balances)
+    _ensure_job(fuel_snapshot_job, IntervalTrigger(hours=config.FUEL_SNAPSHOT_HOURS), "fuel_snapshot_job")
     
+    # Check Power Outage: refreshes the timeline and re-plans the one-shot
+    # outage timers; interval set by admins (config:schedule_interval), default 15 min
+    from bot.database.redis_client import redis_client
+    interval_minutes = 15
     try:
-        # storage.redis is a redis.asyncio.Redis instance
-        interval = await storage.redis.get("config:schedule_interval")
-        if interval:
-            minutes = int(interval)
-            scheduler.reschedule_job('check_power_outage_job', trigger='interval', minutes=minutes)
-            logging.info(f"Restored schedule check interval: {minutes} min")
+        stored = await redis_client.get("config:schedule_interval")
+        if stored:
+            interval_minutes = int(stored)
     except Exception as e:
-        logging.error(f"Failed to restore scheduler settings: {e}")
-    finally:
-        await storage.close()
+        logging.error(f"Failed to read schedule interval: {e}")
+    _ensure_job(check_power_outage_job, IntervalTrigger(minutes=interval_minutes), "check_power_outage_job")
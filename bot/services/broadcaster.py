@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from pydantic import BaseModel
+
+from bot.config import config
+
+
+class DeliveryResult(BaseModel):
+    chat_id: int
+    ok: bool
+    message_id: int | None = None
+    attempts: int = 0
+    error: str | None = None
+    permanent: bool = False  # Retrying won't help (blocked bot, bad chat id)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nothing is sent for `seconds` (flood control). Pauses overlap, they don't add up."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class Broadcaster:
+    """
+    Concurrent sender that respects Telegram rate limits.
+
+    Every send takes a token from the global bucket and from the bucket of the
+    target chat. `RetryAfter` pauses both the chat and the global bucket for the
+    requested time (Telegram's flood control is per bot), network/server errors
+    are retried with exponential backoff, permanent errors (blocked bot, bad
+    chat id) fail immediately. The concurrency semaphore only covers requests
+    in flight, so waiting for tokens or a backoff doesn't hold a slot. Each
+    call returns a `DeliveryResult` per recipient instead of swallowing failures.
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.global_bucket = TokenBucket(config.BROADCAST_GLOBAL_RATE)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.semaphore = asyncio.Semaphore(config.BROADCAST_CONCURRENCY)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(config.BROADCAST_CHAT_RATE, capacity=1)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _call(self, chat_id: int, request: Callable[[], Awaitable]) -> DeliveryResult:
+        result = DeliveryResult(chat_id=chat_id, ok=False)
+        chat_bucket = self._chat_bucket(chat_id)
+        delay = config.BROADCAST_RETRY_BASE_DELAY
+
+        while result.attempts <= config.BROADCAST_MAX_RETRIES:
+            result.attempts += 1
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                async with self.semaphore:
+                    message = await request()
+                result.ok = True
+                result.message_id = getattr(message, "message_id", None)
+                result.error = None
+                return result
+            except TelegramRetryAfter as e:
+                logging.warning(f"Flood control for chat {chat_id}: retry in {e.retry_after}s")
+                result.error = str(e)
+                chat_bucket.pause(e.retry_after)
+                self.global_bucket.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f"Transient error sending to {chat_id} (attempt {result.attempts}): {e}")
+                result.error = str(e)
+                await asyncio.sleep(delay)
+                delay *= 2
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logging.info(f"Permanent error sending to {chat_id}: {e}")
+                result.error = str(e)
+                result.permanent = True
+                return result
+            except Exception as e:
+                logging.exception(f"Unexpected error sending to {chat_id}")
+                result.error = str(e)
+                return result
+
+        logging.error(f"Giving up on chat {chat_id} after {result.attempts} attempts: {result.error}")
+        return result
+
+    async def send(self, chat_id: int, text: str, reply_markup=None, parse_mode: str | None = "HTML") -> DeliveryResult:
+        return await self._call(chat_id, lambda: self.bot.send_message(
+            chat_id, text, parse_mode=parse_mode, reply_markup=reply_markup
+        ))
+
+    async def edit(self, chat_id: int, message_id: int, text: str, reply_markup=None, parse_mode: str | None = "HTML") -> DeliveryResult:
+        result = await self._call(chat_id, lambda: self.bot.edit_message_text(
+            text=text, chat_id=chat_id, message_id=message_id, parse_mode=parse_mode, reply_markup=reply_markup
+        ))
+        if not result.ok and result.error and "message is not modified" in result.error:
+            result.ok = True
+            result.error = None
+        if result.ok:
+            result.message_id = message_id
+        return result
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str, reply_markup=None, parse_mode: str | None = "HTML") -> list[DeliveryResult]:
+        return list(await asyncio.gather(
+            *(self.send(chat_id, text, reply_markup=reply_markup, parse_mode=parse_mode) for chat_id in dict.fromkeys(chat_ids))
+        ))
+
+
+_broadcasters: dict[int, Broadcaster] = {}
+
+
+def get_broadcaster(bot: Bot) -> Broadcaster:
+    """Rate limits are per bot token, so all notifiers of one bot share a broadcaster."""
+    broadcaster = _broadcasters.get(bot.id)
+    if broadcaster is None:
+        broadcaster = Broadcaster(bot)
+        _broadcasters[bot.id] = broadcaster
+    return broadcaster
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiogram.types import InlineKeyboardMarkup
+
+from bot.config import config
+from bot.services.broadcaster import DeliveryResult
+from bot.services.notifier import NotifierService
+from bot.services.outbox import AlertCategory
+
+# Telegram rejects messages longer than 4096 characters
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_HEADER = "📬 <b>Зведення сповіщень</b> ({count})\n\n"
+DIGEST_SEPARATOR = "\n➖➖➖➖➖➖➖➖➖➖\n"
+
+OnSent = Callable[[DeliveryResult], Awaitable[None]]
+
+
+class DigestCoalescer:
+    """
+    Coalescing layer in front of NotifierService.
+
+    Messages for the same chat that arrive within `DIGEST_WINDOW` seconds are
+    merged into a single digest message. Urgent categories, messages with
+    buttons and `immediate` ones (session cards) are sent right away.
+    `on_sent` callbacks fire once the message (or the digest containing it)
+    has been delivered, which lets the outbox acknowledge entries only after
+    they really left the process.
+    """
+
+    def __init__(self, notifier: NotifierService):
+        self.notifier = notifier
+        self.urgent = {AlertCategory(c) for c in config.DIGEST_URGENT_CATEGORIES}
+        self.buffers: dict[int, list[tuple[str, OnSent | None]]] = {}
+        self.timers: dict[int, asyncio.Task] = {}
+
+    async def submit(self,
+                     chat_id: int,
+                     text: str,
+                     category: AlertCategory = AlertCategory.general,
+                     reply_markup: InlineKeyboardMarkup | None = None,
+                     on_sent: OnSent | None = None,
+                     immediate: bool = False):
+        if immediate or config.DIGEST_WINDOW <= 0 or category in self.urgent or reply_markup is not None:
+            result = await self.notifier.notify_user(chat_id, text, reply_markup=reply_markup)
+            if on_sent:
+                await on_sent(result)
+            return
+
+        buffer = self.buffers.setdefault(chat_id, [])
+        buffer.append((text, on_sent))
+
+        if len(buffer) >= config.DIGEST_MAX_ITEMS:
+            timer = self.timers.pop(chat_id, None)
+            if timer:
+                timer.cancel()
+            await self.flush(chat_id)
+        elif chat_id not in self.timers:
+            self.timers[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def _flush_later(self, chat_id: int):
+        await asyncio.sleep(config.DIGEST_WINDOW)
+        self.timers.pop(chat_id, None)
+        try:
+            await self.flush(chat_id)
+        except Exception:
+            logging.exception(f"Digest: failed to flush chat {chat_id}")
+
+    async def flush(self, chat_id: int):
+        items = self.buffers.pop(chat_id, [])
+        if not items:
+            return
+
+        texts = [text for text, _ in items]
+        results = [await self.notifier.notify_user(chat_id, chunk) for chunk in self._render(texts)]
+        # The digest counts as delivered only if every part went out
+        result = next((r for r in results if not r.ok), results[-1])
+
+        for _, on_sent in items:
+            if on_sent:
+                await on_sent(result)
+
+    async def flush_all(self):
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        for chat_id in list(self.buffers):
+            await self.flush(chat_id)
+
+    @staticmethod
+    def _split(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+        """Cut an oversized text at line breaks (a single overlong line is cut hard)"""
+        parts, current = [], ""
+        for line in text.splitlines(keepends=True):
+            while len(line) > limit:
+                if current:
+                    parts.append(current)
+                    current = ""
+                parts.append(line[:limit])
+                line = line[limit:]
+            if len(current) + len(line) > limit:
+                parts.append(current)
+                current = line
+            else:
+                current += line
+        if current:
+            parts.append(current)
+        return parts
+
+    @classmethod
+    def _render(cls, texts: list[str]) -> list[str]:
+        if len(texts) == 1:
+            return cls._split(texts[0])
+
+        chunks, current = [], DIGEST_HEADER.format(count=len(texts))
+        for text in texts:
+            for piece in cls._split(text, MAX_MESSAGE_LENGTH - len(DIGEST_SEPARATOR)):
+                part = piece if current.endswith("\n\n") else DIGEST_SEPARATOR + piece
+                if len(current) + len(part) > MAX_MESSAGE_LENGTH:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current += part
+        chunks.append(current)
+        return chunks
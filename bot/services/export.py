@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import html
+import io
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+from sqlalchemy import select
+
+from bot.database.log_archive import LogArchive
+from bot.database.main import session_maker
+from bot.database.models import RefuelSession, LogEvent, FuelLedgerEntry
+
+EXPORT_CHUNK = 1000  # Rows fetched per round trip from the server-side cursor
+PROGRESS_EVERY = 3.0  # seconds between progress message edits
+
+# Running exports per chat, also keeps a reference so tasks aren't garbage collected
+_running: dict[int, asyncio.Task] = {}
+
+
+def _datasets(since: datetime) -> list[tuple[str, object, bool]]:
+    """(file name, SELECT, include archived logs) per exported table, oldest rows first"""
+    return [
+        ("refuel_sessions.csv", select(
+            RefuelSession.id, RefuelSession.status, RefuelSession.start_time, RefuelSession.block_start,
+            RefuelSession.deadline, RefuelSession.end_time, RefuelSession.worker1_id, RefuelSession.worker2_id,
+            RefuelSession.completed_by_id.label("completed_by"), RefuelSession.gen_name, RefuelSession.liters,
+            RefuelSession.cans, RefuelSession.notes, RefuelSession.created_at,
+        ).where(RefuelSession.start_time >= since).order_by(RefuelSession.start_time, RefuelSession.id), False),
+        # Partition pruning on timestamp: only the months of the period are read.
+        # Months moved out by log retention come first, from the archive.
+        ("logs.csv", select(
+            LogEvent.timestamp, LogEvent.user_id, LogEvent.action, LogEvent.generator, LogEvent.quantity,
+            LogEvent.session_id, LogEvent.details,
+        ).where(LogEvent.timestamp >= since).order_by(LogEvent.timestamp), True),
+        ("fuel_ledger.csv", select(
+            FuelLedgerEntry.created_at, FuelLedgerEntry.account, FuelLedgerEntry.kind, FuelLedgerEntry.delta,
+            FuelLedgerEntry.balance_after, FuelLedgerEntry.user_id, FuelLedgerEntry.session_id, FuelLedgerEntry.note,
+        ).where(FuelLedgerEntry.created_at >= since).order_by(FuelLedgerEntry.id), False),
+    ]
+
+
+def _open_csv(zf: zipfile.ZipFile, filename: str) -> io.TextIOWrapper:
+    # utf-8-sig: Excel opens Cyrillic text correctly
+    return io.TextIOWrapper(zf.open(filename, "w", force_zip64=True), encoding="utf-8-sig", newline="")
+
+
+def _write_archived(writer, archive: LogArchive, since: datetime, until: datetime, columns: list[str]) -> int:
+    rows = 0
+    for row in archive.read(since, until):
+        writer.writerow([row.get(column) for column in columns])
+        rows += 1
+    return rows
+
+
+async def export_to_zip(since: datetime, progress: Callable[[str, int], Awaitable[None]] | None = None,
+                        session_pool=session_maker, archive: LogArchive | None = None) -> str:
+    """
+    Write every dataset since `since` as CSV into a temporary zip file and
+    return its path (caller deletes it). Rows are streamed from a
+    server-side cursor EXPORT_CHUNK at a time and written straight to disk,
+    so memory use does not depend on the period. Compression and file writes
+    run in a worker thread, off the event loop.
+    """
+    archive = archive or LogArchive()
+    until = datetime.utcnow()
+    fd, path = tempfile.mkstemp(prefix="genabot_export_", suffix=".zip")
+    os.close(fd)
+    try:
+        async with session_pool() as session:
+            zf = await asyncio.to_thread(zipfile.ZipFile, path, "w", compression=zipfile.ZIP_DEFLATED)
+            try:
+                for filename, stmt, archived in _datasets(since):
+                    out = await asyncio.to_thread(_open_csv, zf, filename)
+                    try:
+                        writer = csv.writer(out)
+                        result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK))
+                        columns = list(result.keys())
+                        await asyncio.to_thread(writer.writerow, columns)
+                        rows = await asyncio.to_thread(_write_archived, writer, archive, since, until, columns) if archived else 0
+                        async for chunk in result.partitions():
+                            await asyncio.to_thread(writer.writerows, chunk)
+                            rows += len(chunk)
+                            if progress:
+                                await progress(filename, rows)
+                    finally:
+                        await asyncio.to_thread(out.close)
+                    logging.info(f"Export: {filename} {rows} rows")
+            finally:
+                await asyncio.to_thread(zf.close)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def run_export(bot: Bot, chat_id: int, days: int):
+    """Export the last `days` days and send the archive to `chat_id`, editing a progress message meanwhile."""
+    status = await bot.send_message(chat_id, f"⏳ <b>Експорт за {days} дн...</b>", parse_mode="HTML")
+    last_edit = 0.0
+
+    async def progress(filename: str, rows: int):
+        nonlocal last_edit
+        if time.monotonic() - last_edit < PROGRESS_EVERY:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status.edit_text(f"⏳ <b>Експорт за {days} дн...</b>\n{filename}: {rows} рядків", parse_mode="HTML")
+        except Exception:
+            pass  # Progress is best effort
+
+    path = None
+    try:
+        since = datetime.utcnow() - timedelta(days=days)
+        path = await export_to_zip(since, progress)
+        filename = f"genabot_export_{datetime.now():%Y%m%d}_{days}d.zip"
+        await bot.send_document(chat_id, FSInputFile(path, filename=filename),
+                                caption=f"📤 Експорт за {days} дн (сесії, логи, журнал палива)")
+        await status.edit_text("✅ <b>Експорт готовий</b>", parse_mode="HTML")
+    except Exception as e:
+        logging.error(f"Export failed: {e}")
+        try:
+            await status.edit_text(f"❌ <b>Помилка експорту:</b>\n{html.escape(str(e))}", parse_mode="HTML")
+        except Exception as edit_error:
+            logging.warning(f"Export: could not report the failure to {chat_id}: {edit_error}")
+    finally:
+        if path:
+            os.remove(path)
+
+
+def start_export(bot: Bot, chat_id: int, days: int) -> bool:
+    """Run the export in the background. False if one is already running for this chat."""
+    task = _running.get(chat_id)
+    if task and not task.done():
+        return False
+    task = asyncio.create_task(run_export(bot, chat_id, days))
+    _running[chat_id] = task
+    task.add_done_callback(lambda t: _running.pop(chat_id, None) if _running.get(chat_id) is t else None)
+    return True
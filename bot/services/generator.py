@@ -1,113 +1,106 @@
 from datetime import datetime, timedelta
 from bot.database.repositories.generator import GeneratorRepository
 from bot.database.repositories.logs import LogRepository
-from bot.database.models import Generator, GenStatus
+from bot.database.repositories.fuel_ledger import FuelLedgerRepository, generator_account
+from bot.database.models import Generator, GenStatus, FuelEntryKind
 from bot.generator_specs import GENERATOR_SPECS
 from bot.services.weather import WeatherService
+from bot.services.generator_timers import mark_changed
 
 class GeneratorService:
     def __init__(self, gen_repo: GeneratorRepository, log_repo: LogRepository):
         self.repo = gen_repo
         self.logs = log_repo
+        self.ledger = FuelLedgerRepository(gen_repo.session)
         self.weather = WeatherService()
 
     async def get_status(self) -> list[Generator]:
         return await self.repo.get_all()
 
+    async def _weather_factor(self) -> tuple[float, float]:
+        temp = await self.weather.get_current_temperature()
+        return temp, self.weather.get_consumption_factor(temp)
+
+    async def _log_stops(self, user_id: int, changed, now: datetime, temp: float, factor: float):
+        """Write STOP_GEN and the burn ledger entry for every generator whose run was ended by a transition."""
+        for gen, old_status, old_start in changed:
+            if old_status != GenStatus.running or gen.status == GenStatus.running or not old_start:
+                continue
+            runtime_hours = max((now - old_start).total_seconds(), 0) / 3600.0
+            consumed = runtime_hours * gen.consumption_rate * factor
+            
+            details = f"Stopped {gen.name}. Runtime: {runtime_hours:.2f}h. Consumed: {consumed:.2f}L."
+            if factor > 1.0:
+                details += f" (Weather factor: x{factor:.1f}, Temp: {temp:.1f}C)"
+            await self.logs.log_action(user_id, "STOP_GEN", details, quantity=consumed, generator=gen.name,
+                                       payload={"runtime_hours": runtime_hours, "weather_factor": factor, "temp": temp})
+            # fuel_level was already charged by the transition UPDATE
+            await self.ledger.record(generator_account(gen.id), FuelEntryKind.burn, -consumed, gen.fuel_level,
+                                     user_id=user_id, note="STOP_GEN")
+
+    async def _transition(self, user_id: int, target: str | None = None, target_status: GenStatus | None = None,
+                          release: tuple[GenStatus, ...] = ()) -> bool:
+        """
+        Lock the affected rows, then switch them in one UPDATE. The weather
+        factor is only fetched if a running generator's run ends.
+        Returns False (nothing changed) if `target` doesn't exist.
+        """
+        rows = await self.repo.lock_for_transition(target, release)
+        if target is not None and not any(name == target for name, _, _ in rows):
+            return False
+        kept = target if target_status == GenStatus.running else None
+        if any(status == GenStatus.running and start and name != kept for name, status, start in rows):
+            temp, factor = await self._weather_factor()
+        else:
+            temp, factor = 0.0, 1.0  # No run ends: nothing is charged
+        now = datetime.utcnow()
+        changed = await self.repo.transition(now, factor, target=target, target_status=target_status, release=release)
+        await self._log_stops(user_id, changed, now, temp, factor)
+        return True
+
     async def start_generator(self, user_id: int, name: str):
-        # Stop all others first (safety rule: only 1 running)
-        all_gens = await self.repo.get_all()
-        for g in all_gens:
-            if g.status == GenStatus.running and g.name != name:
-                await self._stop_and_calculate(g, user_id)
-            # If any was standby, it should probably stop being standby if we start another?
-            # Or if we start THIS one, it stops being standby.
-            # If we start ANOTHER one, the standby one can remain standby (ready to pick up if this one fails?)
-            # But user logic was: "One standby, or stopped, or running".
-            # If started, it's RUNNING.
-        
-        # Start target
-        await self.repo.set_status(name, GenStatus.running, datetime.utcnow())
-        await self.logs.log_action(user_id, "START_GEN", f"Started {name}")
+        # Safety rule: only 1 running. Stopping the others (with fuel/hours
+        # accounting) and starting the target is a single UPDATE.
+        # A standby generator stays armed when ANOTHER one is started.
+        if not await self._transition(user_id, target=name, target_status=GenStatus.running,
+                                      release=(GenStatus.running,)):
+            return
+        await self.logs.log_action(user_id, "START_GEN", f"Started {name}", generator=name)
+        mark_changed(self.repo.session)
 
     async def set_standby(self, user_id: int, name: str):
-        # Exclusive Standby: If we set X to Standby, Y must be Stopped (if it was standby)
-        all_gens = await self.repo.get_all()
-        
-        target_gen = next((g for g in all_gens if g.name == name), None)
-        if not target_gen: 
+        # Exclusive Standby: X goes to Standby (its run is charged if it was running),
+        # any other standby generator is disarmed
+        if not await self._transition(user_id, target=name, target_status=GenStatus.standby,
+                                      release=(GenStatus.standby,)):
             return
-
-        # If target is running, we must stop it first?
-        if target_gen.status == GenStatus.running:
-             await self._stop_and_calculate(target_gen, user_id)
-
-        # Set target to standby
-        await self.repo.set_status(name, GenStatus.standby)
-        
-        # Disarm others
-        for g in all_gens:
-            if g.name != name and g.status == GenStatus.standby:
-                await self.repo.set_status(g.name, GenStatus.stopped)
-                
-        await self.logs.log_action(user_id, "SET_STANDBY", f"Set {name} to Standby")
+        await self.logs.log_action(user_id, "SET_STANDBY", f"Set {name} to Standby", generator=name)
+        mark_changed(self.repo.session)
 
     async def stop_all(self, user_id: int):
-        all_gens = await self.repo.get_all()
-        for g in all_gens:
-            if g.status == GenStatus.running:
-                await self._stop_and_calculate(g, user_id)
-            elif g.status == GenStatus.standby:
-                await self.repo.set_status(g.name, GenStatus.stopped)
+        await self._transition(user_id, release=(GenStatus.running, GenStatus.standby))
         await self.logs.log_action(user_id, "STOP_ALL", "Stopped all generators")
-
-    async def _stop_and_calculate(self, gen: Generator, user_id: int):
-        # Calculate runtime
-        if not gen.current_run_start:
-            await self.repo.set_status(gen.name, GenStatus.stopped)
-            return
-
-        now = datetime.utcnow()
-        if now < gen.current_run_start:
-            now = gen.current_run_start
-            
-        runtime_hours = (now - gen.current_run_start).total_seconds() / 3600.0
-        
-        # Weather Factor
-        temp = await self.weather.get_current_temperature()
-        factor = self.weather.get_consumption_factor(temp)
-        
-        # Use Dynamic specs from DB * factor
-        base_rate = gen.consumption_rate
-        actual_rate = base_rate * factor
-        consumed = runtime_hours * actual_rate
-        
-        await self.repo.add_fuel(gen.name, -consumed)
-        
-        # Track total hours
-        new_total = (gen.total_hours_run or 0.0) + runtime_hours
-        await self.repo.update_total_hours(gen.name, new_total)
-        
-        await self.repo.set_status(gen.name, GenStatus.stopped)
-        
-        # Log details
-        details = f"Stopped {gen.name}. Runtime: {runtime_hours:.2f}h. Consumed: {consumed:.2f}L."
-        if factor > 1.0:
-            details += f" (Weather factor: x{factor:.1f}, Temp: {temp:.1f}C)"
-            
-        await self.logs.log_action(user_id, "STOP_GEN", details)
+        mark_changed(self.repo.session)
 
     async def log_refuel(self, user_id: int, gen_name: str, liters: float):
-        new_level = await self.repo.add_fuel(gen_name, liters)
-        await self.logs.log_action(user_id, "REFUEL_GEN", f"Added {liters}L to {gen_name}. New Level: {new_level:.1f}L")
+        new_level = await self.repo.add_fuel(gen_name, liters, user_id=user_id)
+        await self.logs.log_action(user_id, "REFUEL_GEN", f"Added {liters}L to {gen_name}. New Level: {new_level:.1f}L",
+                                   quantity=liters, generator=gen_name, payload={"level_after": new_level})
+        mark_changed(self.repo.session)
 
     async def correct_fuel(self, user_id: int, gen_name: str, liters: float):
-        new_level = await self.repo.set_fuel_level(gen_name, liters)
-        await self.logs.log_action(user_id, "CORRECT_FUEL", f"Manual correction for {gen_name}: {liters}L")
+        new_level = await self.repo.set_fuel_level(gen_name, liters, user_id=user_id)
+        await self.logs.log_action(user_id, "CORRECT_FUEL", f"Manual correction for {gen_name}: {liters}L",
+                                   quantity=liters, generator=gen_name)
+        mark_changed(self.repo.session)
 
-    async def update_generator_specs(self, user_id: int, name: str, capacity: float, rate: float):
-        await self.repo.update_specs(name, capacity, rate)
-        await self.logs.log_action(user_id, "UPDATE_SPECS", f"Updated {name}: Cap={capacity}L, Rate={rate}L/h")
+    async def update_generator_specs(self, user_id: int, name: str, capacity: float | None = None, rate: float | None = None) -> Generator | None:
+        gen = await self.repo.update_specs(name, capacity, rate)
+        if gen:
+            await self.logs.log_action(user_id, "UPDATE_SPECS", f"Updated {name}: Cap={gen.tank_capacity}L, Rate={gen.consumption_rate}L/h",
+                                       generator=name, payload={"tank_capacity": gen.tank_capacity, "consumption_rate": gen.consumption_rate})
+            mark_changed(self.repo.session)
+        return gen
 
     async def rename_generators_init(self):
         # One-time rename if needed
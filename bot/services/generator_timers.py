@@ -0,0 +1,266 @@
+"""
+Exact alert timers for running generators.
+
+A running generator's alerts are known in advance from its run start, fuel
+level, specs and hours counter: rotation warning and critical rotation
+(hours since start), projected low tank (fuel burned at the weather-adjusted
+rate) and the next maintenance mark (`total_hours_run` crossing a multiple
+of GEN_MAINTENANCE_HOURS). The leader instance keeps them in a min-heap and
+sleeps until the earliest one.
+
+Starting, stopping, refuelling or re-speccing a generator on any instance
+publishes on CHANGED_CHANNEL after the commit (see `mark_changed`), and the
+leader re-plans the heap from the database. Every alert has a key in Redis
+(SET NX), so it fires once across re-plans and leader failover.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import NamedTuple
+
+from sqlalchemy import event
+
+from bot.config import config
+from bot.database.models import Generator, GenStatus
+from bot.database.repositories.generator import GeneratorRepository
+from bot.database.repositories.inventory import InventoryRepository
+
+CHANGED_CHANNEL = "generators:changed"
+FIRED_PREFIX = "gen_timer:fired:"
+FIRED_TTL = 14 * 24 * 3600  # seconds, longer than any run
+REPLAN_EVERY = 3600.0  # seconds; also refreshes the weather factor
+PENDING_CHANGE = "generators_changed"
+
+# Change notifications started after commit; the loop only keeps weak references to tasks
+_notifications: set[asyncio.Task] = set()
+
+
+class TimerKind(str, Enum):
+    rotation_warn = "rotation_warn"
+    rotation_critical = "rotation_critical"
+    low_fuel = "low_fuel"
+    maintenance = "maintenance"
+
+
+class GeneratorTimer(NamedTuple):
+    at: datetime  # UTC, like current_run_start
+    gen_name: str
+    kind: TimerKind
+    key: str  # Fire-once identity
+
+
+def plan_timers(gen: Generator, factor: float = 1.0, now: datetime | None = None) -> list[GeneratorTimer]:
+    """
+    Future alerts of `gen` (none unless it is running). With `now`, the
+    rotation warning is left out once the critical one is due as well.
+    """
+    if gen.status != GenStatus.running or not gen.current_run_start:
+        return []
+    start = gen.current_run_start
+    run = f"{gen.name}:{start:%Y%m%d%H%M%S}"
+
+    warn_at = start + timedelta(hours=config.GEN_ROTATION_WARN_HOURS)
+    critical_at = start + timedelta(hours=config.GEN_ROTATION_CRITICAL_HOURS)
+    timers = [GeneratorTimer(critical_at, gen.name, TimerKind.rotation_critical, f"{run}:rotation_critical")]
+    if now is None or critical_at > now:
+        timers.append(GeneratorTimer(warn_at, gen.name, TimerKind.rotation_warn, f"{run}:rotation_warn"))
+
+    # fuel_level is charged when the run ends: until then it is the level at
+    # start plus refuels, so a refuel or correction plans a new alert
+    rate = gen.consumption_rate * factor
+    if rate > 0:
+        low_mark = gen.tank_capacity * config.GEN_LOW_FUEL_PERCENT / 100
+        hours = max(gen.fuel_level - low_mark, 0) / rate
+        timers.append(GeneratorTimer(start + timedelta(hours=hours), gen.name, TimerKind.low_fuel,
+                                     f"{run}:low_fuel:{gen.fuel_level:.1f}"))
+
+    interval = config.GEN_MAINTENANCE_HOURS
+    if interval > 0:
+        total = gen.total_hours_run or 0.0
+        mark = (total // interval + 1) * interval
+        timers.append(GeneratorTimer(start + timedelta(hours=mark - total), gen.name, TimerKind.maintenance,
+                                     f"{gen.name}:maintenance:{mark:g}"))
+    return timers
+
+
+def _publish_after_commit(sync_session):
+    if sync_session.info.pop(PENDING_CHANGE, False):
+        task = asyncio.get_running_loop().create_task(notify_changed())
+        _notifications.add(task)
+        task.add_done_callback(_notifications.discard)
+
+
+async def notify_changed():
+    from bot.database.redis_client import redis_client
+    try:
+        await redis_client.publish(CHANGED_CHANNEL, 1)
+    except Exception as e:
+        logging.warning(f"Generator timers: change notification failed: {e}")
+
+
+def mark_changed(session):
+    """Generator state, fuel or specs changed: re-plan the timers once `session` commits."""
+    if not session.info.get(PENDING_CHANGE):
+        session.info[PENDING_CHANGE] = True
+        event.listen(session.sync_session, "after_commit", _publish_after_commit, once=True)
+
+
+class GeneratorTimers:
+    def __init__(self, redis=None, session_pool=None):
+        if redis is None:
+            from bot.database.redis_client import redis_client as redis
+        if session_pool is None:
+            from bot.database.main import session_maker as session_pool
+        self.redis = redis
+        self.session_pool = session_pool
+        self.factor = 1.0  # Weather consumption factor of the last plan
+        self._heap: list[tuple[datetime, int, GeneratorTimer]] = []
+        self._seq = itertools.count()  # Tie-breaker, timers themselves don't need to compare
+        self._changed = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def schedule(self, timers: list[GeneratorTimer]):
+        self._heap = [(timer.at, next(self._seq), timer) for timer in timers]
+        heapq.heapify(self._heap)
+
+    def next_at(self) -> datetime | None:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[GeneratorTimer]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    async def _weather_factor(self) -> float:
+        from bot.services.weather import WeatherService
+        weather = WeatherService()
+        try:
+            return weather.get_consumption_factor(await weather.get_current_temperature())
+        except Exception as e:
+            logging.warning(f"Generator timers: weather unavailable, planning at x{self.factor}: {e}")
+            return self.factor
+
+    async def replan(self):
+        async with self.session_pool() as session:
+            gens = await GeneratorRepository(session).get_all()
+        self.factor = await self._weather_factor()
+        now = datetime.utcnow()
+        self.schedule([timer for gen in gens for timer in plan_timers(gen, self.factor, now)])
+        logging.info(f"Generator timers re-planned: {len(self._heap)}, next at {self.next_at()}")
+
+    async def run(self):
+        """Leader loop: re-plan on changes (and hourly), fire due timers, sleep until the earliest one."""
+        loop = asyncio.get_running_loop()
+        next_replan = 0.0
+        while True:
+            try:
+                if self._changed.is_set() or loop.time() >= next_replan:
+                    self._changed.clear()
+                    await self.replan()
+                    next_replan = loop.time() + REPLAN_EVERY
+                for timer in self.pop_due(datetime.utcnow()):
+                    await self._fire(timer)
+
+                timeout = next_replan - loop.time()
+                if self._heap:
+                    timeout = min(timeout, (self.next_at() - datetime.utcnow()).total_seconds())
+                try:
+                    await asyncio.wait_for(self._changed.wait(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Popped timers come back with the next plan (fired ones are skipped by key)
+                logging.error(f"Generator timers error: {e}")
+                self._changed.set()
+                await asyncio.sleep(5)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANGED_CHANNEL)
+                    # Changes may have been missed while disconnected
+                    self._changed.set()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._changed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Generator timers: change listener error: {e}. Reconnecting in 5 sec...")
+                await asyncio.sleep(5)
+
+    async def start(self):
+        """Called on the instance elected leader"""
+        if self._tasks:
+            return
+        self._changed.set()
+        self._tasks = [asyncio.create_task(self.run()), asyncio.create_task(self._listen())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._heap = []
+
+    async def _fire(self, timer: GeneratorTimer):
+        from bot.services.outbox import outbox, AlertCategory
+        text = await self._message(timer)
+        if text is None:
+            return
+        if not await self.redis.set(f"{FIRED_PREFIX}{timer.key}", 1, nx=True, ex=FIRED_TTL):
+            return
+        category = {
+            TimerKind.rotation_warn: AlertCategory.rotation,
+            TimerKind.rotation_critical: AlertCategory.rotation,
+            TimerKind.low_fuel: AlertCategory.fuel_critical,
+            TimerKind.maintenance: AlertCategory.maintenance,
+        }[timer.kind]
+        logging.info(f"Generator timer fired: {timer.key}")
+        try:
+            await outbox.enqueue_all(text, category)
+        except Exception:
+            # Not queued: the next plan must be able to fire it again
+            await self.redis.delete(f"{FIRED_PREFIX}{timer.key}")
+            raise
+
+    async def _message(self, timer: GeneratorTimer) -> str | None:
+        """Alert text from the current row, None if the timer no longer belongs to the generator's plan"""
+        async with self.session_pool() as session:
+            gen = await GeneratorRepository(session).get_by_name(timer.gen_name)
+            if gen is None or timer.key not in {t.key for t in plan_timers(gen, self.factor)}:
+                return None
+            stock = await InventoryRepository(session).get_stock() if timer.kind == TimerKind.rotation_warn else 0
+
+        hours_run = (datetime.utcnow() - gen.current_run_start).total_seconds() / 3600
+        rate = gen.consumption_rate * self.factor
+        fuel_left = max(gen.fuel_level - hours_run * rate, 0)
+        time_left = fuel_left / rate if rate > 0 else 0
+
+        if timer.kind == TimerKind.rotation_critical:
+            return (f"🔴 <b>УВАГА: ПОТРІБНА РОТАЦІЯ!</b>\nГенератор {gen.name} працює вже {hours_run:.1f} год.\n"
+                    f"Терміново перемкніть на інший!")
+        if timer.kind == TimerKind.rotation_warn:
+            fuel_status = f"Запас на складі: {stock}л ({stock/20:.1f} каністр)."
+            if stock < 20:
+                fuel_status += " ⚠️ МАЛО ПАЛИВА! Немає чим заправити наступний."
+            return (f"⚠️ <b>Рекомендовано ротацію</b>\n"
+                    f"{gen.name} працює: {hours_run:.1f} год.\n"
+                    f"У баку: {fuel_left:.1f}л (~{time_left:.1f} год).\n"
+                    f"{fuel_status}\n"
+                    f"Плануйте перемикання у найближчі 2 години.")
+        if timer.kind == TimerKind.low_fuel:
+            return (f"⛽ <b>Мало палива в баку!</b>\n{gen.name}: ~{fuel_left:.1f}л з {gen.tank_capacity:.0f}л "
+                    f"(~{time_left:.1f} год роботи).\nЗаправте або перемкніть генератор.")
+        total = (gen.total_hours_run or 0.0) + hours_run
+        return (f"🔧 <b>ТЕХНІЧНЕ ОБСЛУГОВУВАННЯ</b>\nГенератор {gen.name} відпрацював {total:.1f} год.\n"
+                f"Час перевірити масло!")
+
+
+generator_timers = GeneratorTimers()
@@ -16,8 +16,9 @@ class InventoryService:
         return await self.repo.get_stock()
 
     async def take_fuel(self, user_id: int, liters: int) -> int:
-        new_amount = await self.repo.update_stock(-liters)
-        await self.logs.log_action(user_id, "TAKE_FUEL", f"Taken: {liters}L. Remaining: {new_amount}L")
+        new_amount = await self.repo.update_stock(-liters, user_id=user_id, reason="TAKE_FUEL")
+        await self.logs.log_action(user_id, "TAKE_FUEL", f"Taken: {liters}L. Remaining: {new_amount}L",
+                                   quantity=liters, payload={"balance_after": new_amount})
         
         # Check for critical alert (e.g. less than 2 cans = 40L)
         if new_amount < 40:
@@ -31,42 +32,20 @@ class InventoryService:
 
     async def add_cans(self, user_id: int, cans: int) -> int:
         liters = cans * 20
-        new_amount = await self.repo.update_stock(liters)
-        await self.logs.log_action(user_id, "ADD_FUEL", f"Added: {cans} cans ({liters}L). Total: {new_amount}L")
+        new_amount = await self.repo.update_stock(liters, user_id=user_id, reason="ADD_FUEL")
+        await self.logs.log_action(user_id, "ADD_FUEL", f"Added: {cans} cans ({liters}L). Total: {new_amount}L",
+                                   quantity=liters, payload={"cans": cans, "balance_after": new_amount})
         return new_amount
 
     async def _alert_admins(self, text: str):
-        from bot.services.notifier import NotifierService
-        notifier = NotifierService(self.bot)
-        await notifier.notify_all(text)
+        from bot.services.outbox import outbox, AlertCategory
+        await outbox.enqueue_all(text, AlertCategory.fuel_critical)
 
     async def get_detailed_stats(self):
-        from datetime import datetime, timedelta
-        
-        # 1. Current Stock
-        stock_liters = await self.repo.get_stock()
-        stock_cans = stock_liters / 20.0
-        
-        # 2. Last Refill
-        last_refillevent = await self.logs.get_last_action("ADD_FUEL")
-        last_refill_date = last_refillevent.timestamp if last_refillevent else None
-        
-        # 3. Consumption in last 7 days
+        # Stock, last refill and consumption in last 7 days: one aggregate query
         days = 7
-        since = datetime.utcnow() - timedelta(days=days)
-        refuel_events = await self.logs.get_actions_since("TAKE_FUEL", since)
-        
-        total_consumed = 0
-        for event in refuel_events:
-            # Parse detail string "Taken: 20L..."
-            # Simpler: We should have stored liters in a separate column or structured detail
-            # But regex or split works for now. 
-            try:
-                # "Taken: 20L. Remaining: ..."
-                part = event.details.split("Taken: ")[1].split("L")[0]
-                total_consumed += float(part)
-            except:
-                pass
+        stock_liters, last_refill_date, total_consumed = await self.repo.get_summary(days)
+        stock_cans = stock_liters / 20.0
                 
         avg_daily = total_consumed / days if days > 0 else 0
         avg_hourly = avg_daily / 24.0
@@ -0,0 +1,195 @@
+"""
+Scheduler job metrics, published to Redis so every instance (and the admin
+"⏱ Jobs" screen) sees the numbers of the leader that runs the jobs.
+
+Per job name (id up to the first ":", so all outage timers share one entry)
+a hash `jobs:metrics:<name>` holds counters, a duration histogram
+(`le_<bucket>` fields, cumulative like Prometheus) and start lag: how late a
+run started compared to its schedule, e.g. while the loop was blocked.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR,
+    EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES,
+)
+from pydantic import BaseModel
+
+KEY_PREFIX = "jobs:metrics:"
+NAMES_KEY = "jobs:metrics"
+BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float("inf"))  # seconds
+
+# KEYS[1] = hash, ARGV[1] = field, ARGV[2] = value
+_MAX_SCRIPT = """
+local current = tonumber(redis.call('hget', KEYS[1], ARGV[1]) or '0')
+if tonumber(ARGV[2]) > current then redis.call('hset', KEYS[1], ARGV[1], ARGV[2]) end
+return 1
+"""
+
+
+def job_name(job_id: str) -> str:
+    return job_id.split(":", 1)[0]
+
+
+def _bucket_field(le: float) -> str:
+    return "le_inf" if le == float("inf") else f"le_{le:g}"
+
+
+class JobStats(BaseModel):
+    name: str
+    ok: int = 0
+    failed: int = 0
+    misfires: int = 0
+    skipped: int = 0  # max_instances reached
+    overlaps: int = 0  # started while another run of the same job was still going
+    duration_sum: float = 0.0
+    duration_max: float = 0.0
+    last_duration: float = 0.0
+    lag_max: float = 0.0
+    last_lag: float = 0.0
+    last_run: float | None = None  # Unix time
+    last_error: str | None = None
+    buckets: dict[float, int] = {}  # le -> cumulative count
+
+    @property
+    def runs(self) -> int:
+        return self.ok + self.failed
+
+    @property
+    def duration_avg(self) -> float:
+        return self.duration_sum / self.runs if self.runs else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (duration_max for the open bucket)"""
+        if not self.runs:
+            return 0.0
+        rank = q * self.runs
+        for le in BUCKETS:
+            if self.buckets.get(le, 0) >= rank:
+                return self.duration_max if le == float("inf") else le
+        return self.duration_max
+
+    @classmethod
+    def from_hash(cls, name: str, raw: dict) -> "JobStats":
+        data = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                for k, v in raw.items()}
+        return cls(
+            name=name,
+            ok=int(data.get("ok", 0)),
+            failed=int(data.get("failed", 0)),
+            misfires=int(data.get("misfires", 0)),
+            skipped=int(data.get("skipped", 0)),
+            overlaps=int(data.get("overlaps", 0)),
+            duration_sum=float(data.get("duration_sum", 0)),
+            duration_max=float(data.get("duration_max", 0)),
+            last_duration=float(data.get("last_duration", 0)),
+            lag_max=float(data.get("lag_max", 0)),
+            last_lag=float(data.get("last_lag", 0)),
+            last_run=float(data["last_run"]) if "last_run" in data else None,
+            last_error=data.get("last_error"),
+            buckets={le: int(data.get(_bucket_field(le), 0)) for le in BUCKETS},
+        )
+
+
+class JobMetrics:
+    """APScheduler listener; events are turned into Redis writes on the event loop."""
+
+    EVENTS = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+
+    def __init__(self, redis=None):
+        if redis is None:
+            from bot.database.redis_client import redis_client as redis
+        self.redis = redis
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._started: dict[tuple[str, datetime], float] = {}  # (job id, scheduled time) -> monotonic start
+        self._running: dict[str, int] = {}  # job id -> runs in progress
+        self._tasks: set[asyncio.Task] = set()
+        self._installed = set()  # id() of schedulers already listened to
+
+    def install(self, scheduler):
+        self.loop = asyncio.get_running_loop()
+        if id(scheduler) not in self._installed:
+            scheduler.add_listener(self.on_event, self.EVENTS)
+            self._installed.add(id(scheduler))
+
+    def on_event(self, event):
+        # Listeners may be called from executor threads: hop onto the loop
+        updates = self._updates(event)
+        if not updates or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._spawn, job_name(event.job_id), updates)
+
+    def _spawn(self, name: str, updates: dict):
+        task = self.loop.create_task(self._publish(name, updates))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _updates(self, event) -> dict:
+        """Event -> {"incr": {...}, "set": {...}, "max": {...}} for the job's hash"""
+        now = time.monotonic()
+        if event.code == EVENT_JOB_SUBMITTED:
+            incr = {}
+            if self._running.get(event.job_id, 0) > 0:
+                incr["overlaps"] = 1
+            # One execution event follows per run time (a single one with coalescing)
+            for scheduled in event.scheduled_run_times:
+                self._started[(event.job_id, scheduled)] = now
+            self._running[event.job_id] = self._running.get(event.job_id, 0) + len(event.scheduled_run_times)
+            lag = max((datetime.now(timezone.utc) - event.scheduled_run_times[-1]).total_seconds(), 0.0)
+            return {"incr": incr, "set": {"last_lag": lag}, "max": {"lag_max": lag}}
+
+        if event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+            self._running[event.job_id] = max(self._running.get(event.job_id, 1) - 1, 0)
+            started = self._started.pop((event.job_id, event.scheduled_run_time), None)
+            duration = now - started if started is not None else 0.0
+            failed = event.code == EVENT_JOB_ERROR
+            incr = {"failed" if failed else "ok": 1, "duration_sum": duration}
+            for le in BUCKETS:
+                if duration <= le:
+                    incr[_bucket_field(le)] = 1
+            values = {"last_duration": duration, "last_run": time.time()}
+            if failed:
+                values["last_error"] = repr(event.exception)[:200]
+            return {"incr": incr, "set": values, "max": {"duration_max": duration}}
+
+        if event.code == EVENT_JOB_MISSED:
+            return {"incr": {"misfires": 1}, "set": {}, "max": {}}
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            return {"incr": {"skipped": 1}, "set": {}, "max": {}}
+        return {}
+
+    async def _publish(self, name: str, updates: dict):
+        key = f"{KEY_PREFIX}{name}"
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sadd(NAMES_KEY, name)
+            for field, value in updates["incr"].items():
+                if isinstance(value, float):
+                    pipe.hincrbyfloat(key, field, value)
+                else:
+                    pipe.hincrby(key, field, value)
+            if updates["set"]:
+                pipe.hset(key, mapping=updates["set"])
+            for field, value in updates["max"].items():
+                pipe.eval(_MAX_SCRIPT, 1, key, field, value)
+            await pipe.execute()
+        except Exception as e:
+            logging.error(f"Job metrics publish failed: {e}")
+
+    async def get_all(self) -> list[JobStats]:
+        names = sorted(n.decode() if isinstance(n, bytes) else n for n in await self.redis.smembers(NAMES_KEY))
+        stats = []
+        for name in names:
+            stats.append(JobStats.from_hash(name, await self.redis.hgetall(f"{KEY_PREFIX}{name}")))
+        return stats
+
+    async def reset(self):
+        names = await self.redis.smembers(NAMES_KEY)
+        keys = [f"{KEY_PREFIX}{n.decode() if isinstance(n, bytes) else n}" for n in names]
+        await self.redis.delete(NAMES_KEY, *keys)
+
+
+job_metrics = JobMetrics()
@@ -0,0 +1,81 @@
+"""
+Leader election between bot instances (Redis lease).
+
+The leader holds `leader:<name>` = instance id with a TTL and renews it
+every heartbeat; the others try `SET NX` on the same heartbeat, so a
+standby takes over at most TTL + heartbeat after the leader dies. Only the
+leader runs scheduler jobs, every instance keeps polling Telegram.
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from bot.config import config
+from bot.services.locks import EXTEND_SCRIPT, RELEASE_SCRIPT
+
+
+class LeaderElector:
+    def __init__(self,
+                 name: str,
+                 on_elected: Callable[[], Awaitable[None]],
+                 on_demoted: Callable[[], Awaitable[None]],
+                 ttl: float | None = None,
+                 heartbeat: float | None = None,
+                 redis=None):
+        if redis is None:
+            from bot.database.redis_client import redis_client as redis
+        self.redis = redis
+        self.key = f"leader:{name}"
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.ttl_ms = int((ttl or config.LEADER_LEASE_TTL) * 1000)
+        self.heartbeat = heartbeat or config.LEADER_HEARTBEAT
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._last_renewal = 0.0
+
+    async def tick(self):
+        """One heartbeat: renew the lease if we hold it, otherwise try to take it."""
+        loop = asyncio.get_running_loop()
+        try:
+            if self.is_leader:
+                held = await self.redis.eval(EXTEND_SCRIPT, 1, self.key, self.instance_id, self.ttl_ms)
+            else:
+                held = await self.redis.set(self.key, self.instance_id, nx=True, px=self.ttl_ms)
+        except Exception as e:
+            logging.error(f"Leader heartbeat failed: {e}")
+            # Can't renew: step down before the lease may have passed to someone else
+            held = self.is_leader and loop.time() - self._last_renewal < self.ttl_ms / 1000 - self.heartbeat
+
+        if held:
+            self._last_renewal = loop.time()
+        if held and not self.is_leader:
+            self.is_leader = True
+            logging.info(f"Leader {self.key}: {self.instance_id} elected")
+            await self.on_elected()
+        elif not held and self.is_leader:
+            self.is_leader = False
+            logging.warning(f"Leader {self.key}: {self.instance_id} lost the lease")
+            await self.on_demoted()
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logging.error(f"Leader election error: {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    async def resign(self):
+        """Release the lease on shutdown so a standby takes over right away."""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            await self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.instance_id)
+        except Exception as e:
+            logging.error(f"Leader resign failed: {e}")
+        await self.on_demoted()
@@ -0,0 +1,158 @@
+"""
+Redis locks shared by all bot instances.
+
+RedisLock is a lease on `lock:<name>` = token with a TTL, renewed while the
+holder works, released with compare-and-delete. Every acquisition takes a
+new fencing token from `INCR lock:<name>:fence` (in the same script as the
+SET, so waiting doesn't burn tokens); tokens only grow.
+
+`check()` is a best-effort early exit: the lease can still expire between
+it and a commit. Real fencing is `fence(session)`, which records the token
+in the database inside the caller's transaction (lock_fences), so a holder
+whose lease ran out (GC pause, lost connection) can't commit after a newer
+holder did.
+
+SingleFlight coalesces concurrent calls with the same key inside one
+process (all callers await the same run) and serializes runs across
+instances with a RedisLock. The run gets its own DB session, so it doesn't
+depend on (or get closed with) the caller that happened to start it.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import config
+
+T = TypeVar("T")
+
+# KEYS[1] = lock key, KEYS[2] = fence counter, ARGV[1] = ttl ms. Returns the token, 0 if busy
+ACQUIRE_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then return 0 end
+local token = redis.call('incr', KEYS[2])
+redis.call('set', KEYS[1], token, 'PX', ARGV[1])
+return token
+"""
+# KEYS[1] = lock key, ARGV[1] = token (, ARGV[2] = ttl ms)
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+EXTEND_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+
+POLL_INTERVAL = 0.2  # seconds between attempts while the lock is busy
+
+
+class LockTimeout(Exception):
+    """The lock stayed busy for longer than the wait limit."""
+
+
+class LockLost(Exception):
+    """The lease expired or was taken over: results must not be committed."""
+
+
+class RedisLock:
+    def __init__(self, name: str, ttl: float | None = None, wait: float | None = None, redis=None):
+        if redis is None:
+            from bot.database.redis_client import redis_client as redis
+        self.redis = redis
+        self.name = name
+        self.key = f"lock:{name}"
+        self.fence_key = f"lock:{name}:fence"
+        self.ttl_ms = int((ttl or config.OUTAGE_LOCK_TTL) * 1000)
+        self.wait = wait if wait is not None else config.OUTAGE_LOCK_WAIT
+        self.token: int | None = None
+        self._renew_task: asyncio.Task | None = None
+
+    async def acquire(self) -> int:
+        """Wait for the lock, return the fencing token"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait
+        while True:
+            token = await self.redis.eval(ACQUIRE_SCRIPT, 2, self.key, self.fence_key, self.ttl_ms)
+            if token:
+                self.token = int(token)
+                self._renew_task = asyncio.create_task(self._renew())
+                return self.token
+            if loop.time() >= deadline:
+                raise LockTimeout(self.key)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _renew(self):
+        # Extend the lease at a third of the TTL while the holder is working
+        while True:
+            await asyncio.sleep(self.ttl_ms / 3000)
+            try:
+                if not await self.redis.eval(EXTEND_SCRIPT, 1, self.key, self.token, self.ttl_ms):
+                    logging.warning(f"Lock {self.key} lost (token {self.token})")
+                    return
+            except Exception as e:
+                logging.error(f"Lock {self.key} renew failed: {e}")
+
+    async def check(self):
+        """Raise LockLost unless this holder's token is still the current one (best effort, see fence)"""
+        current = await self.redis.get(self.key)
+        if current is None or int(current) != self.token:
+            raise LockLost(f"{self.key}: token {self.token}, current {current}")
+
+    async def fence(self, session):
+        """
+        Raise LockLost unless this token is at least the last one committed
+        under the lock. Call inside the transaction, right before commit.
+        """
+        from bot.database.repositories.lock_fence import LockFenceRepository
+        if not await LockFenceRepository(session).advance(self.name, self.token):
+            raise LockLost(f"{self.key}: token {self.token} is older than the last committed one")
+
+    async def release(self):
+        if self._renew_task:
+            self._renew_task.cancel()
+            self._renew_task = None
+        if self.token is not None:
+            await self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            self.token = None
+
+    async def __aenter__(self) -> "RedisLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+        return False
+
+
+class SingleFlight:
+    def __init__(self, lock_name: str, ttl: float | None = None, wait: float | None = None, redis=None,
+                 session_pool=None):
+        self.lock_name = lock_name
+        self.ttl = ttl
+        self.wait = wait
+        self.redis = redis
+        self.session_pool = session_pool
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, factory: Callable[[AsyncSession, RedisLock], Awaitable[T]]) -> T:
+        """
+        Run `factory(session, lock)` under the lock, on a DB session owned by
+        the run, or join the run already in flight for `key`. Callers that
+        join get the same result (or exception).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._locked(factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        else:
+            logging.info(f"Single-flight {self.lock_name}/{key}: joining the run in progress")
+        # A cancelled caller must not cancel the run the others wait on
+        return await asyncio.shield(task)
+
+    async def _locked(self, factory: Callable[[AsyncSession, RedisLock], Awaitable[T]]) -> T:
+        session_pool = self.session_pool
+        if session_pool is None:
+            from bot.database.main import session_maker as session_pool
+        async with RedisLock(self.lock_name, self.ttl, self.wait, self.redis) as lock:
+            async with session_pool() as session:
+                return await factory(session, lock)
+
+
+# Outage pipeline: periodic check, admin "force" check and the outage timers
+outage_flight = SingleFlight("outage")
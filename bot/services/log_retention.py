@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from bot.config import config
+from bot.database.log_archive import LogArchive, month_start
+from bot.database.main import session_maker
+from bot.database.repositories.logs import LogRepository
+
+
+def _months_back(month, count: int):
+    index = month.year * 12 + month.month - 1 - count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+async def run_log_retention(retention_months: int | None = None, archive: LogArchive | None = None,
+                            session_pool=session_maker) -> list[str]:
+    """
+    Monthly maintenance of the partitioned `logs` table:
+    1. make sure partitions exist for the coming months;
+    2. every partition older than `LOG_RETENTION_MONTHS` is detached, written
+       to a compressed archive file and dropped.
+
+    The detach is committed on its own, so `logs` is locked exclusively only
+    for the detach itself; rows are then streamed into the archive file. If
+    the export, drop or commit fails, the archive file is removed and the
+    partition attached again, so the month is never in both places.
+    Returns names of archived partitions.
+    """
+    retention_months = retention_months if retention_months is not None else config.LOG_RETENTION_MONTHS
+    archive = archive or LogArchive()
+    cutoff = _months_back(month_start(datetime.utcnow()), retention_months)
+
+    async with session_pool() as session:
+        repo = LogRepository(session)
+        await repo.ensure_partitions(config.LOG_PARTITIONS_AHEAD)
+        await session.commit()
+        partitions = [(name, month) for name, month in await repo.get_partitions() if month < cutoff]
+
+    archived = []
+    for name, month in partitions:
+        async with session_pool() as session:
+            await LogRepository(session).detach_partition(name)
+            await session.commit()
+        path, dropped = None, False
+        try:
+            async with session_pool() as session:
+                repo = LogRepository(session)
+                writer = await asyncio.to_thread(archive.writer, month)
+                try:
+                    async for rows in repo.stream_partition(name):
+                        await asyncio.to_thread(writer.write_rows, rows)
+                    path = await asyncio.to_thread(writer.close)
+                except BaseException:
+                    await asyncio.to_thread(writer.abort)
+                    raise
+                await repo.drop_partition(name)
+                await session.commit()
+                dropped = True
+        except Exception:
+            if dropped:
+                raise
+            # Keep the month queryable, in the live table only; the next run tries again
+            if path is not None:
+                await asyncio.to_thread(path.unlink, missing_ok=True)
+            async with session_pool() as session:
+                await LogRepository(session).attach_partition(name, month)
+                await session.commit()
+            raise
+        logging.info(f"Log retention: archived {name} ({writer.rows} rows) to {path}")
+        archived.append(name)
+    return archived
@@ -1,34 +1,25 @@
 from aiogram import Bot
 from bot.config import config
+from bot.services.broadcaster import DeliveryResult, get_broadcaster
 
 class NotifierService:
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.broadcaster = get_broadcaster(bot)
 
-    async def notify_all(self, text: str):
+    async def notify_all(self, text: str) -> list[DeliveryResult]:
         """Sends message to Admins and optionally to Workers."""
         recipients = set(config.ADMIN_IDS)
-        
+
         if config.NOTIFY_WORKERS:
             recipients.update(config.ALLOWED_IDS)
-            
-        for user_id in recipients:
-            try:
-                await self.bot.send_message(user_id, text, parse_mode="HTML")
-            except Exception:
-                pass # Blocked or invalid ID
 
-    async def notify_admins(self, text: str):
+        return await self.broadcaster.broadcast(recipients, text)
+
+    async def notify_admins(self, text: str) -> list[DeliveryResult]:
         """Sends message only to Admins."""
-        for admin_id in config.ADMIN_IDS:
-            try:
-                await self.bot.send_message(admin_id, text, parse_mode="HTML")
-            except Exception:
-                pass
+        return await self.broadcaster.broadcast(config.ADMIN_IDS, text)
 
-    async def notify_user(self, user_id: int, text: str, reply_markup=None):
+    async def notify_user(self, user_id: int, text: str, reply_markup=None) -> DeliveryResult:
         """Sends message to specific user."""
-        try:
-            await self.bot.send_message(user_id, text, parse_mode="HTML", reply_markup=reply_markup)
-        except Exception as e:
-            pass # Blocked or invalid ID
+        return await self.broadcaster.send(user_id, text, reply_markup=reply_markup)
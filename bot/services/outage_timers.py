@@ -0,0 +1,98 @@
+"""
+One-shot scheduler jobs driven by the outage timeline.
+
+For every outage block two DateTrigger jobs are planned: the warning at
+T-30 (creates the session and sends the cards) and the deadline (marks the
+session expired, "power is back"). The periodic outage check refreshes the
+timeline and calls `replan`, which only touches the scheduler when the
+planned set of timers changes. The jobs live in the shared job store, so a
+newly elected leader calls `reset` and the next replan compares against the
+store instead of its own last plan.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from apscheduler.triggers.date import DateTrigger
+
+WARN_BEFORE = timedelta(minutes=30)
+WARN_PREFIX = "outage_warn:"
+END_PREFIX = "outage_end:"
+
+# Timer ids of the last plan (this process); unchanged timeline -> nothing to do
+_planned: frozenset[str] | None = None
+
+
+def reset():
+    """Forget the last plan: the store may hold timers planned by another leader"""
+    global _planned
+    _planned = None
+
+
+def plan_blocks(timeline: list[datetime]) -> list[tuple[datetime, datetime]]:
+    """Group outage hours into continuous blocks: [(block_start, deadline)], also across midnight"""
+    blocks = []
+    for dt in sorted(set(timeline)):
+        if blocks and blocks[-1][1] == dt:
+            blocks[-1] = (blocks[-1][0], dt + timedelta(hours=1))
+        else:
+            blocks.append((dt, dt + timedelta(hours=1)))
+    return blocks
+
+
+def _timers(timeline: list[datetime], now: datetime) -> dict:
+    """job id -> (func, run_date, args) for every timer still ahead of `now`"""
+    timers = {}
+    for block_start, deadline in plan_blocks(timeline):
+        if deadline <= now:
+            continue
+        key = f"{block_start:%Y%m%d%H%M}-{deadline:%Y%m%d%H%M}"
+        warn_at = block_start - WARN_BEFORE
+        # Already inside the window: the periodic check creates the session
+        if warn_at > now:
+            timers[WARN_PREFIX + key] = (outage_warning_job, warn_at, [block_start, deadline])
+        timers[END_PREFIX + key] = (outage_deadline_job, deadline, [])
+    return timers
+
+
+def replan(timeline: list[datetime], now: datetime | None = None, sched=None) -> bool:
+    """
+    Sync the outage timers with `timeline`: timers of blocks that disappeared
+    or changed are removed, new ones added. Returns True if anything changed.
+    """
+    global _planned
+    if sched is None:
+        from bot.scheduler import scheduler as sched
+    now = now or datetime.now()
+
+    timers = _timers(timeline, now)
+    if frozenset(timers) == _planned:
+        return False
+
+    existing = {job.id for job in sched.get_jobs() if job.id.startswith((WARN_PREFIX, END_PREFIX))}
+    for job_id in existing - timers.keys():
+        sched.remove_job(job_id)
+    for job_id in timers.keys() - existing:
+        func, run_date, args = timers[job_id]
+        sched.add_job(func, DateTrigger(run_date=run_date), args=args, id=job_id, replace_existing=True)
+
+    changed = bool(existing ^ timers.keys())
+    if changed:
+        logging.info(f"Outage timers re-planned: {sorted(timers)}")
+    _planned = frozenset(timers)
+    return changed
+
+
+async def outage_warning_job(block_start: datetime, deadline: datetime):
+    from bot.database.main import session_maker
+    from bot.scheduler import get_bot
+    from bot.services.session_service import SessionService
+    async with session_maker() as session:
+        await SessionService(session, bot=get_bot()).open_block(block_start, deadline)
+
+
+async def outage_deadline_job():
+    from bot.database.main import session_maker
+    from bot.scheduler import get_bot
+    from bot.services.session_service import SessionService
+    async with session_maker() as session:
+        await SessionService(session, bot=get_bot()).close_due()
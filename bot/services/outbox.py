@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+from datetime import datetime
+from enum import Enum
+from typing import Iterable
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from pydantic import BaseModel, Field
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from bot.config import config
+from bot.database.redis_client import redis_client
+
+
+class OutboxLane(str, Enum):
+    critical = "critical"
+    normal = "normal"
+    routine = "routine"
+
+
+class AlertCategory(str, Enum):
+    fuel_critical = "fuel_critical"
+    session_created = "session_created"
+    session_deadline = "session_deadline"
+    rotation = "rotation"
+    maintenance = "maintenance"
+    weather_report = "weather_report"
+    general = "general"
+
+
+CATEGORY_LANES = {
+    AlertCategory.fuel_critical: OutboxLane.critical,
+    AlertCategory.session_created: OutboxLane.critical,
+    AlertCategory.session_deadline: OutboxLane.normal,
+    AlertCategory.rotation: OutboxLane.normal,
+    AlertCategory.maintenance: OutboxLane.normal,
+    AlertCategory.general: OutboxLane.normal,
+    AlertCategory.weather_report: OutboxLane.routine,
+}
+
+# Lanes are always drained in this order
+LANE_PRIORITY = [OutboxLane.critical, OutboxLane.normal, OutboxLane.routine]
+
+
+class OutboxMessage(BaseModel):
+    chat_id: int
+    text: str
+    category: AlertCategory = AlertCategory.general
+    reply_markup: InlineKeyboardMarkup | None = None
+    session_id: int | None = None
+    card_role: str | None = None  # Delivered message becomes the session card for this chat
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def dedup_key(self) -> str:
+        digest = hashlib.sha1(
+            f"{self.chat_id}:{self.category.value}:{self.session_id}:{self.text}".encode()
+        ).hexdigest()
+        return f"outbox:dedup:{digest}"
+
+
+class Outbox:
+    """
+    Durable outbound message queue on top of Redis streams.
+
+    Producers call `enqueue*` which only writes to Redis and returns.
+    One stream per lane (`outbox:critical`, `outbox:normal`, `outbox:routine`);
+    the consumer always drains higher lanes first. Entries are acknowledged only
+    once delivered: messages read by a crashed process, or whose delivery
+    failed, stay pending in the consumer group and are reclaimed later.
+    Permanent failures and entries that failed `OUTBOX_MAX_DELIVERIES` times
+    are moved to the `outbox:dead` stream.
+    Identical messages (same chat, category, text) are dropped within
+    `OUTBOX_DEDUP_WINDOW` seconds.
+    """
+
+    GROUP = "outbox"
+    DEAD_LETTER = "outbox:dead"
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self.in_flight: set[bytes] = set()
+
+    @staticmethod
+    def stream_key(lane: OutboxLane) -> str:
+        return f"outbox:{lane.value}"
+
+    # --- Producer side ---
+
+    async def enqueue(self,
+                      chat_ids: Iterable[int],
+                      text: str,
+                      category: AlertCategory = AlertCategory.general,
+                      reply_markup: InlineKeyboardMarkup | None = None,
+                      session_id: int | None = None,
+                      card_role: str | None = None) -> int:
+        """Queue one entry per recipient. Returns number of entries actually queued."""
+        lane = CATEGORY_LANES[category]
+        queued = 0
+        for chat_id in dict.fromkeys(chat_ids):
+            message = OutboxMessage(
+                chat_id=chat_id,
+                text=text,
+                category=category,
+                reply_markup=reply_markup,
+                session_id=session_id,
+                card_role=card_role,
+            )
+            is_new = await self.redis.set(message.dedup_key(), 1, nx=True, ex=config.OUTBOX_DEDUP_WINDOW)
+            if not is_new:
+                logging.info(f"Outbox: duplicate {category.value} for {chat_id} suppressed")
+                continue
+            try:
+                await self.redis.xadd(
+                    self.stream_key(lane),
+                    {"data": message.model_dump_json(exclude_none=True)},
+                    maxlen=config.OUTBOX_MAXLEN,
+                    approximate=True,
+                )
+            except Exception:
+                # Not queued: must not suppress the next attempt
+                await self.redis.delete(message.dedup_key())
+                raise
+            queued += 1
+        return queued
+
+    async def enqueue_all(self, text: str, category: AlertCategory = AlertCategory.general) -> int:
+        """Admins and, if enabled, workers (same audience as NotifierService.notify_all)."""
+        recipients = set(config.ADMIN_IDS)
+        if config.NOTIFY_WORKERS:
+            recipients.update(config.ALLOWED_IDS)
+        return await self.enqueue(recipients, text, category)
+
+    async def enqueue_admins(self, text: str, category: AlertCategory = AlertCategory.general) -> int:
+        return await self.enqueue(config.ADMIN_IDS, text, category)
+
+    # --- Consumer side ---
+
+    async def _ensure_groups(self):
+        for lane in LANE_PRIORITY:
+            try:
+                await self.redis.xgroup_create(self.stream_key(lane), self.GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def _reclaim(self, lane: OutboxLane) -> list[tuple[bytes, dict]]:
+        """Take over entries left pending by crashed consumers (or by us before a restart)."""
+        result = await self.redis.xautoclaim(
+            self.stream_key(lane), self.GROUP, self.consumer_name,
+            min_idle_time=config.OUTBOX_CLAIM_IDLE_MS, count=config.OUTBOX_BATCH_SIZE
+        )
+        return [entry for entry in result[1] if entry[1]]
+
+    async def _read(self, block: int) -> dict[OutboxLane, list[tuple[bytes, dict]]]:
+        """Read new entries from all lanes at once (at most a batch per lane)."""
+        response = await self.redis.xreadgroup(
+            self.GROUP, self.consumer_name, {self.stream_key(lane): ">" for lane in LANE_PRIORITY},
+            count=config.OUTBOX_BATCH_SIZE, block=block
+        )
+        lanes = {self.stream_key(lane).encode(): lane for lane in LANE_PRIORITY}
+        return {lanes[stream]: entries for stream, entries in response or [] if entries}
+
+    async def _deliver(self, digest, lane: OutboxLane, entry_id: bytes, fields: dict):
+        if entry_id in self.in_flight:
+            return  # Still buffered in a digest, not abandoned
+        try:
+            message = OutboxMessage.model_validate_json(fields[b"data"])
+        except Exception:
+            logging.exception(f"Outbox: broken entry {entry_id!r} in {lane.value}")
+            await self.redis.xack(self.stream_key(lane), self.GROUP, entry_id)
+            return
+
+        async def on_sent(result):
+            try:
+                if result.ok:
+                    if message.card_role and message.session_id and result.message_id:
+                        await self._save_card(message, result.message_id)
+                    await self.redis.xack(self.stream_key(lane), self.GROUP, entry_id)
+                    return
+                logging.error(f"Outbox: failed to deliver {message.category.value} to {message.chat_id}: {result.error}")
+                if result.permanent or await self._deliveries(lane, entry_id) >= config.OUTBOX_MAX_DELIVERIES:
+                    await self._dead_letter(lane, entry_id, fields[b"data"], result.error)
+                # Otherwise left pending: reclaimed and retried after OUTBOX_CLAIM_IDLE_MS
+            finally:
+                self.in_flight.discard(entry_id)
+
+        self.in_flight.add(entry_id)
+        try:
+            await digest.submit(
+                message.chat_id, message.text, message.category,
+                reply_markup=message.reply_markup, on_sent=on_sent,
+                # Cards must keep their own message id to be edited later
+                immediate=message.card_role is not None
+            )
+        except Exception:
+            # Left pending: will be reclaimed and retried
+            self.in_flight.discard(entry_id)
+            logging.exception(f"Outbox: delivery of {entry_id!r} failed")
+
+    async def _deliveries(self, lane: OutboxLane, entry_id: bytes) -> int:
+        """How many times the entry was read (XREADGROUP or XAUTOCLAIM) so far"""
+        pending = await self.redis.xpending_range(self.stream_key(lane), self.GROUP, entry_id, entry_id, 1)
+        return pending[0]["times_delivered"] if pending else 0
+
+    async def _dead_letter(self, lane: OutboxLane, entry_id: bytes, data: bytes, error: str | None):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.DEAD_LETTER,
+                  {"data": data, "lane": lane.value, "entry_id": entry_id, "error": error or ""},
+                  maxlen=config.OUTBOX_MAXLEN, approximate=True)
+        pipe.xack(self.stream_key(lane), self.GROUP, entry_id)
+        await pipe.execute()
+        logging.warning(f"Outbox: {entry_id!r} from {lane.value} moved to {self.DEAD_LETTER}")
+
+    @staticmethod
+    async def _save_card(message: OutboxMessage, message_id: int):
+        from bot.database.main import session_maker
+        from bot.database.repositories.session_message import SessionMessageRepository
+        try:
+            async with session_maker() as session:
+                await SessionMessageRepository(session).save(
+                    message.session_id, message.chat_id, message_id, message.card_role
+                )
+                await session.commit()
+        except Exception:
+            logging.exception(f"Outbox: failed to store card of session {message.session_id}")
+
+    async def _process(self, digest, lane: OutboxLane, entries: list[tuple[bytes, dict]]):
+        await asyncio.gather(*(self._deliver(digest, lane, entry_id, fields) for entry_id, fields in entries))
+
+    async def _reclaim_all(self, digest):
+        for lane in LANE_PRIORITY:
+            entries = await self._reclaim(lane)
+            if entries:
+                await self._process(digest, lane, entries)
+
+    async def run_consumer(self, bot: Bot):
+        from bot.services.notifier import NotifierService
+        from bot.services.digest import DigestCoalescer
+        digest = DigestCoalescer(NotifierService(bot))
+
+        while True:
+            try:
+                await self._ensure_groups()
+                await self._reclaim_all(digest)
+
+                while True:
+                    batches = await self._read(block=5000)
+                    if not batches:
+                        # Idle: pick up anything a dead consumer left behind
+                        await self._reclaim_all(digest)
+                        continue
+                    # Critical first; a backlog of routine messages never
+                    # delays the next critical batch by more than one pass
+                    for lane in LANE_PRIORITY:
+                        if lane in batches:
+                            await self._process(digest, lane, batches[lane])
+            except asyncio.CancelledError:
+                # Shutdown: send what is still buffered in digests (entries are acked on delivery)
+                await digest.flush_all()
+                raise
+            except Exception as e:
+                logging.error(f"Outbox consumer error: {e}. Restarting in 5 sec...")
+                await asyncio.sleep(5)
+
+outbox = Outbox(redis_client)
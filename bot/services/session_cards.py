@@ -0,0 +1,131 @@
+from datetime import datetime
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import config
+from bot.database.models import RefuelSession, SessionStatus
+from bot.database.repositories.session_message import SessionMessageRepository
+from bot.database.repositories.user import UserRepository
+from bot.keyboards.session_kb import get_start_session_kb, get_in_progress_kb
+from bot.services.broadcaster import get_broadcaster
+from bot.services.outbox import outbox, AlertCategory
+
+WORKER = "worker"
+ADMIN = "admin"
+
+
+def _fmt_dt(dt: datetime) -> str:
+    if dt.date() == datetime.now().date():
+        return dt.strftime('%H:%M')
+    return dt.strftime('%d.%m %H:%M')
+
+
+class SessionCardService:
+    """
+    One live message ("card") per refuel session and recipient.
+
+    `publish` queues the initial cards through the outbox; the consumer stores
+    the resulting message ids in `session_messages`. `refresh` re-renders the
+    card for the current session status and edits every stored message in
+    place instead of sending new ones.
+    """
+
+    def __init__(self, session: AsyncSession, bot: Bot):
+        self.messages = SessionMessageRepository(session)
+        self.users = UserRepository(session)
+        self.broadcaster = get_broadcaster(bot)
+
+    async def workers_str(self, s: RefuelSession) -> str:
+        names = []
+        for worker_id in (s.worker1_id, s.worker2_id):
+            user = await self.users.get_cached(worker_id) if worker_id else None
+            names.append((user.sheet_name or user.name) if user else "—")
+        return ", ".join(names)
+
+    @staticmethod
+    def render(s: RefuelSession, role: str, workers_str: str, actor_name: str | None = None) -> tuple[str, InlineKeyboardMarkup | None]:
+        period = f"⏰ Період: {_fmt_dt(s.block_start or s.start_time)} - {_fmt_dt(s.deadline)}\n"
+        status = SessionStatus(s.status)
+
+        if role == ADMIN:
+            titles = {
+                SessionStatus.pending: f"🚀 <b>Створено сесію заправки</b> (ID: {s.id})",
+                SessionStatus.in_progress: f"⚙️ <b>Сесія в процесі</b> (ID: {s.id})",
+                SessionStatus.expired: f"📢 <b>Час відновлення!</b> Сесія {s.id} досягла дедлайну ({s.deadline.strftime('%H:%M')}).",
+                SessionStatus.completed: f"✅ <b>Сесію завершено</b> (ID: {s.id})",
+                SessionStatus.cancelled: f"❌ <b>Сесію скасовано</b> (ID: {s.id})",
+            }
+            text = f"{titles[status]}\n{period}👷 Воркери: {workers_str}\n"
+            if status == SessionStatus.pending and not s.worker1_id and not s.worker2_id:
+                text += "❌ <b>Помилка:</b> Воркери не знайдени в базі!"
+            if status == SessionStatus.in_progress and actor_name:
+                text += f"Розпочав: {actor_name}\n"
+            if status == SessionStatus.completed:
+                text += f"⚡️ Генератор: {s.gen_name}\n⛽️ Паливо: {s.liters}л ({s.cans or 0:.1f} кан)\n"
+            return text, None
+
+        if status == SessionStatus.pending:
+            text = (f"🔔 <b>Відключення світла!</b>\n\n{period}"
+                    f"👷 На зміні: {workers_str}\n\n"
+                    f"Потрібно заправити генератор!")
+            return text, get_start_session_kb(s.id)
+
+        if status == SessionStatus.in_progress:
+            text = f"⚙️ <b>Сесія в процесі</b>\n\n{period}👷 На зміні: {workers_str}\n"
+            if actor_name:
+                text += f"Розпочав: {actor_name}\n"
+            text += "\nНатисніть 'Завершити', коли заправите генератор."
+            return text, get_in_progress_kb(s.id)
+
+        # Closed sessions (expired, completed, cancelled) have no buttons left
+        if status == SessionStatus.expired:
+            text = (f"⚡ <b>Електроенергія має з'явитися за графіком!</b>\n\n{period}"
+                    f"Поверніть генератор у режим чергування або зупиніть його.")
+            return text, None
+
+        if status == SessionStatus.completed:
+            end = s.end_time.strftime('%H:%M') if s.end_time else "—"
+            text = (f"✅ <b>Сесію # {s.id} завершено!</b>\n\n{period}"
+                    f"⚡️ Генератор: {s.gen_name}\n"
+                    f"⛽️ Паливо: {s.liters}л ({s.cans or 0:.1f} кан)\n"
+                    f"🕒 Час: {end}")
+            return text, None
+
+        return f"❌ <b>Сесію # {s.id} скасовано</b>\n\n{period}", None
+
+    async def _enqueue_cards(self, s: RefuelSession, role: str, chat_ids: list[int], workers_str: str, category: AlertCategory):
+        if not chat_ids:
+            return
+        text, kb = self.render(s, role, workers_str)
+        await outbox.enqueue(chat_ids, text, category, reply_markup=kb, session_id=s.id, card_role=role)
+
+    async def publish(self, s: RefuelSession, workers_str: str):
+        """Queue the first card for workers on shift and admins."""
+        workers = [w for w in (s.worker1_id, s.worker2_id) if w]
+        await self._enqueue_cards(s, WORKER, workers, workers_str, AlertCategory.session_created)
+        await self._enqueue_cards(s, ADMIN, list(config.ADMIN_IDS), workers_str, AlertCategory.session_created)
+
+    async def refresh(self, s: RefuelSession, actor_name: str | None = None,
+                      resend_category: AlertCategory | None = None) -> set[int]:
+        """
+        Edit all stored cards of the session. Returns chat ids that were updated.
+        With `resend_category`, workers and admins that have no card yet
+        (e.g. the first one was never delivered) get a new one via the outbox.
+        """
+        cards = await self.messages.get_for_session(s.id)
+        workers_str = await self.workers_str(s)
+
+        updated = set()
+        for card in cards:
+            text, kb = self.render(s, card.role, workers_str, actor_name)
+            result = await self.broadcaster.edit(card.chat_id, card.message_id, text, reply_markup=kb)
+            if result.ok:
+                updated.add(card.chat_id)
+
+        if resend_category:
+            workers = [w for w in (s.worker1_id, s.worker2_id) if w and w not in updated]
+            admins = [a for a in config.ADMIN_IDS if a not in updated]
+            await self._enqueue_cards(s, WORKER, workers, workers_str, resend_category)
+            await self._enqueue_cards(s, ADMIN, admins, workers_str, resend_category)
+        return updated
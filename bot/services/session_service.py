@@ -8,30 +8,143 @@ from bot.database.repositories.shift import ShiftRepository
 from bot.database.repositories.user import UserRepository
 from bot.services.google_sheets import GoogleSheetsService
 from bot.services.schedule_parser import ScheduleParser
-from bot.database.models import RefuelSession
-from bot.services.notifier import NotifierService
+from bot.database.models import RefuelSession, SessionStatus
+from bot.services.outbox import outbox, AlertCategory
+from bot.services.session_cards import SessionCardService
+from bot.services.locks import RedisLock, outage_flight
+from bot.services.outage_timers import replan
 
 class SessionService:
-    def __init__(self, session: AsyncSession, bot=None):
+    def __init__(self, session: AsyncSession, bot=None, sheets_service: GoogleSheetsService | None = None,
+                 parser: ScheduleParser | None = None):
         self.db_session = session
+        self.bot = bot
         self.repo = SessionRepository(session)
         self.shift_repo = ShiftRepository(session)
         self.user_repo = UserRepository(session)
-        self.sheets_service = GoogleSheetsService()
-        self.parser = ScheduleParser()
-        self.notifier = NotifierService(bot) if bot else None
+        self.sheets_service = sheets_service or GoogleSheetsService()
+        self.parser = parser or ScheduleParser()
+        # Notifications are queued to the outbox only when running with a bot
+        self.outbox = outbox if bot else None
+        self.cards = SessionCardService(session, bot) if bot else None
+        # Outage runs are serialized across instances (only when running with a bot)
+        self.flight = outage_flight if bot else None
+        # Outage timers (scheduler jobs) are re-planned only when running with a bot
+        self.replan = replan if bot else None
+        self.timeline: List[datetime] = []  # Last fetched outage timeline
 
     async def check_power_outage(self) -> Optional[RefuelSession]:
         """
         Check outage timeline and create session for upcoming or current blocks.
         Handles continuity across midnight.
+
+        Exact T-30 / deadline handling is done by the outage timers
+        (bot/services/outage_timers.py); this periodic check refreshes the
+        timeline, re-plans the timers from it and catches up on anything a
+        timer missed, e.g. while the bot was down.
+
+        One transaction per check: all changes are committed once, the cards
+        go out only after the commit. Concurrent checks (scheduler, admin
+        "force", other instances) join one run under the outage lock.
+        """
+        return await self._single_flight("check", lambda service, lock: service._check_power_outage(lock))
+
+    async def open_block(self, block_start: datetime, deadline: datetime) -> Optional[RefuelSession]:
+        """T-30 timer of an outage block: create its session unless one already covers it."""
+        return await self._single_flight(f"open:{block_start:%Y%m%d%H%M}",
+                                         lambda service, lock: service._open_block(block_start, deadline, lock))
+
+    async def close_due(self) -> Optional[RefuelSession]:
+        """Deadline timer: expire the active session once its deadline has passed."""
+        return await self._single_flight("close", lambda service, lock: service._close_due(lock))
+
+    async def _single_flight(self, key: str, run):
         """
+        `run(service, lock)` once for all concurrent callers of `key`. Under
+        the flight it gets a SessionService on the flight's own DB session:
+        results may be shared with other callers, and the run must survive
+        the cancellation of whichever caller started it.
+        """
+        if self.flight is None:
+            return await run(self, None)
+        return await self.flight.run(key, lambda session, lock: run(
+            SessionService(session, bot=self.bot, sheets_service=self.sheets_service, parser=self.parser), lock))
+
+    async def _check_power_outage(self, lock: Optional[RedisLock]) -> Optional[RefuelSession]:
+        expired, created, workers_str = await self._sync_outage_sessions()
+        await self._finish(expired, created, workers_str, lock)
+        # Re-planned inside the run, so callers that joined it are covered too.
+        # An empty timeline may be a failed fetch: keep the timers planned so far.
+        if self.replan and self.timeline:
+            self.replan(self.timeline)
+        return created
+
+    async def _open_block(self, block_start: datetime, deadline: datetime, lock: Optional[RedisLock]) -> Optional[RefuelSession]:
+        now = datetime.now()
+        if now >= deadline:
+            return None
+        active_session = await self.repo.get_active_session()
+        expired = await self._expire_due(active_session, now)
+        
+        created, workers_str = None, None
+        if not self._covers(active_session, block_start):
+            created, workers_str = await self._create_block_session(block_start, deadline, now)
+        await self._finish(expired, created, workers_str, lock)
+        return created
+
+    async def _close_due(self, lock: Optional[RedisLock]) -> Optional[RefuelSession]:
+        active_session = await self.repo.get_active_session()
+        expired = await self._expire_due(active_session, datetime.now())
+        await self._finish(expired, None, None, lock)
+        return expired
+
+    async def _finish(self, expired: Optional[RefuelSession], created: Optional[RefuelSession],
+                      workers_str: Optional[str], lock: Optional[RedisLock] = None):
+        """Commit the check, then update the cards."""
+        if expired or created:
+            # Fencing: a run whose lease was lost must not commit after a newer run.
+            # check() is a cheap early exit, the token row in the transaction is the guard.
+            if lock:
+                await lock.check()
+                await lock.fence(self.db_session)
+            await self.db_session.commit()
+
+        if self.cards:
+            # Turn the live cards into "power is back"
+            if expired:
+                await self.cards.refresh(expired, resend_category=AlertCategory.session_deadline)
+            # One live card per recipient, edited as the session moves on
+            if created:
+                await self.cards.publish(created, workers_str)
+
+    async def _expire_due(self, active_session: Optional[RefuelSession], now: datetime) -> Optional[RefuelSession]:
+        """Power Restoration: mark the active session expired once its deadline passed"""
+        if not active_session or now < active_session.deadline:
+            return None
+        if active_session.status in [SessionStatus.pending.value, SessionStatus.in_progress.value]:
+            # Cards are refreshed after commit
+            return await self.repo.update_status(active_session.id, SessionStatus.expired)
+        return None
+
+    @staticmethod
+    def _covers(active_session: Optional[RefuelSession], dt: datetime) -> bool:
+        return bool(active_session) and active_session.start_time <= dt < active_session.deadline
+
+    async def _sync_outage_sessions(self) -> tuple[Optional[RefuelSession], Optional[RefuelSession], Optional[str]]:
+        """Flush-only part of check_power_outage: returns (expired, created, workers_str)."""
+        now = datetime.now()
+        
+        # Deadline check does not depend on the timeline: the block may be
+        # gone from it (or the timeline empty) once power is back
+        active_session = await self.repo.get_active_session()
+        expired = await self._expire_due(active_session, now)
+        
         # 1. Fetch Timeline (Merged today + tomorrow)
-        timeline = await self.parser.get_outage_timeline(queue="1.1")
+        self.timeline = await self.parser.get_outage_timeline(queue="1.1")
+        timeline = self.timeline
         if not timeline:
-            return None
+            return expired, None, None
             
-        now = datetime.now()
         # Look ahead window: 60 minutes
         lookahead = now + timedelta(minutes=60)
         
@@ -44,7 +157,7 @@ class SessionService:
                 break
         
         if not target_dt:
-            return None
+            return expired, None, None
             
         # 2. Identify the continuous block this target belongs to
         # Find start of block
@@ -60,36 +173,24 @@ class SessionService:
         deadline = block_end + timedelta(hours=1)
         
         # 3. Check if session for this block already exists
-        active_session = await self.repo.get_active_session()
-        
-        # Power Restoration Monitoring:
-        if active_session:
-            # If we have an active session, check if power is back
-            # 1. Check if deadline passed
-            if now >= active_session.deadline:
-                # Notify and mark as expired/awaiting completion if still in_progress
-                if active_session.status in [SessionStatus.pending.value, SessionStatus.in_progress.value]:
-                    msg = "⚡ <b>Електроенергія має з'явитися за графіком!</b>\n" \
-                          "Поверніть генератор у режим чергування або зупиніть його."
-                    
-                    if active_session.worker1_id: await self.notifier.notify_user(active_session.worker1_id, msg)
-                    if active_session.worker2_id: await self.notifier.notify_user(active_session.worker2_id, msg)
-                    await self.notifier.notify_admins(f"📢 <b>Час відновлення!</b> Сесія {active_session.id} досягла дедлайну ({active_session.deadline.strftime('%H:%M')}).")
-                    
-                    # Update status to avoid re-notifying
-                    await self.repo.update_status(active_session.id, SessionStatus.completed)
-            
-            # 2. Check if current block covers this session
-            if active_session.start_time <= target_dt < active_session.deadline:
-                return None
+        if self._covers(active_session, target_dt):
+            return expired, None, None
             
         # 4. T-30m Check for NEW sessions
         # Only create and notify 30 mins before start
         trigger_time = block_start - timedelta(minutes=30)
         if now < trigger_time:
             # Too early to assign/notify
-            return None
+            return expired, None, None
+
+        session, workers_str = await self._create_block_session(block_start, deadline, now)
+        return expired, session, workers_str
 
+    async def _create_block_session(self, block_start: datetime, deadline: datetime, now: datetime) -> tuple[Optional[RefuelSession], Optional[str]]:
+        """
+        Assign the shift workers of the block and create its session (flush only).
+        (None, None) if the block already has a session (unique per block in the DB).
+        """
         # 5. Get Workers for the START of the block
         w1_name, w2_name = "Unknown", "Unknown"
         worker1_id, worker2_id = None, None
@@ -116,7 +217,7 @@ class SessionService:
         except Exception as e:
             logging.error(f"Failed to get workers: {e}")
 
-        # 5. Create Session
+        # 6. Create Session
         # Logic: Session starts NOW if it's already an outage, 
         # or at block_start if it's upcoming. 
         # Actually safer to start "approx now" to trigger notifications.
@@ -126,38 +227,13 @@ class SessionService:
             start_time=session_start,
             deadline=deadline,
             worker1_id=worker1_id,
-            worker2_id=worker2_id
+            worker2_id=worker2_id,
+            block_start=block_start
         )
-        
-        # 6. Notify
-        if self.notifier:
-            worker_list_str = f"{w1_name}, {w2_name}"
-            # Formatting dates for humans
-            def fmt_dt(dt):
-                if dt.date() == now.date(): return dt.strftime('%H:%M')
-                return dt.strftime('%d.%m %H:%M')
-
-            msg = f"🔔 <b>Відключення світла!</b>\n\n" \
-                  f"⏰ Період: {fmt_dt(block_start)} - {fmt_dt(deadline)}\n" \
-                  f"👷 На зміні: {worker_list_str}\n\n" \
-                  f"Потрібно заправити генератор!"
-            
-            from bot.keyboards.session_kb import get_start_session_kb
-            kb = get_start_session_kb(session.id)
-            
-            if worker1_id: await self.notifier.notify_user(worker1_id, msg, reply_markup=kb)
-            if worker2_id: await self.notifier.notify_user(worker2_id, msg, reply_markup=kb)
-
-            admin_msg = f"🚀 <b>Створено сесію заправки</b> (ID: {session.id})\n" \
-                        f"⏰ Період: {fmt_dt(block_start)} - {fmt_dt(deadline)}\n" \
-                        f"👷 Воркери: {worker_list_str}\n"
-            
-            if not worker1_id and not worker2_id:
-                admin_msg += "❌ <b>Помилка:</b> Воркери не знайдени в базі!"
-            
-            await self.notifier.notify_admins(admin_msg)
-            
-        return session
+        if session is None:
+            logging.info(f"Block {block_start} - {deadline} already has a session")
+            return None, None
+        return session, f"{w1_name}, {w2_name}"
 
     async def create_manual_session(self, hours: int = 2) -> RefuelSession:
         """Manually create a session starting now for X hours"""
@@ -172,12 +248,14 @@ class SessionService:
             worker1_id=None,
             worker2_id=None
         )
+        await self.db_session.commit()
         
-        if self.notifier:
-            await self.notifier.notify_admins(
+        if self.outbox:
+            await self.outbox.enqueue_admins(
                 f"📝 <b>Ручне створення сесії</b>\n"
                 f"ID: {session.id}\n"
-                f"Дедлайн: {deadline.strftime('%H:%M')}"
+                f"Дедлайн: {deadline.strftime('%H:%M')}",
+                AlertCategory.session_created
             )
             
         return session
@@ -1,3 +1,6 @@
+# Legacy ad-hoc schema fixer. Schema changes now live in alembic/versions
+# (`alembic upgrade head`); this mirrors their tables up to 0009, but it does
+# not partition `logs` (0004 does): run Alembic afterwards.
 import asyncio
 import logging
 from bot.config import config
@@ -69,8 +72,139 @@ async def fix_schema():
             );
         """))
         
+        # Live session cards (message ids per session and recipient)
+        logging.info("Creating session_messages table...")
+        await session.execute(text("ALTER TABLE refuel_sessions ADD COLUMN IF NOT EXISTS block_start TIMESTAMP;"))
+        await session.execute(text("""
+            CREATE TABLE IF NOT EXISTS session_messages (
+                id SERIAL PRIMARY KEY,
+                session_id INTEGER NOT NULL REFERENCES refuel_sessions(id) ON DELETE CASCADE,
+                chat_id BIGINT NOT NULL,
+                message_id BIGINT NOT NULL,
+                role VARCHAR NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (session_id, chat_id)
+            );
+        """))
+        
+        # Inventory: the old fuel_cans column always held litres
+        logging.info("Renaming inventory.fuel_cans -> fuel_liters, creating fuel_ledger...")
+        await session.execute(text("""
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name = 'inventory' AND column_name = 'fuel_cans') THEN
+                    ALTER TABLE inventory RENAME COLUMN fuel_cans TO fuel_liters;
+                END IF;
+            END $$;
+        """))
+        await session.execute(text("""
+            CREATE TABLE IF NOT EXISTS fuel_ledger (
+                id BIGSERIAL PRIMARY KEY,
+                account VARCHAR NOT NULL,
+                kind VARCHAR NOT NULL,
+                delta FLOAT NOT NULL,
+                balance_after FLOAT NOT NULL,
+                user_id BIGINT REFERENCES users(id),
+                session_id INTEGER,
+                note VARCHAR,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """))
+        await session.execute(text("CREATE INDEX IF NOT EXISTS ix_fuel_ledger_account_created_at ON fuel_ledger (account, created_at);"))
+        await session.execute(text("""
+            CREATE TABLE IF NOT EXISTS fuel_snapshots (
+                id SERIAL PRIMARY KEY,
+                account VARCHAR NOT NULL,
+                taken_at TIMESTAMP NOT NULL,
+                balance FLOAT NOT NULL,
+                ledger_id BIGINT NOT NULL DEFAULT 0
+            );
+        """))
+        await session.execute(text("CREATE INDEX IF NOT EXISTS ix_fuel_snapshots_account_taken_at ON fuel_snapshots (account, taken_at);"))
+        # Old inventory_movements history moves into the ledger (as in 0006)
+        await session.execute(text("""
+            DO $$
+            BEGIN
+                IF to_regclass('inventory_movements') IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM fuel_ledger WHERE account = 'stock') THEN
+                    INSERT INTO fuel_ledger (account, kind, delta, balance_after, user_id, note, created_at)
+                    SELECT 'stock',
+                           CASE reason WHEN 'ADD_FUEL' THEN 'refuel' WHEN 'TAKE_FUEL' THEN 'transfer' ELSE 'correction' END,
+                           applied, balance_after, user_id, reason, created_at
+                    FROM inventory_movements
+                    ORDER BY id;
+                END IF;
+            END $$;
+        """))
+        await session.execute(text("DROP TABLE IF EXISTS inventory_movements;"))
+        # Opening balances, so replaying an account from the start gives its live figure
+        await session.execute(text("""
+            INSERT INTO fuel_ledger (account, kind, delta, balance_after, note)
+            SELECT 'stock', 'correction', fuel_liters, fuel_liters, 'OPENING'
+            FROM (SELECT fuel_liters FROM inventory ORDER BY id LIMIT 1) s
+            WHERE NOT EXISTS (SELECT 1 FROM fuel_ledger WHERE account = 'stock');
+        """))
+        await session.execute(text("""
+            INSERT INTO fuel_ledger (account, kind, delta, balance_after, note)
+            SELECT 'gen:' || id, 'correction', COALESCE(fuel_level, 0), COALESCE(fuel_level, 0), 'OPENING'
+            FROM generators g
+            WHERE NOT EXISTS (SELECT 1 FROM fuel_ledger l WHERE l.account = 'gen:' || g.id);
+        """))
+        
+# Structured log columns + backfill from the old free-text details
+        logging.info("Adding structured columns to logs...")
+        await session.execute(text("ALTER TABLE logs ADD COLUMN IF NOT EXISTS quantity FLOAT;"))
+        await session.execute(text("ALTER TABLE logs ADD COLUMN IF NOT EXISTS generator VARCHAR;"))
+        await session.execute(text("ALTER TABLE logs ADD COLUMN IF NOT EXISTS session_id INTEGER;"))
+        await session.execute(text("ALTER TABLE logs ADD COLUMN IF NOT EXISTS payload JSONB;"))
+        await session.execute(text("CREATE INDEX IF NOT EXISTS ix_logs_action_timestamp ON logs (action, timestamp);"))
+        await session.execute(text("""
+            UPDATE logs SET quantity = substring(details from 'Taken: ([0-9.]+)L')::float
+            WHERE action = 'TAKE_FUEL' AND quantity IS NULL;
+        """))
+        await session.execute(text("""
+            UPDATE logs SET quantity = substring(details from '\\(([0-9.]+)L\\)')::float
+            WHERE action = 'ADD_FUEL' AND quantity IS NULL;
+        """))
+        await session.execute(text("""
+            UPDATE logs SET quantity = substring(details from 'Added ([0-9.]+)L to')::float,
+                            generator = substring(details from 'L to (.+)\\. New Level')
+            WHERE action = 'REFUEL_GEN' AND quantity IS NULL;
+        """))
+        await session.execute(text("""
+            UPDATE logs SET quantity = substring(details from 'Consumed: ([0-9.]+)L')::float,
+                            generator = substring(details from 'Stopped (.+)\\. Runtime')
+            WHERE action = 'STOP_GEN' AND quantity IS NULL;
+        """))
+        
+        # Daily totals maintained by log_action (history: `python backfill_rollup.py`)
+        logging.info("Creating daily_fuel_rollup table...")
+        await session.execute(text("""
+            CREATE TABLE IF NOT EXISTS daily_fuel_rollup (
+                day DATE NOT NULL,
+                generator VARCHAR NOT NULL DEFAULT '',
+                liters_taken FLOAT NOT NULL DEFAULT 0,
+                liters_added FLOAT NOT NULL DEFAULT 0,
+                liters_burned FLOAT NOT NULL DEFAULT 0,
+                run_hours FLOAT NOT NULL DEFAULT 0,
+                starts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, generator)
+            );
+        """))
+        
+        # Fencing tokens for Redis locks
+        logging.info("Creating lock_fences table...")
+        await session.execute(text("CREATE TABLE IF NOT EXISTS lock_fences (name VARCHAR PRIMARY KEY, token BIGINT NOT NULL);"))
+        
         await session.commit()
         logging.info("Schema fix completed!")
+        
+        partitioned = (await session.execute(text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'logs'::regclass"
+        ))).scalar()
+        if not partitioned:
+            logging.warning("logs is not partitioned: run `alembic upgrade head` before starting the bot")
 
 if __name__ == "__main__":
     asyncio.run(fix_schema())
@@ -12,9 +12,33 @@ CREATE TABLE IF NOT EXISTS users (
 -- Таблиця складу (Inventory)
 CREATE TABLE IF NOT EXISTS inventory (
     id SERIAL PRIMARY KEY,
-    fuel_cans INTEGER DEFAULT 0
+    fuel_liters INTEGER DEFAULT 0
 );
 
+-- Журнал палива (append-only): склад ('stock') і баки генераторів ('gen:<id>')
+CREATE TABLE IF NOT EXISTS fuel_ledger (
+    id BIGSERIAL PRIMARY KEY,
+    account VARCHAR NOT NULL,
+    kind VARCHAR NOT NULL,
+    delta FLOAT NOT NULL,
+    balance_after FLOAT NOT NULL,
+    user_id BIGINT REFERENCES users(id),
+    session_id INTEGER,
+    note VARCHAR,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_fuel_ledger_account_created_at ON fuel_ledger (account, created_at);
+
+-- Знімки балансів (для запитів "скільки було на момент X")
+CREATE TABLE IF NOT EXISTS fuel_snapshots (
+    id SERIAL PRIMARY KEY,
+    account VARCHAR NOT NULL,
+    taken_at TIMESTAMP NOT NULL,
+    balance FLOAT NOT NULL,
+    ledger_id BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_fuel_snapshots_account_taken_at ON fuel_snapshots (account, taken_at);
+
 -- Таблиця генераторів
 CREATE TABLE IF NOT EXISTS generators (
     id SERIAL PRIMARY KEY,
@@ -26,17 +50,53 @@ CREATE TABLE IF NOT EXISTS generators (
     consumption_rate FLOAT DEFAULT 2.0
 );
 
--- Таблиця логів (LogEvent)
+-- Таблиця логів (LogEvent), партиції по місяцях (logs_YYYY_MM) + logs_default.
+-- Наступні місяці створює щомісячне завдання log_retention.
 CREATE TABLE IF NOT EXISTS logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id BIGINT REFERENCES users(id),
     action VARCHAR NOT NULL,
     details VARCHAR,
-    timestamp TIMESTAMP DEFAULT NOW()
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    quantity FLOAT,
+    generator VARCHAR,
+    session_id INTEGER,
+    payload JSONB,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+CREATE INDEX IF NOT EXISTS ix_logs_action_timestamp ON logs (action, timestamp);
+CREATE TABLE IF NOT EXISTS logs_default PARTITION OF logs DEFAULT;
+DO $$
+DECLARE
+    m date := date_trunc('month', NOW())::date;
+BEGIN
+    FOR i IN 0..2 LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF logs FOR VALUES FROM (%L) TO (%L)',
+                       'logs_' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date);
+        m := (m + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+-- Денні підсумки по генераторах (LogRepository.log_action), історію заповнює backfill_rollup.py
+CREATE TABLE IF NOT EXISTS daily_fuel_rollup (
+    day DATE NOT NULL,
+    generator VARCHAR NOT NULL DEFAULT '',
+    liters_taken FLOAT NOT NULL DEFAULT 0,
+    liters_added FLOAT NOT NULL DEFAULT 0,
+    liters_burned FLOAT NOT NULL DEFAULT 0,
+    run_hours FLOAT NOT NULL DEFAULT 0,
+    starts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, generator)
+);
+
+-- Останній закомічений fencing-токен для кожного Redis-замка (RedisLock.fence)
+CREATE TABLE IF NOT EXISTS lock_fences (
+    name VARCHAR PRIMARY KEY,
+    token BIGINT NOT NULL
 );
 
 -- Створення початкового запису в Inventory (щоб було хоч щось)
-INSERT INTO inventory (fuel_cans) VALUES (0);
+INSERT INTO inventory (fuel_liters) VALUES (0);
 
 -- Створення генераторів
 INSERT INTO generators (name, status) VALUES ('GEN-1 (003)', 'stopped'), ('GEN-2 (038)', 'stopped');
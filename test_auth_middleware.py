@@ -0,0 +1,101 @@
+"""AuthMiddleware: one user lookup per update, blocked users stop before routing"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.types import User as TgUser
+
+from bot.database.models import UserRole
+from bot.database.user_cache import CachedUser
+from bot.middlewares.auth import AuthMiddleware
+
+
+def make_update(text=None, callback=False):
+    update = MagicMock()
+    update.message = None
+    update.callback_query = None
+    if callback:
+        update.callback_query = MagicMock()
+        update.callback_query.answer = AsyncMock()
+    else:
+        update.message = MagicMock()
+        update.message.text = text
+        update.message.answer = AsyncMock()
+    return update
+
+
+def run(middleware, update, user_id=10):
+    handler = AsyncMock(return_value="handled")
+    data = {"event_from_user": TgUser(id=user_id, is_bot=False, first_name="T")}
+    result = asyncio.run(middleware(handler, update, data))
+    return result, handler, data
+
+
+def make_middleware(monkeypatch, cached, hit=True):
+    cache = MagicMock()
+    cache.lookup = AsyncMock(return_value=(hit, cached))
+    monkeypatch.setattr("bot.middlewares.auth.user_cache", cache)
+    return AuthMiddleware(MagicMock()), cache
+
+
+def test_injects_cached_user(monkeypatch):
+    worker = CachedUser(id=10, name="W", role=UserRole.worker)
+    middleware, cache = make_middleware(monkeypatch, worker)
+    result, handler, data = run(middleware, make_update("📦 Склад"))
+
+    assert result == "handled" and data["user"] is worker
+    assert cache.lookup.await_count == 1
+    middleware.session_pool.assert_not_called()
+
+
+def test_miss_goes_straight_to_the_db(monkeypatch):
+    worker = CachedUser(id=10, name="W", role=UserRole.worker)
+    middleware, cache = make_middleware(monkeypatch, None, hit=False)
+    session = MagicMock()
+    middleware.session_pool.return_value.__aenter__ = AsyncMock(return_value=session)
+    middleware.session_pool.return_value.__aexit__ = AsyncMock(return_value=False)
+    load = AsyncMock(return_value=worker)
+    monkeypatch.setattr("bot.middlewares.auth.UserRepository.load_cached", load)
+
+    _, _, data = run(middleware, make_update("📦 Склад"))
+    assert data["user"] is worker
+    # One cache read: the repository does not check the cache again
+    assert cache.lookup.await_count == 1
+    load.assert_awaited_once_with(10)
+
+
+def test_cached_unknown_user_skips_the_db(monkeypatch):
+    monkeypatch.setattr("bot.middlewares.auth.config.RESTRICT_ACCESS", True)
+    middleware, _ = make_middleware(monkeypatch, None, hit=True)
+    result, handler, data = run(middleware, make_update("⚡ Статус"), user_id=999)
+
+    assert result is None and data["user"] is None
+    middleware.session_pool.assert_not_called()
+
+
+def test_blocked_user_is_rejected(monkeypatch):
+    blocked = CachedUser(id=10, name="B", role=UserRole.blocked)
+    middleware, _ = make_middleware(monkeypatch, blocked)
+    update = make_update(callback=True)
+    result, handler, _ = run(middleware, update)
+
+    assert result is None
+    handler.assert_not_awaited()
+    update.callback_query.answer.assert_awaited_once()
+
+
+def test_blocked_user_can_still_start(monkeypatch):
+    blocked = CachedUser(id=10, name="B", role=UserRole.blocked)
+    middleware, _ = make_middleware(monkeypatch, blocked)
+    result, handler, _ = run(middleware, make_update("/start"))
+
+    assert result == "handled"
+
+
+def test_unknown_user_in_restricted_mode(monkeypatch):
+    monkeypatch.setattr("bot.middlewares.auth.config.RESTRICT_ACCESS", True)
+    middleware, _ = make_middleware(monkeypatch, None)
+    middleware._resolve = AsyncMock(return_value=None)
+    result, handler, _ = run(middleware, make_update("⚡ Статус"), user_id=999)
+
+    assert result is None
+    handler.assert_not_awaited()
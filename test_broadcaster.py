@@ -0,0 +1,88 @@
+"""Broadcaster: flood control, retries and concurrency (fake bot, no Telegram)"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import SendMessage
+
+from bot.config import config
+from bot.services.broadcaster import Broadcaster, TokenBucket
+
+METHOD = SendMessage(chat_id=1, text="hi")
+
+
+class FakeBot:
+    """send_message raises the queued errors of a chat first, then succeeds."""
+
+    def __init__(self, errors=None):
+        self.id = 1
+        self.errors = {chat_id: list(queue) for chat_id, queue in (errors or {}).items()}
+        self.sent = []
+        self.sent_at = {}
+
+    async def send_message(self, chat_id, text, parse_mode=None, reply_markup=None):
+        queue = self.errors.get(chat_id)
+        if queue:
+            raise queue.pop(0)
+        self.sent.append(chat_id)
+        self.sent_at[chat_id] = asyncio.get_running_loop().time()
+        return MagicMock(message_id=len(self.sent))
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    monkeypatch.setattr(config, "BROADCAST_GLOBAL_RATE", 1000.0)
+    monkeypatch.setattr(config, "BROADCAST_CHAT_RATE", 1000.0)
+    monkeypatch.setattr(config, "BROADCAST_RETRY_BASE_DELAY", 0.2)
+
+
+def test_pauses_overlap_instead_of_adding_up():
+    bucket = TokenBucket(rate=10)
+    bucket.pause(2)
+    bucket.pause(2)
+    assert -21 < bucket.tokens <= -19
+
+
+def test_retry_after_pauses_every_chat():
+    bot = FakeBot(errors={1: [TelegramRetryAfter(METHOD, "Flood control exceeded", retry_after=1)]})
+    broadcaster = Broadcaster(bot)
+
+    async def later(delay, coro):
+        await asyncio.sleep(delay)
+        return await coro
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        # Chat 2 comes after the flood error and waits for the bot-wide pause too
+        first, second = await asyncio.gather(broadcaster.send(1, "hi"), later(0.1, broadcaster.send(2, "hi")))
+        return first, second, started
+
+    first, second, started = asyncio.run(scenario())
+    assert first.ok and first.attempts == 2 and second.ok
+    assert bot.sent_at[2] - started >= 0.9
+
+
+def test_backoff_does_not_hold_a_slot(monkeypatch):
+    monkeypatch.setattr(config, "BROADCAST_CONCURRENCY", 1)
+    bot = FakeBot(errors={1: [TelegramServerError(METHOD, "Bad Gateway")]})
+    broadcaster = Broadcaster(bot)
+
+    async def scenario():
+        return await asyncio.gather(broadcaster.send(1, "hi"), broadcaster.send(2, "hi"))
+
+    first, second = asyncio.run(scenario())
+    assert first.ok and first.attempts == 2 and second.ok
+    # Chat 2 went out while chat 1 was backing off
+    assert bot.sent == [2, 1]
+
+
+def test_permanent_errors_are_not_retried():
+    bot = FakeBot(errors={1: [TelegramForbiddenError(METHOD, "Forbidden: bot was blocked by the user")]})
+    results = asyncio.run(Broadcaster(bot).broadcast([1, 2, 1], "hi"))
+
+    assert [(r.chat_id, r.ok, r.permanent, r.attempts) for r in results] == [(1, False, True, 1), (2, True, False, 1)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,56 @@
+"""DbSessionMiddleware: no session for updates that don't use the database"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from bot.middlewares.di import DbSessionMiddleware
+
+
+def make_middleware():
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.close = AsyncMock()
+    session.get = AsyncMock(return_value=None)
+    pool = MagicMock(return_value=session)
+    return DbSessionMiddleware(pool), pool, session
+
+
+def test_ui_only_update_opens_no_session():
+    middleware, pool, session = make_middleware()
+
+    async def handler(event, data):
+        return "closed"
+
+    assert asyncio.run(middleware(handler, MagicMock(), {"bot": MagicMock()})) == "closed"
+    pool.assert_not_called()
+    session.commit.assert_not_awaited()
+
+
+def test_session_opened_once_and_committed():
+    middleware, pool, session = make_middleware()
+
+    async def handler(event, data):
+        await data["user_repo"].get_by_id(1)
+        # Services share the repositories and the session of the update
+        assert data["inventory_service"].users is data["user_repo"]._scope.resolve("user_repo")
+        return "ok"
+
+    asyncio.run(middleware(handler, MagicMock(), {"bot": MagicMock()}))
+    pool.assert_called_once()
+    session.commit.assert_awaited_once()
+    session.close.assert_awaited_once()
+
+
+def test_rollback_only_when_opened():
+    middleware, pool, session = make_middleware()
+
+    async def handler(event, data):
+        await data["user_repo"].get_by_id(1)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware(handler, MagicMock(), {"bot": MagicMock()}))
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
@@ -0,0 +1,62 @@
+"""Digest coalescing: splitting, shutdown flush, claim-idle validation"""
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from bot.config import Settings, config
+from bot.services.broadcaster import DeliveryResult
+from bot.services.digest import DigestCoalescer, MAX_MESSAGE_LENGTH
+from bot.services.outbox import AlertCategory
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.sent = []
+
+    async def notify_user(self, chat_id, text, reply_markup=None):
+        self.sent.append((chat_id, text))
+        return DeliveryResult(chat_id=chat_id, ok=True, message_id=len(self.sent))
+
+
+def test_oversized_texts_are_split():
+    long_line = "x" * 5000
+    report = "\n".join(f"рядок {i}" for i in range(1000))
+
+    single = DigestCoalescer._render([long_line])
+    assert [len(c) for c in single] == [MAX_MESSAGE_LENGTH, 5000 - MAX_MESSAGE_LENGTH]
+    assert "".join(single) == long_line
+
+    merged = DigestCoalescer._render([report, "short"])
+    assert len(merged) > 1 and all(len(c) <= MAX_MESSAGE_LENGTH for c in merged)
+    assert merged[-1].endswith("short")
+
+
+def test_flush_all_sends_buffered_digests(monkeypatch):
+    monkeypatch.setattr(config, "DIGEST_WINDOW", 60.0)
+    notifier, acked = FakeNotifier(), []
+    digest = DigestCoalescer(notifier)
+
+    async def on_sent(result):
+        acked.append(result.ok)
+
+    async def scenario():
+        await digest.submit(1, "one", AlertCategory.rotation, on_sent=on_sent)
+        await digest.submit(1, "two", AlertCategory.maintenance, on_sent=on_sent)
+        assert notifier.sent == []  # Waiting for the window
+        await digest.flush_all()
+
+    asyncio.run(scenario())
+    (chat_id, text), = notifier.sent
+    assert chat_id == 1 and "one" in text and "two" in text
+    assert acked == [True, True] and digest.timers == {}
+
+
+def test_claim_idle_must_exceed_digest_window():
+    with pytest.raises(ValidationError):
+        Settings(DIGEST_WINDOW=60, OUTBOX_CLAIM_IDLE_MS=60000)
+    assert Settings(DIGEST_WINDOW=60, OUTBOX_CLAIM_IDLE_MS=180000).OUTBOX_CLAIM_IDLE_MS == 180000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,87 @@
+"""Streamed CSV export (no DB needed)"""
+import asyncio
+import csv
+import io
+import os
+import zipfile
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from bot.database.log_archive import LogArchive
+from bot.services import export
+
+
+class StreamResult:
+    def __init__(self, keys, chunks):
+        self._keys = keys
+        self._chunks = chunks
+
+    def keys(self):
+        return self._keys
+
+    async def partitions(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class StreamingSession:
+    def __init__(self):
+        self.options = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, stmt):
+        self.options.append(stmt.get_execution_options())
+        keys = [c.name for c in stmt.selected_columns]
+        chunks = [[tuple(range(len(keys)))] * 2, [tuple(range(len(keys)))]]
+        return StreamResult(keys, chunks)
+
+
+def test_export_streams_every_dataset_in_chunks(tmp_path):
+    session = StreamingSession()
+    progress = []
+    archive = LogArchive(str(tmp_path))
+    archive.write(date(2026, 1, 1), [
+        {"id": 1, "timestamp": datetime(2026, 1, 10), "action": "TAKE_FUEL", "quantity": 5.0},  # Before the period
+        {"id": 2, "timestamp": datetime(2026, 1, 20, 1), "action": "TAKE_FUEL", "quantity": 10.0, "user_id": 7},
+    ])
+
+    async def on_progress(filename, rows):
+        progress.append((filename, rows))
+
+    path = asyncio.run(export.export_to_zip(datetime(2026, 1, 15), on_progress, session_pool=lambda: session,
+                                            archive=archive))
+    try:
+        with zipfile.ZipFile(path) as zf:
+            assert zf.namelist() == ["refuel_sessions.csv", "logs.csv", "fuel_ledger.csv"]
+            rows = list(csv.reader(io.TextIOWrapper(zf.open("logs.csv"), encoding="utf-8-sig")))
+    finally:
+        os.remove(path)
+
+    assert rows[0] == ["timestamp", "user_id", "action", "generator", "quantity", "session_id", "details"]
+    # Archived months first, then the live table
+    assert rows[1] == ["2026-01-20 01:00:00", "7", "TAKE_FUEL", "", "10.0", "", ""]
+    assert len(rows) == 5
+    # Server-side cursor, fetched EXPORT_CHUNK rows at a time
+    assert all(o["yield_per"] == export.EXPORT_CHUNK for o in session.options)
+    assert progress[:2] == [("refuel_sessions.csv", 2), ("refuel_sessions.csv", 3)]
+
+
+def test_failed_export_survives_a_failed_status_edit(monkeypatch):
+    status = MagicMock(edit_text=AsyncMock(side_effect=RuntimeError("message to edit not found")))
+    bot = MagicMock(send_message=AsyncMock(return_value=status))
+    monkeypatch.setattr(export, "export_to_zip", AsyncMock(side_effect=RuntimeError("db down")))
+
+    asyncio.run(export.run_export(bot, 1, 7))
+    assert "db down" in status.edit_text.await_args.args[0]
+    bot.send_document.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
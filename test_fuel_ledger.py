@@ -0,0 +1,53 @@
+"""Fuel ledger: snapshots and point-in-time balances (no DB needed)"""
+import asyncio
+from datetime import datetime
+
+from bot.database.repositories.fuel_ledger import FuelLedgerRepository, STOCK
+from test_generator_queries import RecordingSession
+
+
+class ScalarSession(RecordingSession):
+    async def execute(self, stmt, *args, **kwargs):
+        result = await super().execute(stmt, *args, **kwargs)
+        result.scalar_one.return_value = 37.5
+        return result
+
+
+def test_balance_at_is_snapshot_plus_tail():
+    session = ScalarSession()
+    balance = asyncio.run(FuelLedgerRepository(session).balance_at("gen:2", datetime(2026, 1, 6, 3, 0)))
+
+    assert balance == 37.5
+    sql, = session.sql()
+    # Nearest snapshot at or before the moment, then the ledger entries after it
+    assert "FROM fuel_snapshots" in sql and "ORDER BY fuel_snapshots.taken_at DESC" in sql
+    assert "sum(fuel_ledger.delta)" in sql and "fuel_ledger.id >" in sql and "fuel_ledger.created_at <=" in sql
+
+
+def test_snapshots_read_live_balances():
+    session = RecordingSession(rows=[(1,), (2,), (3,)])
+    count = asyncio.run(FuelLedgerRepository(session).take_snapshots())
+
+    assert count == 3
+    sql, = session.all_sql()
+    assert sql.startswith("INSERT INTO fuel_snapshots")
+    assert "FROM inventory" in sql and "FROM generators" in sql and "UNION ALL" in sql
+    assert "max(fuel_ledger.id)" in sql
+    # Generator accounts follow the id, not the (renameable) name
+    assert "::VARCHAR, generators.id)" in sql and "gen:" in session.statements[0].compile().params.values()
+
+
+def test_stock_entries_use_the_stock_account():
+    from bot.database.repositories.inventory import InventoryRepository
+
+    session = RecordingSession(rows=[(60,)])
+    asyncio.run(InventoryRepository(session).update_stock(-20, user_id=1, reason="TAKE_FUEL"))
+    params = session.statements[0].compile().params
+    assert {STOCK, "transfer", "TAKE_FUEL"} <= set(params.values())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,163 @@
+"""Query-count checks for GeneratorService / GeneratorRepository (no DB needed)"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from bot.database.models import Generator, GenStatus
+from bot.database.repositories.generator import GeneratorRepository
+from bot.database.repositories.logs import LogRepository
+from bot.services.generator import GeneratorService
+from bot.services.generator_timers import PENDING_CHANGE
+
+
+class RecordingSession:
+    """Fake AsyncSession: records every statement sent to the database."""
+
+    def __init__(self, rows=None, results=None):
+        self.statements = []
+        self.added = []
+        self.rows = rows or []
+        self.results = list(results or [])  # Rows per statement, before falling back to `rows`
+        self.sync_session = Session()  # after_commit hooks attach here
+        self.info = self.sync_session.info
+
+    async def execute(self, stmt, *args, **kwargs):
+        self.statements.append(stmt)
+        rows = self.results.pop(0) if self.results else self.rows
+        result = MagicMock()
+        result.all.return_value = rows
+        result.scalar_one_or_none.return_value = rows[0][0] if rows else None
+        return result
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    SIDE_WRITES = ("INSERT INTO daily_fuel_rollup", "INSERT INTO fuel_ledger")
+
+    def sql(self):
+        """Compiled statements, without the rollup upserts (log_action) and burn ledger entries."""
+        return [sql for sql in self.all_sql() if not sql.startswith(self.SIDE_WRITES)]
+
+    def rollups(self):
+        return [sql for sql in self.all_sql() if sql.startswith("INSERT INTO daily_fuel_rollup")]
+
+    def ledger(self):
+        return [sql for sql in self.all_sql() if sql.startswith("INSERT INTO fuel_ledger")]
+
+    def all_sql(self):
+        return [str(s.compile(dialect=postgresql.dialect())) for s in self.statements]
+
+
+def make_service(rows=None, locked=None):
+    """`locked`: rows of the FOR UPDATE lock before a transition, `rows`: what the UPDATE returns"""
+    session = RecordingSession(rows, results=None if locked is None else [locked])
+    service = GeneratorService(GeneratorRepository(session), LogRepository(session))
+    service.weather.get_current_temperature = AsyncMock(return_value=-7.0)
+    return service, session
+
+
+def running_gen(name: str, hours_ago: float):
+    gen = Generator(name=name, status=GenStatus.stopped, consumption_rate=2.0, fuel_level=10.0)
+    return gen, GenStatus.running, datetime.utcnow() - timedelta(hours=hours_ago)
+
+
+def locked(*rows):
+    return [(gen.name, status, start) for gen, status, start in rows]
+
+
+def test_start_generator_locks_then_updates():
+    rows = [
+        running_gen("GEN-2 (038)", 2),
+        (Generator(name="GEN-1 (003)", status=GenStatus.running, consumption_rate=2.0), GenStatus.stopped, None),
+    ]
+    service, session = make_service(rows=rows, locked=locked(*rows))
+    asyncio.run(service.start_generator(1, "GEN-1 (003)"))
+
+    lock, sql = session.sql()
+    assert lock.startswith("SELECT generators.name") and lock.endswith("FOR UPDATE")
+    assert sql.startswith("UPDATE generators") and "RETURNING" in sql and "FOR UPDATE" in sql
+    # A run ends: charged with the weather factor
+    service.weather.get_current_temperature.assert_awaited_once()
+    assert [e.action for e in session.added] == ["STOP_GEN", "START_GEN"]
+    assert "Runtime: 2.00h" in session.added[0].details
+    assert len(session.rollups()) == 2
+    # The stopped generator's burn is journaled
+    assert len(session.ledger()) == 1
+    # Alert timers are re-planned once the transaction commits
+    assert session.info.get(PENDING_CHANGE)
+
+
+def test_stop_all_locks_then_updates():
+    rows = [running_gen("GEN-1 (003)", 1)]
+    service, session = make_service(rows=rows, locked=locked(*rows))
+    asyncio.run(service.stop_all(1))
+
+    assert len(session.sql()) == 2
+    assert [e.action for e in session.added] == ["STOP_GEN", "STOP_ALL"]
+
+
+def test_set_standby_skips_weather_when_no_run_ends():
+    rows = [(Generator(name="GEN-1 (003)", status=GenStatus.standby), GenStatus.stopped, None)]
+    service, session = make_service(rows=rows, locked=locked(*rows))
+    asyncio.run(service.set_standby(1, "GEN-1 (003)"))
+
+    assert len(session.sql()) == 2
+    assert [e.action for e in session.added] == ["SET_STANDBY"]
+    service.weather.get_current_temperature.assert_not_awaited()
+
+
+def test_unknown_target_changes_nothing():
+    standby = (Generator(name="GEN-2 (038)", status=GenStatus.standby), GenStatus.standby, None)
+    for call in (lambda s: s.set_standby(1, "GEN-9"), lambda s: s.start_generator(1, "GEN-9")):
+        service, session = make_service(locked=locked(standby))
+        asyncio.run(call(service))
+
+        # Only the lock ran: the other standby generator stays armed
+        lock, = session.sql()
+        assert lock.startswith("SELECT") and session.added == []
+        assert not session.info.get(PENDING_CHANGE)
+
+
+def test_single_row_mutations_skip_select():
+    gen = Generator(name="GEN-1 (003)", tank_capacity=40.0, consumption_rate=2.0)
+    for call, row in (
+        (lambda s: s.log_refuel(1, "GEN-1 (003)", 10), (12.5,)),
+        (lambda s: s.correct_fuel(1, "GEN-1 (003)", 25), (25.0,)),
+        (lambda s: s.update_generator_specs(1, "GEN-1 (003)", capacity=40), (gen,)),
+    ):
+        service, session = make_service(rows=[row])
+        asyncio.run(call(service))
+        assert len(session.sql()) == 1
+        assert all("UPDATE generators" in sql and "RETURNING" in sql for sql in session.sql())
+
+
+def test_fuel_changes_are_journaled_in_the_same_statement():
+    for call, kind in (
+        (lambda s: s.log_refuel(1, "GEN-1 (003)", 10), "refuel"),
+        (lambda s: s.correct_fuel(1, "GEN-1 (003)", 25), "correction"),
+    ):
+        service, session = make_service(rows=[(25.0,)])
+        asyncio.run(call(service))
+        sql, = session.sql()
+        assert sql.startswith("WITH \"old\" AS") and "FOR UPDATE" in sql
+        assert "INSERT INTO fuel_ledger" in sql and "RETURNING fuel_ledger.balance_after" in sql
+        params = session.statements[0].compile().params
+        assert kind in params.values()
+        assert "RETURNING generators.id AS gen_id" in sql and "gen:" in params.values()
+
+
+def test_rename_init_is_one_statement_per_rename():
+    service, session = make_service()
+    asyncio.run(service.rename_generators_init())
+    assert len(session.statements) == 4
+    assert not any(sql.startswith("SELECT") for sql in session.sql())
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,98 @@
+"""Generator alert timers: plan, heap order and fire-once (no DB or Redis needed)"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.database.models import Generator, GenStatus
+from bot.services import generator_timers
+from bot.services.generator_timers import GeneratorTimers, TimerKind, plan_timers
+from bot.services.outbox import outbox, AlertCategory
+from test_locks import FakeRedis
+
+START = datetime(2026, 2, 4, 8, 0)
+
+
+def running(**kwargs):
+    values = dict(name="GEN-1 (003)", status=GenStatus.running, current_run_start=START,
+                  fuel_level=30.0, tank_capacity=40.0, consumption_rate=2.0, total_hours_run=97.0)
+    values.update(kwargs)
+    return Generator(**values)
+
+
+def test_plan_is_exact_per_run():
+    timers = {t.kind: t for t in plan_timers(running(), factor=1.0)}
+    assert timers[TimerKind.rotation_warn].at == START + timedelta(hours=4)
+    assert timers[TimerKind.rotation_critical].at == START + timedelta(hours=6)
+    # 30L down to 20% of 40L at 2 L/h
+    assert timers[TimerKind.low_fuel].at == START + timedelta(hours=11)
+    # 97h -> the 100h mark after 3 more hours
+    assert timers[TimerKind.maintenance].at == START + timedelta(hours=3)
+    assert timers[TimerKind.maintenance].key == "GEN-1 (003):maintenance:100"
+
+    # Cold weather burns faster, a refuel is a new low-fuel alert
+    cold = {t.kind: t for t in plan_timers(running(fuel_level=38.0), factor=1.5)}
+    assert cold[TimerKind.low_fuel].at == START + timedelta(hours=10)
+    assert cold[TimerKind.low_fuel].key != timers[TimerKind.low_fuel].key
+
+    # Past the critical mark: the warning is not planned anymore
+    late = plan_timers(running(), now=START + timedelta(hours=7))
+    assert TimerKind.rotation_warn not in {t.kind for t in late}
+    assert plan_timers(running(status=GenStatus.standby)) == []
+
+
+def test_heap_pops_due_timers_in_order():
+    timers = GeneratorTimers(redis=FakeRedis(), session_pool=object())
+    timers.schedule(plan_timers(running()))
+    assert timers.next_at() == START + timedelta(hours=3)
+
+    due = timers.pop_due(START + timedelta(hours=5))
+    assert [t.kind for t in due] == [TimerKind.maintenance, TimerKind.rotation_warn]
+    assert timers.next_at() == START + timedelta(hours=6)
+
+
+def test_alert_fires_once():
+    timers = GeneratorTimers(redis=FakeRedis(), session_pool=object())
+    timers._message = AsyncMock(return_value="🔴 rotation")
+    timer = plan_timers(running())[0]
+
+    async def scenario():
+        with patch.object(outbox, "enqueue_all", AsyncMock()) as enqueue:
+            await timers._fire(timer)
+            await timers._fire(timer)  # Re-planned after a change, or picked up by a new leader
+        return enqueue
+
+    enqueue = asyncio.run(scenario())
+    enqueue.assert_awaited_once_with("🔴 rotation", AlertCategory.rotation)
+
+
+def test_alert_fires_again_after_a_failed_enqueue():
+    timers = GeneratorTimers(redis=FakeRedis(), session_pool=object())
+    timers._message = AsyncMock(return_value="🔴 rotation")
+    timer = plan_timers(running())[0]
+
+    async def scenario():
+        with patch.object(outbox, "enqueue_all", AsyncMock(side_effect=[ConnectionError("redis down"), 1])) as enqueue:
+            try:
+                await timers._fire(timer)
+            except ConnectionError:
+                pass
+            await timers._fire(timer)
+        return enqueue
+
+    assert asyncio.run(scenario()).await_count == 2
+
+
+def test_change_notification_is_kept_until_sent(monkeypatch):
+    notify = AsyncMock()
+    monkeypatch.setattr(generator_timers, "notify_changed", notify)
+    sync_session = MagicMock(info={generator_timers.PENDING_CHANGE: True})
+
+    async def scenario():
+        generator_timers._publish_after_commit(sync_session)
+        assert len(generator_timers._notifications) == 1
+        await asyncio.gather(*generator_timers._notifications)
+
+    asyncio.run(scenario())
+    notify.assert_awaited_once()
+    assert generator_timers._notifications == set()
+
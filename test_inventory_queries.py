@@ -0,0 +1,84 @@
+"""Atomic stock updates in InventoryRepository (no DB needed)"""
+import asyncio
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from bot.database.models import Inventory
+from bot.database.repositories.inventory import InventoryRepository
+from bot.database.repositories.logs import LogRepository
+from bot.services.inventory import InventoryService
+from test_generator_queries import RecordingSession
+
+
+class FlushingSession(RecordingSession):
+    async def flush(self):
+        pass
+
+
+def test_update_stock_is_one_statement():
+    session = RecordingSession(rows=[(60,)])
+    balance = asyncio.run(InventoryRepository(session).update_stock(-20, user_id=1, reason="TAKE_FUEL"))
+
+    assert balance == 60
+    assert len(session.statements) == 1
+    sql = session.sql()[0]
+    assert "FOR UPDATE" in sql and "greatest" in sql
+    assert "INSERT INTO fuel_ledger" in sql and "RETURNING" in sql
+
+
+def test_update_stock_creates_missing_row():
+    session = FlushingSession()
+    session.rows = []
+
+    async def execute(stmt, *args, **kwargs):
+        # First attempt finds no inventory row, retry after insert succeeds
+        result = await RecordingSession.execute(session, stmt)
+        result.scalar_one.return_value = 20
+        return result
+
+    session.execute = execute
+    balance = asyncio.run(InventoryRepository(session).update_stock(20, reason="ADD_FUEL"))
+
+    assert balance == 20
+    assert len(session.statements) == 2
+    assert isinstance(session.added[0], Inventory)
+
+
+def test_detailed_stats_is_one_aggregate_query():
+    session = RecordingSession()
+
+    async def execute(stmt, *args, **kwargs):
+        result = await RecordingSession.execute(session, stmt)
+        result.one.return_value = (100, datetime(2026, 1, 5), 84.0)
+        return result
+
+    session.execute = execute
+    service = InventoryService(InventoryRepository(session), LogRepository(session), MagicMock(), MagicMock())
+    stats = asyncio.run(service.get_detailed_stats())
+
+    assert len(session.statements) == 1
+    sql = session.sql()[0]
+    assert "FROM daily_fuel_rollup" in sql and "max(logs.timestamp)" in sql
+    assert "details" not in sql
+    assert stats["stock_liters"] == 100
+    assert stats["avg_daily_consumption"] == 12.0
+
+
+def test_take_fuel_logs_quantity():
+    session = RecordingSession(rows=[(60,)])
+    service = InventoryService(InventoryRepository(session), LogRepository(session), MagicMock(), MagicMock())
+    asyncio.run(service.take_fuel(1, 20))
+
+    event = session.added[0]
+    assert (event.action, event.quantity, event.payload) == ("TAKE_FUEL", 20, {"balance_after": 60})
+    # Rollup row is bumped in the same session, right after the stock update
+    rollup = session.all_sql()[-1]
+    assert "INSERT INTO daily_fuel_rollup" in rollup and "ON CONFLICT (day, generator) DO UPDATE" in rollup
+    assert "liters_taken = (daily_fuel_rollup.liters_taken + excluded.liters_taken)" in rollup
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,50 @@
+"""Scheduler job metrics from APScheduler events (no Redis needed)"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from apscheduler.events import (
+    JobSubmissionEvent, JobExecutionEvent,
+    EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED,
+)
+
+from bot.services.job_metrics import JobMetrics, JobStats, job_name
+
+
+def test_events_become_counters_histogram_and_lag():
+    metrics = JobMetrics(redis=object())
+    scheduled = datetime.now(timezone.utc) - timedelta(seconds=2)
+
+    with patch("bot.services.job_metrics.time.monotonic", side_effect=[100.0, 103.0]):
+        submitted = metrics._updates(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "check_power_outage_job", "default", [scheduled]))
+        done = metrics._updates(JobExecutionEvent(EVENT_JOB_EXECUTED, "check_power_outage_job", "default", scheduled))
+
+    assert 2 <= submitted["set"]["last_lag"] < 3
+    assert done["incr"]["ok"] == 1 and done["incr"]["duration_sum"] == 3.0
+    # Cumulative buckets: 3s falls into le 5 and everything above
+    assert "le_2.5" not in done["incr"] and done["incr"]["le_5"] == 1 and done["incr"]["le_inf"] == 1
+    assert done["max"] == {"duration_max": 3.0}
+
+    failed = metrics._updates(JobExecutionEvent(EVENT_JOB_ERROR, "outage_warn:202602040900-202602041100", "default",
+                                                scheduled, exception=RuntimeError("parser down")))
+    assert failed["incr"]["failed"] == 1 and "parser down" in failed["set"]["last_error"]
+    missed = metrics._updates(JobExecutionEvent(EVENT_JOB_MISSED, "weather_check_job", "default", scheduled))
+    assert missed["incr"] == {"misfires": 1}
+    assert job_name("outage_warn:202602040900-202602041100") == "outage_warn"
+
+
+def test_stats_from_redis_hash():
+    stats = JobStats.from_hash("check_power_outage_job", {
+        b"ok": b"9", b"failed": b"1", b"duration_sum": b"20.0", b"duration_max": b"40.0",
+        b"le_1": b"5", b"le_2.5": b"8", b"le_5": b"9", b"le_10": b"9", b"le_30": b"9",
+        b"le_60": b"10", b"le_120": b"10", b"le_inf": b"10",
+    })
+    assert stats.runs == 10 and stats.duration_avg == 2.0
+    assert stats.percentile(0.5) == 1.0
+    assert stats.percentile(0.95) == 60.0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
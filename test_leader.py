@@ -0,0 +1,51 @@
+"""Scheduler leader election (in-memory Redis stand-in)"""
+import asyncio
+
+from bot.services.leader import LeaderElector
+from test_locks import FakeRedis
+
+
+class ExtendingRedis(FakeRedis):
+    async def eval(self, script, numkeys, key, token, *args):
+        if "pexpire" in script:
+            return 1 if self.data.get(key) == str(token).encode() else 0
+        return await super().eval(script, numkeys, key, token, *args)
+
+
+def make(redis, events, name):
+    async def elected():
+        events.append((name, "elected"))
+
+    async def demoted():
+        events.append((name, "demoted"))
+
+    return LeaderElector("scheduler", elected, demoted, ttl=15, heartbeat=5, redis=redis)
+
+
+def test_one_leader_and_takeover():
+    redis, events = ExtendingRedis(), []
+    a, b = make(redis, events, "a"), make(redis, events, "b")
+
+    async def scenario():
+        await a.tick()
+        await b.tick()
+        await a.tick()  # Renewal keeps the lease
+        assert (a.is_leader, b.is_leader) == (True, False)
+
+        # Leader died: its lease expires, the standby takes over on its next heartbeat
+        del redis.data["leader:scheduler"]
+        await b.tick()
+        await a.tick()  # The old leader finds the lease gone and steps down
+
+        await b.resign()
+
+    asyncio.run(scenario())
+    assert events == [("a", "elected"), ("b", "elected"), ("a", "demoted"), ("b", "demoted")]
+    assert "leader:scheduler" not in redis.data
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
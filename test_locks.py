@@ -0,0 +1,172 @@
+"""Redis lock with fencing token and single-flight runs (in-memory Redis stand-in)"""
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from bot.services.locks import RedisLock, SingleFlight, LockLost, LockTimeout
+from test_generator_queries import RecordingSession
+
+
+class FakeRedis:
+    """The few commands RedisLock and the generator timers use, without expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, token, *args):
+        if "incr" in script:  # ACQUIRE_SCRIPT: key, fence key, ttl
+            if key in self.data:
+                return 0
+            fence = await self.incr(token)
+            self.data[key] = str(fence).encode()
+            return fence
+        if self.data.get(key) != str(token).encode():
+            return 0
+        if "del" in script:
+            del self.data[key]
+        return 1
+
+
+def test_fencing_tokens_grow_and_stale_holder_cannot_commit():
+    redis = FakeRedis()
+
+    async def scenario():
+        first = RedisLock("outage", ttl=30, wait=0, redis=redis)
+        await first.acquire()
+        with pytest.raises(LockTimeout):
+            await RedisLock("outage", ttl=30, wait=0, redis=redis).acquire()
+
+        # Lease expired behind the first holder's back, a newer run took over
+        del redis.data["lock:outage"]
+        second = RedisLock("outage", ttl=30, wait=0, redis=redis)
+        await second.acquire()
+        assert second.token > first.token
+        with pytest.raises(LockLost):
+            await first.check()
+        await second.check()
+
+        # The stale holder's release does not free the newer lock
+        await first.release()
+        assert redis.data["lock:outage"] == str(second.token).encode()
+        await second.release()
+        assert "lock:outage" not in redis.data
+
+    asyncio.run(scenario())
+
+
+def test_waiting_does_not_burn_tokens():
+    redis = FakeRedis()
+
+    async def scenario():
+        holder = RedisLock("outage", ttl=30, wait=0, redis=redis)
+        await holder.acquire()
+        with pytest.raises(LockTimeout):
+            await RedisLock("outage", ttl=30, wait=0.5, redis=redis).acquire()
+        return holder.token
+
+    token = asyncio.run(scenario())
+    assert redis.data["lock:outage:fence"] == token == 1
+
+
+def test_fence_rejects_older_tokens_in_the_transaction():
+    lock = RedisLock("outage", redis=FakeRedis())
+    lock.token = 3
+
+    async def scenario(session):
+        await lock.fence(session)
+
+    session = RecordingSession(rows=[(3,)])
+    asyncio.run(scenario(session))
+    stmt, = session.statements
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO lock_fences (name, token) VALUES") and "ON CONFLICT (name) DO UPDATE" in sql
+    assert "WHERE lock_fences.token <= %(token_1)s::BIGINT RETURNING lock_fences.token" in sql
+    assert stmt.compile(dialect=postgresql.dialect()).params["name"] == "outage"
+
+    # A newer holder committed already: the upsert's WHERE skips the row
+    with pytest.raises(LockLost):
+        asyncio.run(scenario(RecordingSession()))
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+        return False
+
+
+class FakeSessionPool:
+    def __init__(self):
+        self.sessions = []
+
+    def __call__(self):
+        self.sessions.append(FakeSession())
+        return self.sessions[-1]
+
+
+def test_concurrent_calls_join_one_run():
+    pool = FakeSessionPool()
+    flight = SingleFlight("outage", ttl=30, wait=1, redis=FakeRedis(), session_pool=pool)
+    runs = []
+
+    async def check(session, lock):
+        runs.append((session, lock.token))
+        await asyncio.sleep(0.01)
+        return "session"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("check", check) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["session"] * 5
+    assert runs == [(pool.sessions[0], 1)] and pool.sessions[0].closed
+
+
+def test_run_outlives_the_caller_that_started_it():
+    pool = FakeSessionPool()
+    flight = SingleFlight("outage", ttl=30, wait=1, redis=FakeRedis(), session_pool=pool)
+
+    async def check(session, lock):
+        await asyncio.sleep(0.05)
+        # The flight's own session, still open although the first caller is gone
+        assert not session.closed
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flight.run("check", check))
+        await asyncio.sleep(0)
+        joined = asyncio.create_task(flight.run("check", check))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await joined
+
+    assert asyncio.run(scenario()) == "done"
+    assert len(pool.sessions) == 1 and pool.sessions[0].closed
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
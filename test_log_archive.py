@@ -0,0 +1,149 @@
+"""Archived log months: file round trip and reads across archive + live table"""
+import asyncio
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from bot.database.log_archive import LogArchive
+from bot.database.models import LogEvent
+from bot.database.repositories.logs import LogRepository
+from bot.database.repositories.rollup import RollupRepository
+from bot.services import log_retention
+from test_generator_queries import RecordingSession
+
+
+def make_archive(tmp_path):
+    archive = LogArchive(str(tmp_path))
+    archive.write(date(2025, 1, 1), [
+        {"id": 1, "user_id": 7, "action": "TAKE_FUEL", "details": "Taken: 20L", "timestamp": datetime(2025, 1, 3, 10),
+         "quantity": 20.0, "generator": None, "session_id": None, "payload": {"balance_after": 40}},
+        {"id": 2, "user_id": 7, "action": "START_GEN", "details": "Started GEN-1 (003)", "timestamp": datetime(2025, 1, 20),
+         "quantity": None, "generator": "GEN-1 (003)", "session_id": None, "payload": None},
+    ])
+    return archive
+
+
+def test_archive_round_trip(tmp_path):
+    archive = make_archive(tmp_path)
+
+    assert archive.months() == [date(2025, 1, 1)]
+    rows = list(archive.read(datetime(2025, 1, 1), datetime(2025, 2, 1), action="TAKE_FUEL"))
+    assert [r["id"] for r in rows] == [1]
+    assert rows[0]["timestamp"] == datetime(2025, 1, 3, 10)
+    assert rows[0]["payload"] == {"balance_after": 40}
+    assert list(archive.read(datetime(2025, 2, 1), datetime(2025, 3, 1))) == []
+
+
+def test_history_reads_archive_then_live(tmp_path):
+    archive = make_archive(tmp_path)
+    live = LogEvent(id=3, user_id=7, action="TAKE_FUEL", timestamp=datetime(2025, 3, 1))
+    session = RecordingSession()
+
+    async def execute(stmt, *args, **kwargs):
+        result = await RecordingSession.execute(session, stmt)
+        result.scalars.return_value.all.return_value = [live]
+        return result
+
+    session.execute = execute
+    events = asyncio.run(LogRepository(session).get_history(
+        datetime(2025, 1, 1), datetime(2025, 4, 1), action="TAKE_FUEL", archive=archive
+    ))
+
+    assert [e.id for e in events] == [1, 3]
+    assert len(session.statements) == 1
+
+
+class RetentionSession:
+    """Fake session: logs statements and commits in order, streams an old partition in chunks."""
+
+    def __init__(self, journal, rows, fail_on=None):
+        self.journal = journal
+        self.rows = rows
+        self.fail_on = fail_on  # Commit fails right after this statement
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, *args, **kwargs):
+        sql = str(stmt)
+        self.journal.append(sql)
+        result = MagicMock()
+        partitions = [("logs_2025_01",), ("logs_2026_10",)]
+        result.all.return_value = partitions if "pg_inherits" in sql else []
+        return result
+
+    async def stream(self, stmt):
+        self.journal.append(str(stmt))
+        rows = self.rows
+
+        class Mappings:
+            async def partitions(self, size):
+                for i in range(0, len(rows), size):
+                    yield rows[i:i + size]
+
+        result = MagicMock()
+        result.mappings.return_value = Mappings()
+        return result
+
+    async def commit(self):
+        if self.fail_on and self.fail_on in self.journal[-1]:
+            raise RuntimeError("commit failed")
+        self.journal.append("COMMIT")
+
+
+def test_retention_commits_detach_before_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_retention, "datetime", MagicMock(utcnow=lambda: datetime(2026, 10, 19)))
+    rows = [{"id": i, "action": "TAKE_FUEL", "timestamp": datetime(2025, 1, 2)} for i in range(2500)]
+    journal = []
+    archive = LogArchive(str(tmp_path))
+
+    archived = asyncio.run(log_retention.run_log_retention(
+        retention_months=12, archive=archive, session_pool=lambda: RetentionSession(journal, rows)
+    ))
+
+    assert archived == ["logs_2025_01"]
+    detach = journal.index("ALTER TABLE logs DETACH PARTITION logs_2025_01")
+    # The exclusive lock is released before any row is read
+    assert journal[detach + 1] == "COMMIT" and journal[detach + 2].startswith("SELECT * FROM logs_2025_01")
+    assert journal[-2:] == ["DROP TABLE logs_2025_01", "COMMIT"]
+    assert len(list(archive.read(datetime(2025, 1, 1), datetime(2025, 2, 1)))) == 2500
+    # Months missing ahead are created and attached
+    assert "ALTER TABLE logs ATTACH PARTITION logs_2026_11 FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')" in journal
+
+
+def test_failed_drop_removes_the_archive_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_retention, "datetime", MagicMock(utcnow=lambda: datetime(2026, 10, 19)))
+    rows = [{"id": 1, "action": "TAKE_FUEL", "timestamp": datetime(2025, 1, 2)}]
+    journal = []
+    archive = LogArchive(str(tmp_path))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(log_retention.run_log_retention(
+            retention_months=12, archive=archive,
+            session_pool=lambda: RetentionSession(journal, rows, fail_on="DROP TABLE"),
+        ))
+
+    # Back in the live table only: no archive copy to read twice
+    assert archive.months() == [] and list(tmp_path.iterdir()) == []
+    assert journal[-2:] == ["ALTER TABLE logs ATTACH PARTITION logs_2025_01 FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')",
+                            "COMMIT"]
+
+
+def test_rollup_backfill_keeps_archived_months():
+    partitions = [("logs_default",), ("logs_2026_05",), ("logs_2026_04",)]
+    for since, floor in ((None, date(2026, 4, 1)), (date(2025, 1, 1), date(2026, 4, 1)), (date(2026, 6, 1), date(2026, 6, 1))):
+        session = RecordingSession(results=[partitions])
+        asyncio.run(RollupRepository(session).backfill(since))
+
+        _, clear, rebuild = session.statements
+        assert str(clear).startswith("DELETE FROM daily_fuel_rollup WHERE daily_fuel_rollup.day >=")
+        assert clear.compile().params["day_1"] == floor
+        assert datetime.combine(floor, datetime.min.time()) in rebuild.compile().params.values()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,69 @@
+"""Outage timers planned from the timeline (no Redis needed)"""
+from datetime import datetime, date, time, timedelta
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from bot.services import outage_timers
+
+
+def hours(day: date, *hs):
+    return [datetime.combine(day, time(h, 0)) for h in hs]
+
+
+def test_blocks_are_continuous_across_midnight():
+    today, tomorrow = date(2026, 2, 4), date(2026, 2, 5)
+    timeline = hours(today, 9, 10, 23) + hours(tomorrow, 0, 1)
+
+    assert outage_timers.plan_blocks(timeline) == [
+        (datetime(2026, 2, 4, 9), datetime(2026, 2, 4, 11)),
+        (datetime(2026, 2, 4, 23), datetime(2026, 2, 5, 2)),
+    ]
+
+
+def test_replan_only_when_the_timeline_changes():
+    outage_timers._planned = None
+    sched = AsyncIOScheduler()  # Not started: jobs stay pending, nothing fires
+    now = datetime(2026, 2, 4, 8, 0)
+    timeline = hours(date(2026, 2, 4), 9, 10, 14)
+
+    assert outage_timers.replan(timeline, now, sched)
+    jobs = {job.id: job for job in sched.get_jobs()}
+    warn = jobs["outage_warn:202602040900-202602041100"]
+    assert warn.trigger.run_date.replace(tzinfo=None) == datetime(2026, 2, 4, 8, 30)
+    assert warn.args == (datetime(2026, 2, 4, 9), datetime(2026, 2, 4, 11))
+    assert "outage_end:202602040900-202602041100" in jobs and len(jobs) == 4
+
+    # Same timeline: scheduler untouched
+    assert not outage_timers.replan(timeline, now + timedelta(minutes=5), sched)
+
+    # 14:00 block extended to 16:00: its timers are replaced, the morning ones kept
+    assert outage_timers.replan(timeline + hours(date(2026, 2, 4), 15), now, sched)
+    ids = {job.id for job in sched.get_jobs()}
+    assert "outage_end:202602041400-202602041600" in ids
+    assert "outage_end:202602041400-202602041500" not in ids
+    assert "outage_warn:202602040900-202602041100" in ids
+
+
+def test_new_leader_replans_against_the_store():
+    outage_timers._planned = None
+    sched = AsyncIOScheduler()
+    now = datetime(2026, 2, 4, 8, 0)
+    timeline = hours(date(2026, 2, 4), 9)
+    assert outage_timers.replan(timeline, now, sched)
+
+    # Another leader planned a different timeline into the shared store meanwhile
+    for job in sched.get_jobs():
+        sched.remove_job(job.id)
+    outage_timers.replan(hours(date(2026, 2, 4), 14), now, sched)
+    outage_timers._planned = frozenset(outage_timers._timers(timeline, now))
+
+    outage_timers.reset()  # Elected again
+    assert outage_timers.replan(timeline, now, sched)
+    assert {job.id for job in sched.get_jobs()} == set(outage_timers._timers(timeline, now))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,136 @@
+"""Outbox: lanes, dedup, ack only after delivery, dead letters (in-memory Redis stand-in)"""
+import asyncio
+
+import pytest
+
+from bot.services.broadcaster import DeliveryResult
+from bot.services.outbox import Outbox, OutboxLane, AlertCategory
+
+
+class StreamRedis:
+    """Keys, streams and pending counts: the subset of commands the outbox uses."""
+
+    def __init__(self, fail_xadd=False):
+        self.keys = {}
+        self.streams = {}
+        self.acked = []
+        self.deliveries = {}  # entry id -> times delivered
+        self.fail_xadd = fail_xadd
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.keys.pop(key, None)
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        if self.fail_xadd:
+            raise ConnectionError("redis down")
+        entries = self.streams.setdefault(stream, [])
+        entry_id = f"{len(entries) + 1}-0".encode()
+        entries.append((entry_id, fields))
+        return entry_id
+
+    async def xack(self, stream, group, entry_id):
+        self.acked.append((stream, entry_id))
+
+    async def xpending_range(self, stream, group, low, high, count):
+        return [{"message_id": low, "times_delivered": self.deliveries.get(low, 1)}]
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, count):
+        # Second entry was trimmed from the stream meanwhile: no fields
+        return [b"0-0", [(b"1-0", {b"data": b"{}"}), (b"2-0", {})], []]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append(getattr(redis, name)(*args, **kwargs))
+
+            async def execute(self):
+                return [await call for call in self.calls]
+
+        return Pipeline()
+
+
+class FakeDigest:
+    def __init__(self, result):
+        self.result = result
+
+    async def submit(self, chat_id, text, category, reply_markup=None, on_sent=None, immediate=False):
+        await on_sent(self.result.model_copy(update={"chat_id": chat_id}))
+
+
+def queued(outbox: Outbox, category=AlertCategory.general, text="hello"):
+    return asyncio.run(outbox.enqueue([1, 2, 1], text, category))
+
+
+def test_enqueue_picks_lane_and_deduplicates():
+    redis = StreamRedis()
+    outbox = Outbox(redis)
+
+    assert queued(outbox, AlertCategory.fuel_critical) == 2
+    assert queued(outbox, AlertCategory.fuel_critical) == 0  # Same text within the window
+    assert queued(outbox, AlertCategory.weather_report) == 2
+    assert len(redis.streams["outbox:critical"]) == 2
+    assert len(redis.streams["outbox:routine"]) == 2
+
+
+def test_failed_xadd_releases_the_dedup_key():
+    redis = StreamRedis(fail_xadd=True)
+    outbox = Outbox(redis)
+    with pytest.raises(ConnectionError):
+        queued(outbox)
+    assert redis.keys == {}
+
+    redis.fail_xadd = False
+    assert queued(outbox) == 2
+
+
+def deliver(result: DeliveryResult, deliveries: int = 1):
+    redis = StreamRedis()
+    outbox = Outbox(redis)
+    queued(outbox)
+    entry_id, fields = redis.streams["outbox:normal"][0]
+    redis.deliveries[entry_id] = deliveries
+    asyncio.run(outbox._deliver(FakeDigest(result), OutboxLane.normal, entry_id, {b"data": fields["data"].encode()}))
+    assert outbox.in_flight == set()
+    return redis, entry_id
+
+
+def test_entry_is_acked_only_after_delivery():
+    redis, entry_id = deliver(DeliveryResult(chat_id=0, ok=True, message_id=7))
+    assert redis.acked == [("outbox:normal", entry_id)]
+
+    # Transient failure: stays pending for xautoclaim
+    redis, _ = deliver(DeliveryResult(chat_id=0, ok=False, error="Server error"))
+    assert redis.acked == [] and "outbox:dead" not in redis.streams
+
+
+def test_failed_entries_go_to_dead_letters():
+    for result, deliveries in (
+        (DeliveryResult(chat_id=0, ok=False, error="Forbidden: bot was blocked", permanent=True), 1),
+        (DeliveryResult(chat_id=0, ok=False, error="Server error"), 5),
+    ):
+        redis, entry_id = deliver(result, deliveries)
+        assert redis.acked == [("outbox:normal", entry_id)]
+        (_, dead), = redis.streams["outbox:dead"]
+        assert dead["lane"] == "normal" and dead["entry_id"] == entry_id and dead["error"] == result.error
+
+
+def test_reclaim_skips_deleted_entries():
+    outbox = Outbox(StreamRedis())
+    entries = asyncio.run(outbox._reclaim(OutboxLane.normal))
+    assert [entry_id for entry_id, _ in entries] == [b"1-0"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,153 @@
+"""Scheduler jobs are reconciled with the persistent store (no Redis needed)"""
+import asyncio
+import pickle
+from unittest.mock import AsyncMock, MagicMock
+
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.redis import RedisJobStore
+from apscheduler.triggers.interval import IntervalTrigger
+
+from bot import scheduler as sched
+from bot.database.redis_client import redis_client
+
+
+class KeptJobStore(MemoryJobStore):
+    """Memory store that, like Redis, keeps its jobs when the scheduler shuts down."""
+
+    def shutdown(self):
+        pass
+
+
+class FakeSyncRedis:
+    """Hash + sorted set subset of the blocking client used by RedisJobStore."""
+
+    def __init__(self):
+        self.hashes, self.zsets = {}, {}
+        self.connection_pool = MagicMock()
+
+    def hexists(self, key, field):
+        return field in self.hashes.get(key, {})
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hmget(self, key, *fields):
+        return [self.hget(key, f) for f in fields]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hdel(self, key, *fields):
+        for f in fields:
+            self.hashes.get(key, {}).pop(f, None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for m in members:
+            self.zsets.get(key, {}).pop(m, None)
+
+    def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])[start:end + 1]
+        return items if withscores else [k for k, _ in items]
+
+    def zrangebyscore(self, key, low, high):
+        return [k for k, v in sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1]) if low <= v <= high]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.zsets.pop(key, None)
+
+    def pipeline(self):
+        return self
+
+    def multi(self):
+        pass
+
+    def execute(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _noop():
+    pass
+
+
+def test_jobs_are_added_once_and_keep_runtime_changes(monkeypatch):
+    monkeypatch.setattr(redis_client, "get", AsyncMock(return_value=b"20"))
+    store = KeptJobStore()
+
+    async def stop():
+        sched.scheduler.shutdown(wait=False)
+        await asyncio.sleep(0)  # Shutdown is scheduled on the loop
+
+    async def scenario():
+        await sched.start_scheduler(MagicMock(), jobstores={"default": store})
+        first = {job.id: job.next_run_time for job in sched.scheduler.get_jobs()}
+        outage = sched.scheduler.get_job("check_power_outage_job")
+        outage_trigger = str(outage.trigger)
+
+        # Restart with the same store: nothing is re-added or rescheduled
+        await stop()
+        await sched.start_scheduler(MagicMock(), jobstores={"default": store})
+        second = {job.id: job.next_run_time for job in sched.scheduler.get_jobs()}
+
+        # Interval changed by an admin meanwhile: only that job is rescheduled
+        await stop()
+        redis_client.get.return_value = b"5"
+        await sched.start_scheduler(MagicMock(), jobstores={"default": store})
+        changed = sched.scheduler.get_job("check_power_outage_job")
+        await stop()
+        return first, outage, outage_trigger, second, str(changed.trigger)
+
+    first, outage, outage_trigger, second, changed = asyncio.run(scenario())
+
+    assert first == second
+    assert outage_trigger == str(IntervalTrigger(minutes=20))
+    assert changed == str(IntervalTrigger(minutes=5))
+    # Stored jobs carry no bot instance and can be pickled by the Redis store
+    assert outage.args == ()
+    pickle.dumps(outage.__getstate__())
+
+
+def test_retired_jobs_are_dropped_without_restoring_them(monkeypatch):
+    monkeypatch.setattr(redis_client, "get", AsyncMock(return_value=None))
+    store = RedisJobStore(jobs_key="scheduler:jobs", run_times_key="scheduler:run_times")
+    store.redis = FakeSyncRedis()
+
+    # State left by an older release: points at a function that no longer exists
+    job = Job(MagicMock(), id="check_rotation_needed", func=_noop, trigger=IntervalTrigger(minutes=30),
+              executor="default", max_instances=1, misfire_grace_time=None, coalesce=True,
+              next_run_time=None, args=(), kwargs={}, name="check_rotation_needed")
+    state = job.__getstate__()
+    state["func"] = "bot.scheduler:check_rotation_needed"
+    store.redis.hset("scheduler:jobs", "check_rotation_needed", pickle.dumps(state))
+    store.redis.zadd("scheduler:run_times", {"check_rotation_needed": 0})
+
+    async def scenario():
+        await sched.start_scheduler(MagicMock(), jobstores={"default": store})
+        ids = {j.id for j in sched.scheduler.get_jobs()}
+        sched.scheduler.shutdown(wait=False)
+        await asyncio.sleep(0)
+        return ids
+
+    ids = asyncio.run(scenario())
+    assert "check_rotation_needed" not in ids and "check_power_outage_job" in ids
+    assert "check_rotation_needed" not in store.redis.hashes["scheduler:jobs"]
+    assert "check_rotation_needed" not in store.redis.zsets["scheduler:run_times"]
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+"""Session cards: text and keyboard per status/role, in-place refresh (no Telegram needed)"""
+import asyncio
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from bot.config import config
+from bot.database.models import RefuelSession, SessionMessage, SessionStatus
+from bot.services.broadcaster import DeliveryResult
+from bot.services.session_cards import SessionCardService, WORKER, ADMIN
+
+
+def refuel_session(status: SessionStatus) -> RefuelSession:
+    return RefuelSession(id=7, status=status.value, start_time=datetime(2026, 2, 4, 9), block_start=datetime(2026, 2, 4, 9),
+                         deadline=datetime(2026, 2, 4, 11), end_time=datetime(2026, 2, 4, 10, 15), worker1_id=1,
+                         gen_name="GEN-1 (003)", liters=20.0, cans=1.0)
+
+
+def callbacks(kb) -> list[str]:
+    return [button.callback_data for row in kb.inline_keyboard for button in row] if kb else []
+
+
+def test_only_open_sessions_have_buttons():
+    expected = {
+        SessionStatus.pending: ["session_start:7"],
+        SessionStatus.in_progress: ["session_complete:7"],
+        SessionStatus.expired: [],
+        SessionStatus.completed: [],
+        SessionStatus.cancelled: [],
+    }
+    for status, buttons in expected.items():
+        text, kb = SessionCardService.render(refuel_session(status), WORKER, "Іван, —")
+        assert callbacks(kb) == buttons, status
+        # Admin cards are informational only
+        assert SessionCardService.render(refuel_session(status), ADMIN, "Іван, —")[1] is None
+
+
+def test_completed_card_shows_the_refuel():
+    text, _ = SessionCardService.render(refuel_session(SessionStatus.completed), WORKER, "Іван, —")
+    assert "GEN-1 (003)" in text and "20.0л" in text and "10:15" in text
+
+
+class FakeBroadcaster:
+    def __init__(self, failing=()):
+        self.edits = []
+        self.failing = set(failing)
+
+    async def edit(self, chat_id, message_id, text, reply_markup=None):
+        self.edits.append((chat_id, message_id, reply_markup))
+        return DeliveryResult(chat_id=chat_id, ok=chat_id not in self.failing)
+
+
+class FakeMessages:
+    def __init__(self, cards):
+        self.cards = cards
+
+    async def get_for_session(self, session_id):
+        return self.cards
+
+
+class FakeUsers:
+    async def get_cached(self, user_id):
+        return None
+
+
+def card_service(cards, failing=()) -> SessionCardService:
+    service = SessionCardService.__new__(SessionCardService)
+    service.messages, service.users, service.broadcaster = FakeMessages(cards), FakeUsers(), FakeBroadcaster(failing)
+    return service
+
+
+def test_refresh_edits_every_card_in_place(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_IDS", [100])
+    cards = [SessionMessage(chat_id=1, message_id=11, role=WORKER), SessionMessage(chat_id=100, message_id=12, role=ADMIN)]
+    service = card_service(cards, failing={100})
+
+    updated = asyncio.run(service.refresh(refuel_session(SessionStatus.expired)))
+    assert updated == {1}
+    assert [(chat_id, message_id) for chat_id, message_id, _ in service.broadcaster.edits] == [(1, 11), (100, 12)]
+    assert all(kb is None for _, _, kb in service.broadcaster.edits)
+
+
+def test_refresh_resends_missing_cards(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_IDS", [100])
+    queued = []
+
+    async def enqueue(chat_ids, text, category, reply_markup=None, **meta):
+        queued.append((chat_ids, meta["card_role"], callbacks(reply_markup)))
+
+    from bot.services import session_cards
+    monkeypatch.setattr(session_cards, "outbox", MagicMock(enqueue=enqueue))
+    service = card_service([SessionMessage(chat_id=100, message_id=12, role=ADMIN)])
+
+    asyncio.run(service.refresh(refuel_session(SessionStatus.pending), resend_category=session_cards.AlertCategory.session_created))
+    assert queued == [([1], WORKER, ["session_start:7"])]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,183 @@
+"""SessionRepository unit of work: flush only, RETURNING instead of re-SELECT"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from bot.database.models import RefuelSession, SessionStatus
+from bot.database.repositories.session import SessionRepository
+from bot.services.session_service import SessionService
+from test_generator_queries import RecordingSession
+
+
+class UnitOfWorkSession(RecordingSession):
+    def __init__(self, rows=None):
+        super().__init__(rows)
+        self.commits = 0
+        self.flushes = 0
+
+    async def flush(self):
+        self.flushes += 1
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_updates_use_returning_without_commit():
+    row = RefuelSession(id=5, status=SessionStatus.completed)
+    session = UnitOfWorkSession(rows=[(row,)])
+    repo = SessionRepository(session)
+
+    assert asyncio.run(repo.update_status(5, SessionStatus.in_progress)) is row
+    asyncio.run(repo.complete_session(5, 1, "GEN-1 (003)", 20.0, 1.0))
+
+    assert len(session.statements) == 2
+    assert all(sql.startswith("UPDATE refuel_sessions") and "RETURNING" in sql for sql in session.sql())
+    assert session.commits == 0
+
+
+def test_create_session_flushes_only():
+    session = UnitOfWorkSession()
+    asyncio.run(SessionRepository(session).create_session(datetime.now(), datetime.now() + timedelta(hours=2)))
+    assert (session.flushes, session.commits) == (1, 0)
+
+
+def test_outage_check_commits_once():
+    db = MagicMock()
+    db.commit = AsyncMock()
+    service = SessionService(db, bot=MagicMock())
+    service.cards = AsyncMock()
+    service.flight = None  # No Redis lock here, see test_locks.py
+
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    expired = RefuelSession(id=1, status=SessionStatus.expired)
+    created = RefuelSession(id=2, status=SessionStatus.pending)
+    active = MagicMock(id=1, status="in_progress", start_time=now - timedelta(hours=3), deadline=now - timedelta(minutes=1))
+
+    service.parser.get_outage_timeline = AsyncMock(return_value=[now])
+    service.sheets_service.get_workers_for_outage = MagicMock(return_value=[])
+    service.repo.get_active_session = AsyncMock(return_value=active)
+    service.repo.update_status = AsyncMock(return_value=expired)
+    service.repo.create_session = AsyncMock(return_value=created)
+    service.replan = MagicMock()
+
+    assert asyncio.run(service.check_power_outage()) is created
+    service.replan.assert_called_once_with([now])
+    db.commit.assert_awaited_once()
+    service.cards.refresh.assert_awaited_once()
+    service.cards.publish.assert_awaited_once()
+
+
+def test_deadline_expires_without_timeline():
+    db = MagicMock()
+    db.commit = AsyncMock()
+    service = SessionService(db, bot=MagicMock())
+    service.cards = AsyncMock()
+    service.flight = None  # No Redis lock here, see test_locks.py
+
+    now = datetime.now()
+    active = MagicMock(id=7, status="in_progress", start_time=now - timedelta(hours=3), deadline=now - timedelta(seconds=1))
+    service.parser.get_outage_timeline = AsyncMock(return_value=[])
+    service.repo.get_active_session = AsyncMock(return_value=active)
+    service.repo.update_status = AsyncMock(return_value=RefuelSession(id=7, status=SessionStatus.expired))
+    service.replan = MagicMock()
+
+    asyncio.run(service.check_power_outage())
+    service.repo.update_status.assert_awaited_once_with(7, SessionStatus.expired)
+    # Empty timeline (maybe a failed fetch): timers stay as planned
+    service.replan.assert_not_called()
+
+    # Deadline timer does the same without touching the timeline
+    service.repo.update_status.reset_mock()
+    service.parser.get_outage_timeline.reset_mock()
+    asyncio.run(service.close_due())
+    service.repo.update_status.assert_awaited_once_with(7, SessionStatus.expired)
+    service.parser.get_outage_timeline.assert_not_awaited()
+
+
+def test_flight_runs_on_its_own_session():
+    caller_db, flight_db = UnitOfWorkSession(), UnitOfWorkSession()
+
+    class Flight:
+        async def run(self, key, factory):
+            return await factory(flight_db, None)
+
+    service = SessionService(caller_db, bot=MagicMock(), sheets_service=MagicMock(), parser=MagicMock())
+    service.flight = Flight()
+
+    assert asyncio.run(service.close_due()) is None
+    assert caller_db.statements == [] and len(flight_db.statements) == 1
+
+
+def test_warning_timer_opens_block_once():
+    db = MagicMock()
+    db.commit = AsyncMock()
+    service = SessionService(db, bot=MagicMock())
+    service.cards = AsyncMock()
+    service.flight = None  # No Redis lock here, see test_locks.py
+
+    block_start = datetime.now() + timedelta(minutes=30)
+    deadline = block_start + timedelta(hours=2)
+    service.sheets_service.get_workers_for_outage = MagicMock(return_value=[])
+    service.repo.get_active_session = AsyncMock(return_value=None)
+    service.repo.create_session = AsyncMock(return_value=RefuelSession(id=3, status=SessionStatus.pending))
+
+    assert asyncio.run(service.open_block(block_start, deadline)).id == 3
+    service.cards.publish.assert_awaited_once()
+
+    # A session already covers the block: nothing new
+    service.repo.create_session.reset_mock()
+    service.repo.get_active_session.return_value = MagicMock(
+        status="pending", start_time=block_start - timedelta(minutes=30), deadline=deadline)
+    assert asyncio.run(service.open_block(block_start, deadline)) is None
+    service.repo.create_session.assert_not_awaited()
+
+def test_admin_screens_join_workers():
+    session = UnitOfWorkSession()
+    repo = SessionRepository(session)
+    session.rows = []
+    asyncio.run(repo.get_history_with_workers(limit=8))
+    asyncio.run(repo.get_session_with_workers(5))
+
+    history_sql, view_sql = session.sql()
+    assert history_sql.count("LEFT OUTER JOIN users") == 2
+    assert view_sql.count("LEFT OUTER JOIN users") == 3
+
+
+def test_history_page_seeks_on_start_time_and_id():
+    session = UnitOfWorkSession()
+    repo = SessionRepository(session)
+    key = (datetime(2026, 1, 5, 10, 30, 0, 123456), 42)
+
+    page = asyncio.run(repo.get_page(limit=8, status="completed", key=key, direction="n"))
+    asyncio.run(repo.get_page(limit=8, key=key, direction="p"))
+
+    older, newer = session.sql()
+    assert "(refuel_sessions.start_time, refuel_sessions.id) <" in older
+    assert "ORDER BY refuel_sessions.start_time DESC, refuel_sessions.id DESC" in older
+    assert "OFFSET" not in older and "LEFT OUTER JOIN users" in older
+    assert "(refuel_sessions.start_time, refuel_sessions.id) >" in newer
+    assert "ORDER BY refuel_sessions.start_time ASC" in newer
+    assert (page.has_older, page.has_newer) == (False, True)
+
+
+def test_sessions_cursor_round_trip():
+    from bot.keyboards.session_kb import SessionsCursor
+
+    cursor = SessionsCursor(status="x", days=30, direction="n",
+                            start_time=datetime(2026, 1, 5, 10, 30, 0, 123456), session_id=123456)
+    data = cursor.pack()
+    assert len(data.encode()) <= 64
+    assert SessionsCursor.unpack(data) == cursor
+    assert SessionsCursor.unpack(SessionsCursor().pack()) == SessionsCursor()
+
+
+def test_block_session_insert_skips_duplicates():
+    session = UnitOfWorkSession()
+    now = datetime.now()
+    created = asyncio.run(SessionRepository(session).create_session(
+        now, now + timedelta(hours=2), block_start=now + timedelta(minutes=30)))
+
+    assert created is None  # Nothing returned: another run already created it
+    sql, = session.sql()
+    assert sql.startswith("INSERT INTO refuel_sessions")
+    assert "ON CONFLICT (block_start, deadline) WHERE status != " in sql and "DO NOTHING" in sql
@@ -0,0 +1,119 @@
+"""User cache: role checks served without DB access, invalidated on writes"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from bot.database.models import User, UserRole
+from bot.database.repositories import user as user_repo
+from bot.database.repositories.user import UserRepository
+from bot.database.user_cache import UserCache, CachedUser
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def make_repo(monkeypatch, user=None):
+    cache = UserCache(FakeRedis())
+    monkeypatch.setattr("bot.database.repositories.user.user_cache", cache)
+    session = MagicMock()
+    session.get = AsyncMock(return_value=user)
+    session.info = {}
+    return UserRepository(session), session, cache
+
+
+def test_role_check_hits_db_once(monkeypatch):
+    repo, session, cache = make_repo(monkeypatch, User(id=1, name="Admin", role=UserRole.admin))
+
+    async def run():
+        first = await repo.get_cached(1)
+        second = await repo.get_cached(1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.is_admin and second == first
+    assert session.get.await_count == 1
+    assert "user:1" in cache.redis.data
+
+
+def test_other_instance_reads_redis(monkeypatch):
+    repo, session, cache = make_repo(monkeypatch)
+    asyncio.run(cache.set(CachedUser(id=2, name="Worker", role=UserRole.worker)))
+    cache.local.clear()  # As if it was another process
+
+    user = asyncio.run(repo.get_cached(2))
+    assert user.role == UserRole.worker
+    session.get.assert_not_awaited()
+
+
+def test_update_sheet_name_invalidates(monkeypatch):
+    repo, session, cache = make_repo(monkeypatch, User(id=3, name="Worker", role=UserRole.worker))
+    session.flush = AsyncMock()
+    session.sync_session = MagicMock()
+    monkeypatch.setattr("bot.database.repositories.user.event.listen", MagicMock())
+
+    async def run():
+        await repo.get_cached(3)
+        await repo.update_sheet_name(3, "Петро О.")
+
+    asyncio.run(run())
+    assert 3 not in cache.local and "user:3" not in cache.redis.data
+    assert cache.redis.published == [("user_cache:invalidate", 3)]
+    assert session.info["user_cache_pending"] == {3}
+
+
+def test_lru_evicts_oldest(monkeypatch):
+    monkeypatch.setattr("bot.database.user_cache.config.USER_CACHE_SIZE", 2)
+    cache = UserCache(FakeRedis())
+    for user_id in (1, 2, 3):
+        cache._set_local(user_id, CachedUser(id=user_id, name=str(user_id), role=UserRole.worker))
+    assert list(cache.local) == [2, 3]
+
+
+def test_unknown_id_is_cached_briefly(monkeypatch):
+    repo, session, cache = make_repo(monkeypatch)
+
+    async def run():
+        return await repo.get_cached(4), await repo.get_cached(4)
+
+    assert asyncio.run(run()) == (None, None)
+    assert session.get.await_count == 1
+    assert cache.redis.data["user:4"] == ""
+
+    # Another instance sees the negative entry in Redis
+    cache.local.clear()
+    assert asyncio.run(cache.lookup(4)) == (True, None)
+
+    # Registration invalidates it
+    asyncio.run(cache.invalidate(4))
+    assert asyncio.run(cache.lookup(4)) == (False, None)
+
+
+def test_after_commit_invalidation_is_kept_until_done(monkeypatch):
+    cache = UserCache(FakeRedis())
+    monkeypatch.setattr("bot.database.repositories.user.user_cache", cache)
+    cache._set_local(5, CachedUser(id=5, name="W", role=UserRole.worker))
+    sync_session = MagicMock(info={user_repo.PENDING_INVALIDATIONS: {5}})
+
+    async def run():
+        user_repo._invalidate_after_commit(sync_session)
+        assert len(user_repo._invalidations) == 1
+        await asyncio.gather(*user_repo._invalidations)
+
+    asyncio.run(run())
+    assert user_repo._invalidations == set() and 5 not in cache.local
+